@@ -0,0 +1,557 @@
+"""
+非対話のバッチ描画 - 複数ファイル・複数プロットタイプをまとめて描画
+"""
+import io
+import os
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager, redirect_stdout
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from .core.file_utils import ensure_output_dir, generate_output_path, get_base_name
+
+# プロットタイプ（CLIの --type に指定する名前）
+PLOT_TYPES = ['basic', 'colored', 'scatter']
+
+# 表示タイプ（CLIの --annotate に指定する名前）
+ANNOTATION_TYPES = ['correlation', 'regression', 'none']
+
+
+class RenderJob(NamedTuple):
+    """
+    1枚の画像を描画するジョブ
+
+    Attributes:
+        file_path: 入力CSVファイルのパス
+        plot_type: プロットタイプ（PLOT_TYPES のいずれか）
+        output_dir: 出力ディレクトリ
+        annotation_type: 表示タイプ（ANNOTATION_TYPES のいずれか）
+        x_var: 散布図のX軸の列名（scatter のみ）
+        y_var: 散布図のY軸の列名（scatter のみ）
+        with_boxplot: 散布図に箱ひげ図を追加するか（scatter のみ）
+        corner: ペアプロットの上三角を描画しないか
+        density: 密度表示（Noneの場合は行数で自動判定）
+        tile_jobs: ペアプロットをタイルに分けて並列に描画するプロセス数（Noneの場合はタイルに分けない）
+        panel_cache: ペアプロットの描画済みパネルをキャッシュし、内容が変わったパネルだけを描画するか
+    """
+    file_path: str
+    plot_type: str
+    output_dir: str
+    annotation_type: str = 'none'
+    x_var: Optional[str] = None
+    y_var: Optional[str] = None
+    with_boxplot: bool = False
+    corner: bool = False
+    density: Optional[bool] = None
+    tile_jobs: Optional[int] = None
+    panel_cache: bool = False
+
+
+class JobResult(NamedTuple):
+    """
+    ジョブの実行結果
+
+    Attributes:
+        job: 実行したジョブ
+        output_path: 保存した画像のパス（失敗した場合はNone）
+        error: エラーメッセージ（成功した場合はNone）
+        seconds: 実行にかかった秒数
+        log: 描画中に出力されたメッセージ
+        metrics: 段階ごとの計測結果（計測しなかった場合はNone）
+        columns: 描画に使った列（失敗した場合はNone）
+        skipped: 入力と条件が前回と同じため描画を省略した場合はTrue
+    """
+    job: RenderJob
+    output_path: Optional[str]
+    error: Optional[str]
+    seconds: float
+    log: str
+    metrics: Optional[dict] = None
+    columns: Optional[List[str]] = None
+    skipped: bool = False
+
+
+def output_suffix(job: RenderJob, has_z_column: bool) -> str:
+    """
+    対話モードと同じ規則で出力ファイル名のサフィックスを作成
+
+    Args:
+        job: 描画ジョブ
+        has_z_column: データに'z'列があるか
+
+    Returns:
+        ファイル名のサフィックス
+    """
+    if job.plot_type == 'basic':
+        return "pairplot"
+    if job.plot_type == 'colored':
+        return "pairplot_colored"
+
+    suffix = f"{job.x_var}_vs_{job.y_var}"
+    if job.with_boxplot:
+        suffix += "_with_boxplot"
+    if has_z_column:
+        suffix += "_colored"
+    return suffix
+
+
+def render_job(job: RenderJob, df=None, profile=None) -> str:
+    """
+    1つのジョブを描画
+
+    Args:
+        job: 描画ジョブ
+        df: 読み込み済みのDataFrame または Dataset（Noneの場合は job.file_path から読み込む）
+        profile: 段階ごとの計測先（RenderProfile、Noneの場合は計測しない）
+
+    Returns:
+        保存した画像のパス
+    """
+    return _render(job, df, profile)[0]
+
+
+def _render(job: RenderJob, df=None, profile=None, tail=None) -> Tuple[str, List[str]]:
+    """
+    1つのジョブを描画し、保存した画像のパスと描画に使った列を返す
+
+    Args:
+        job: 描画ジョブ
+        df: 読み込み済みのDataFrame または Dataset（Noneの場合は job.file_path から読み込む）
+        profile: 段階ごとの計測先（RenderProfile、Noneの場合は計測しない）
+        tail: 差分で読み込んでいるデータ（TailDataset、指定した場合は df の代わりに使い、
+            ペアプロットの注釈と対角のヒストグラムは集計済みの統計量から描画する）
+
+    Returns:
+        (保存した画像のパス, 描画に使った列のリスト) のタプル
+    """
+    # 読み込み・描画関数は重いモジュールを読み込むので、実際に描画するときだけ読み込む
+    from .core import as_dataset, load_csv_cached
+    from .plotters import create_basic_pairplot, create_colored_pairplot, create_scatter_boxplot
+    from .plotters.panel_cache import PanelCache
+    from .profiling import stage
+
+    if job.plot_type not in PLOT_TYPES:
+        raise ValueError(f"エラー: 不明なプロットタイプです: {job.plot_type}")
+
+    ensure_output_dir(job.output_dir)
+    if tail is not None:
+        df = tail.dataset
+    if df is None:
+        with stage(profile, 'load'):
+            df = load_csv_cached(job.file_path)
+    # 数値列の配列への変換と統計量は、同じデータを使う描画の間で使い回す
+    dataset = as_dataset(df)
+    if profile is not None:
+        profile.metadata.update(rows=dataset.n_rows, columns=len(dataset.source_columns))
+    has_z_column = dataset.has_z
+    output_path = generate_output_path(job.output_dir, get_base_name(job.file_path),
+                                       output_suffix(job, has_z_column))
+    panel_cache = PanelCache() if job.panel_cache else None
+
+    if job.plot_type == 'basic':
+        numeric_cols = list(dataset.columns)
+        precomputed = tail.pairplot_stats(numeric_cols) if tail is not None else None
+        path = create_basic_pairplot(dataset, numeric_cols, output_path, job.annotation_type,
+                                     corner=job.corner, density=job.density, profile=profile,
+                                     precomputed=precomputed, tile_jobs=job.tile_jobs,
+                                     panel_cache=panel_cache)
+        return path, numeric_cols
+
+    if job.plot_type == 'colored':
+        precomputed = None
+        drawn_cols = [col for col in dataset.columns if col != 'z']
+        if tail is not None and has_z_column:
+            # create_colored_pairplot が描画する列の順に統計量を取り出す
+            precomputed = tail.pairplot_stats(drawn_cols, grouped=True)
+        path = create_colored_pairplot(dataset, output_path, job.annotation_type,
+                                       corner=job.corner, density=job.density, profile=profile,
+                                       precomputed=precomputed, tile_jobs=job.tile_jobs,
+                                       panel_cache=panel_cache)
+        return path, drawn_cols + ['z']
+
+    if not job.x_var or not job.y_var:
+        raise ValueError("エラー: 散布図には --x と --y の指定が必要です。")
+    for col in (job.x_var, job.y_var):
+        if col not in dataset.source_columns:
+            raise ValueError(f"エラー: 列 '{col}' が見つかりません。")
+    box_stats = None
+    if tail is not None and job.with_boxplot and all(col in tail.sketches for col in (job.x_var, job.y_var)):
+        # 追記分だけで更新してきた分位点のスケッチから箱ひげ図を描画する
+        box_stats = (tail.sketches[job.x_var].boxplot_stats(), tail.sketches[job.y_var].boxplot_stats())
+    path = create_scatter_boxplot(dataset, job.x_var, job.y_var, output_path, has_z_column,
+                                  job.with_boxplot, job.annotation_type, density=job.density,
+                                  profile=profile, box_stats=box_stats)
+    return path, [job.x_var, job.y_var] + (['z'] if has_z_column else [])
+
+
+class _ThreadStdout(io.TextIOBase):
+    """
+    スレッドごとに出力先を切り替える sys.stdout の代わり
+
+    redirect_stdout はプロセス全体の sys.stdout を差し替えるので、スレッドで並列に描画すると
+    他のスレッドの出力まで取り込んでしまう。スレッドで実行する間はこれを sys.stdout にし、
+    各スレッドは capture で自分の出力先だけを切り替える。
+    """
+
+    def __init__(self, default):
+        self._default = default
+        self._local = threading.local()
+
+    def _target(self):
+        return getattr(self._local, 'target', None) or self._default
+
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+    @contextmanager
+    def capture(self, buffer: io.StringIO):
+        """このスレッドの出力だけを buffer に書き込む"""
+        previous = getattr(self._local, 'target', None)
+        self._local.target = buffer
+        try:
+            yield buffer
+        finally:
+            self._local.target = previous
+
+
+def _capture_stdout(buffer: io.StringIO):
+    """描画中のメッセージを buffer に取り込む（スレッドで実行中はそのスレッドの出力だけ）"""
+    if isinstance(sys.stdout, _ThreadStdout):
+        return sys.stdout.capture(buffer)
+    return redirect_stdout(buffer)
+
+
+def _run_job(job: RenderJob, verbose: bool = False, loader: Optional[Callable] = None,
+             profile: bool = False, tail=None, trace_memory: bool = True) -> JobResult:
+    """
+    ジョブを実行し、例外も含めて結果にまとめる（ワーカープロセス・スレッドで実行される）
+
+    Args:
+        job: 描画ジョブ
+        verbose: Trueの場合は描画中のメッセージをそのまま表示する
+        loader: ファイルパスから DataFrame または Dataset を返す関数（Noneの場合は load_csv_cached）
+        profile: Trueの場合は段階ごとの時間とメモリを計測して結果に含める
+        tail: 差分で読み込んでいるデータ（TailDataset、_render を参照）
+        trace_memory: Falseの場合はメモリを計測しない（tracemalloc はプロセス全体で1つなので、
+            スレッドで並列に描画するときは時間だけを測る）
+
+    Returns:
+        JobResult
+    """
+    from .profiling import RenderProfile, stage
+
+    start = time.perf_counter()
+    buffer = io.StringIO()
+    render_profile = None
+    if profile:
+        render_profile = RenderProfile(job.plot_type, trace_memory, file_path=job.file_path,
+                                       annotation_type=job.annotation_type, pid=os.getpid())
+
+    def run() -> Tuple[str, List[str]]:
+        df = None
+        if loader is not None:
+            with stage(render_profile, 'load'):
+                df = loader(job.file_path)
+        return _render(job, df, render_profile, tail)
+
+    def finish(output_path: Optional[str], error: Optional[str]) -> Optional[dict]:
+        if render_profile is None:
+            return None
+        render_profile.metadata.update(output_path=output_path, error=error)
+        return render_profile.finish()
+
+    try:
+        if verbose:
+            output_path, columns = run()
+        else:
+            with _capture_stdout(buffer):
+                output_path, columns = run()
+        return JobResult(job, output_path, None, time.perf_counter() - start, buffer.getvalue(),
+                         finish(output_path, None), columns)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        log = buffer.getvalue() + traceback.format_exc()
+        return JobResult(job, None, error, time.perf_counter() - start, log, finish(None, error))
+
+
+def expand_inputs(paths: List[str]) -> List[str]:
+    """
+    入力パスを展開（ディレクトリの場合は中のCSVファイルの一覧にする）
+
+    Args:
+        paths: ファイルまたはディレクトリのパスのリスト
+
+    Returns:
+        CSVファイルのパスのリスト
+    """
+    from .core import list_csv_files
+    
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(list_csv_files(path))
+        else:
+            files.append(path)
+    return files
+
+
+def report_result(result: JobResult) -> None:
+    """
+    ジョブ1件の結果を1行で表示
+
+    Args:
+        result: ジョブの実行結果
+    """
+    name = f"{os.path.basename(result.job.file_path)} [{result.job.plot_type}]"
+    if result.skipped:
+        print(f"- {name} -> {result.output_path} (変更なし、省略)")
+    elif result.error is None:
+        print(f"✓ {name} -> {result.output_path} ({result.seconds:.2f}秒)")
+    else:
+        print(f"✗ {name}: {result.error}")
+
+
+def print_summary(results: List[JobResult]) -> None:
+    """
+    全ジョブの成功・失敗件数を表示
+
+    Args:
+        results: ジョブの実行結果のリスト
+    """
+    n_failed = sum(1 for r in results if r.error is not None)
+    n_skipped = sum(1 for r in results if r.skipped)
+    print("=" * 50)
+    print(f"完了: 成功 {len(results) - n_failed - n_skipped}件 / 失敗 {n_failed}件 / 省略 {n_skipped}件")
+    print("=" * 50)
+
+
+def run_jobs(jobs: List[RenderJob], n_jobs: int = 1, verbose: bool = False,
+             profile: bool = False, manifest=None, force: bool = False,
+             threads: bool = False, shared: bool = False, mmap: bool = False) -> List[JobResult]:
+    """
+    複数のジョブを実行し、完了したものから結果を表示
+
+    Args:
+        jobs: 描画ジョブのリスト
+        n_jobs: 並列に実行するプロセス数（threads=True の場合はスレッド数、1の場合は現在のプロセスで順に実行）
+        verbose: Trueの場合は描画中のメッセージを表示する
+        profile: Trueの場合は段階ごとの計測結果を JobResult.metrics に含める
+        manifest: ビルドマニフェスト（BuildManifest）。指定すると前回から変更のないジョブを省略し、
+            実行結果を記録する
+        force: Trueの場合はマニフェストがあっても全てのジョブを描画する
+        threads: Trueの場合はプロセスの代わりに現在のプロセスの n_jobs 個のスレッドで並列に実行する
+            （読み込んだデータをワーカーごとに読み直さず、全てのスレッドで共有する）
+        shared: Trueの場合は各ファイルを現在のプロセスで1回だけ読み込んで共有メモリに置き、
+            ワーカープロセスはそれをコピーせずに参照する
+        mmap: Trueの場合は数値列をメモリマップ用の形式でキャッシュに保存し、次回からは読み込まずに
+            メモリマップで開く（ワーカープロセスの間ではOSのページキャッシュが共有されるので、
+            shared を指定しても共有メモリには置かない）
+
+    Returns:
+        ジョブと同じ順序の JobResult のリスト
+    """
+    if manifest is not None:
+        pending, skipped = manifest.partition(jobs, force)
+        for result in skipped:
+            report_result(result)
+        done = {r.job: r for r in skipped}
+        done.update((r.job, r) for r in _execute(pending, n_jobs, verbose, profile, threads, shared, mmap))
+        for job in pending:
+            manifest.record(done[job])
+        manifest.save()
+        results = [done[job] for job in jobs]
+    else:
+        results = _execute(jobs, n_jobs, verbose, profile, threads, shared, mmap)
+
+    print_summary(results)
+    return results
+
+
+def _load_dataset(file_path: str):
+    """CSVを読み込んで Dataset にする（DataFrame のキャッシュを使う）"""
+    from .core import Dataset, load_csv_cached
+
+    return Dataset.from_frame(load_csv_cached(file_path))
+
+
+def _dataset_loader(mmap: bool) -> Callable:
+    """ファイルパスから Dataset を返す関数（mmap=True の場合はメモリマップで開く）"""
+    if mmap:
+        from .core.cache import load_dataset_cached
+        return load_dataset_cached
+    return _load_dataset
+
+
+def _last_file_loader(mmap: bool = False) -> Callable:
+    """
+    直前に読み込んだファイルの Dataset を使い回す読み込み関数を作成
+
+    ジョブはファイルごとにまとまって並んでいるので、同じファイルの複数のプロットタイプは
+    1回の読み込み・数値列の変換・統計量の計算を共有できる。
+    """
+    load_dataset = _dataset_loader(mmap)
+    last = {}
+
+    def load(file_path: str):
+        if file_path not in last:
+            last.clear()
+            last[file_path] = load_dataset(file_path)
+        return last[file_path]
+
+    return load
+
+
+def _shared_loader(jobs: List[RenderJob], mmap: bool = False) -> Callable:
+    """
+    スレッドの間で Dataset を共有する読み込み関数を作成
+
+    各ファイルは最初に必要になったスレッドが1回だけ読み込み、同じファイルを使う他のスレッドは
+    読み込みが終わるのを待って同じ Dataset を使う。そのファイルの最後のジョブが読み込んだら手放す。
+    """
+    load_dataset = _dataset_loader(mmap)
+    remaining = {}
+    for job in jobs:
+        remaining[job.file_path] = remaining.get(job.file_path, 0) + 1
+    locks = {path: threading.Lock() for path in remaining}
+    guard = threading.Lock()
+    datasets = {}
+
+    def load(file_path: str):
+        with locks[file_path]:
+            if file_path not in datasets:
+                datasets[file_path] = load_dataset(file_path)
+            dataset = datasets[file_path]
+        with guard:
+            remaining[file_path] -= 1
+            if remaining[file_path] == 0:
+                del datasets[file_path]
+        return dataset
+
+    return load
+
+
+def _run_shared_job(job: RenderJob, handle, verbose: bool, profile: bool) -> JobResult:
+    """
+    共有メモリ上のデータでジョブを実行（ワーカープロセスで実行される）
+
+    Args:
+        job: 描画ジョブ
+        handle: SharedDatasetHandle（Noneの場合はワーカーでファイルを読み込む）
+        verbose: Trueの場合は描画中のメッセージをそのまま表示する
+        profile: Trueの場合は段階ごとの計測結果を含める
+
+    Returns:
+        JobResult
+    """
+    from .core.shared import attach_dataset
+
+    loader = (lambda file_path: attach_dataset(handle)) if handle is not None else None
+    return _run_job(job, verbose, loader, profile)
+
+
+def _execute_shared(jobs: List[RenderJob], n_jobs: int, verbose: bool,
+                    profile: bool) -> List[Optional[JobResult]]:
+    """
+    ファイルごとに現在のプロセスで1回だけ読み込んで共有メモリに置き、ワーカープロセスで描画する
+
+    同時に共有メモリに置くファイルは n_jobs 個までにし、そのファイルのジョブが全て終わったら削除する。
+    """
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    from .core.cache import load_csv_cached
+    from .core.shared import SharedDataset
+
+    results: List[Optional[JobResult]] = [None] * len(jobs)
+    by_file = {}
+    for idx, job in enumerate(jobs):
+        by_file.setdefault(job.file_path, []).append(idx)
+
+    live = {}       # ファイルパス -> [SharedDataset, 残りのジョブ数]
+    load_logs = {}  # ファイルパス -> 読み込み時のメッセージ
+    running = {}    # Future -> ジョブの番号
+
+    def collect(done) -> None:
+        for future in done:
+            idx = running.pop(future)
+            result = future.result()
+            file_path = jobs[idx].file_path
+            if not verbose and load_logs.get(file_path):
+                result = result._replace(log=load_logs[file_path] + result.log)
+            results[idx] = result
+            report_result(result)
+            if file_path in live:
+                live[file_path][1] -= 1
+                if live[file_path][1] == 0:
+                    live.pop(file_path)[0].close()
+
+    try:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            for file_path, indices in by_file.items():
+                while len(live) >= n_jobs:
+                    collect(wait(running, return_when=FIRST_COMPLETED).done)
+
+                # 読み込みに失敗した場合はワーカーで読み込ませ、ジョブの失敗として報告する
+                handle = None
+                buffer = io.StringIO()
+                try:
+                    if verbose:
+                        shared = SharedDataset(load_csv_cached(file_path))
+                    else:
+                        with redirect_stdout(buffer):
+                            shared = SharedDataset(load_csv_cached(file_path))
+                    live[file_path] = [shared, len(indices)]
+                    handle = shared.handle
+                    load_logs[file_path] = buffer.getvalue()
+                except Exception:
+                    pass
+
+                for idx in indices:
+                    running[executor.submit(_run_shared_job, jobs[idx], handle, verbose, profile)] = idx
+            while running:
+                collect(wait(running, return_when=FIRST_COMPLETED).done)
+    finally:
+        for shared, _ in live.values():
+            shared.close()
+    return results
+
+
+def _execute(jobs: List[RenderJob], n_jobs: int, verbose: bool, profile: bool,
+             threads: bool = False, shared: bool = False, mmap: bool = False) -> List[JobResult]:
+    """ジョブを（必要なら並列に）実行し、完了したものから結果を表示"""
+    results: List[Optional[JobResult]] = [None] * len(jobs)
+
+    if n_jobs <= 1 or len(jobs) <= 1:
+        loader = _last_file_loader(mmap)
+        for idx, job in enumerate(jobs):
+            results[idx] = _run_job(job, verbose, loader, profile)
+            report_result(results[idx])
+    elif threads:
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        
+        loader = _shared_loader(jobs, mmap)
+        with redirect_stdout(_ThreadStdout(sys.stdout)), ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            futures = {executor.submit(_run_job, job, verbose, loader, profile, None, False): idx
+                       for idx, job in enumerate(jobs)}
+            for future in as_completed(futures):
+                idx = futures[future]
+                results[idx] = future.result()
+                report_result(results[idx])
+    elif shared and not mmap:
+        results = _execute_shared(jobs, n_jobs, verbose, profile)
+    else:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        
+        # メモリマップで開く場合、各ワーカーは同じファイルを開くのでデータはページキャッシュで共有される
+        loader = _dataset_loader(mmap) if mmap else None
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            futures = {executor.submit(_run_job, job, verbose, loader, profile): idx
+                       for idx, job in enumerate(jobs)}
+            for future in as_completed(futures):
+                idx = futures[future]
+                results[idx] = future.result()
+                report_result(results[idx])
+    return results
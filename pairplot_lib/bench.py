@@ -0,0 +1,385 @@
+"""
+ベンチマーク - 合成データで読み込み・描画の各経路の処理時間を計測し、基準値と比較する
+
+行数・列数・欠損値の割合・区切り文字・zのグループ数を変えた合成データを作成し、
+読み込み関数と描画関数のそれぞれについて処理時間を計測する。
+結果はJSONで保存でき、保存済みの基準値（ベースライン）より遅くなった経路を検出できる。
+"""
+import io
+import json
+import os
+import platform
+import time
+from contextlib import redirect_stdout
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from . import __version__
+
+# 基準値より何割遅くなったら性能低下とみなすか
+REGRESSION_THRESHOLD = 0.2
+
+# この秒数以下の差は計測のばらつきとみなして性能低下にしない
+REGRESSION_MIN_SECONDS = 0.05
+
+
+class BenchCase(NamedTuple):
+    """
+    ベンチマークに使う合成データの条件
+
+    Attributes:
+        rows: 行数
+        cols: 数値列の数
+        nan_fraction: 欠損値の割合
+        delimiter: 区切り文字
+        groups: z列のグループ数（0の場合はz列なし）
+    """
+    rows: int
+    cols: int
+    nan_fraction: float = 0.0
+    delimiter: str = ','
+    groups: int = 0
+
+    @property
+    def case_id(self) -> str:
+        """結果のキーに使う識別子（例: r1000_c4_n0.1_comma_g2）"""
+        name = DELIMITER_NAMES.get(self.delimiter, repr(self.delimiter))
+        return f"r{self.rows}_c{self.cols}_n{self.nan_fraction:g}_{name}_g{self.groups}"
+
+
+# 区切り文字 -> 識別子に使う名前
+DELIMITER_NAMES = {',': 'comma', '\t': 'tab', ';': 'semicolon', '|': 'pipe', ' ': 'space'}
+
+
+def _sweep(base: BenchCase, field: str, values: list) -> List[BenchCase]:
+    """base の1つの条件だけを変えたケースのリストを作成"""
+    return [base._replace(**{field: value}) for value in values]
+
+
+def _grid(base: BenchCase, rows: list, cols: list, nan_fractions: list, groups: list) -> List[BenchCase]:
+    """条件ごとに1軸ずつ変えたケースを重複なく並べる"""
+    cases = (_sweep(base, 'rows', rows) + _sweep(base, 'cols', cols)
+             + _sweep(base, 'nan_fraction', nan_fractions)
+             + _sweep(base, 'delimiter', list(DELIMITER_NAMES))
+             + _sweep(base, 'groups', groups))
+    return list(dict.fromkeys(cases))
+
+
+# ベンチマークのケース一覧（全ての組み合わせは多すぎるので、基準ケースから1軸ずつ変える）
+BENCH_GRIDS = {
+    'quick': _grid(BenchCase(1_000, 4, 0.0, ',', 2),
+                   rows=[1_000, 10_000, 100_000], cols=[2, 4, 8],
+                   nan_fractions=[0.0, 0.1], groups=[0, 2, 5]),
+    'full': _grid(BenchCase(100_000, 5, 0.0, ',', 2),
+                  rows=[1_000, 10_000, 100_000, 1_000_000, 10_000_000],
+                  cols=[2, 5, 10, 20, 50, 100],
+                  nan_fractions=[0.0, 0.01, 0.1, 0.5], groups=[0, 2, 5, 20]),
+}
+
+
+class BenchResult(NamedTuple):
+    """
+    1つの経路の計測結果
+
+    Attributes:
+        key: 結果の識別子（"ケース識別子/経路名"）
+        seconds: 繰り返し計測した中で最も短い秒数
+        stages: 描画経路の段階ごとの秒数（最も短かった回のもの）
+    """
+    key: str
+    seconds: float
+    stages: Dict[str, float]
+
+
+class Regression(NamedTuple):
+    """
+    基準値より遅くなった経路
+
+    Attributes:
+        key: 結果の識別子
+        baseline: 基準値の秒数
+        current: 今回の秒数
+    """
+    key: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline > 0 else float('inf')
+
+
+def ensure_case_file(case: BenchCase, work_dir: str, seed: int = 0) -> str:
+    """
+    ケースの合成データを作成（作成済みの場合はそのまま使う）
+
+    Args:
+        case: ベンチマークのケース
+        work_dir: 作業ディレクトリ
+        seed: 乱数のシード
+
+    Returns:
+        合成データのファイルパス
+    """
+    from .core.sample_data import generate_synthetic_csv
+
+    data_dir = os.path.join(work_dir, 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    file_path = os.path.join(data_dir, f"{case.case_id}_s{seed}.csv")
+    if not os.path.exists(file_path):
+        generate_synthetic_csv(file_path + '.tmp', case.rows, case.cols, case.nan_fraction,
+                               case.delimiter, case.groups, seed)
+        os.replace(file_path + '.tmp', file_path)
+    return file_path
+
+
+def _time(func: Callable, repeat: int, with_profile: bool = False):
+    """
+    関数を repeat 回実行し、最も短い秒数と段階ごとの秒数を返す
+
+    Args:
+        func: 計測する関数（with_profile の場合は RenderProfile を引数に取る）
+        repeat: 繰り返す回数
+        with_profile: Trueの場合は段階ごとの秒数も記録する
+
+    Returns:
+        (秒数, 段階ごとの秒数) のタプル
+    """
+    from .profiling import RenderProfile
+
+    best, best_stages = float('inf'), {}
+    for _ in range(repeat):
+        profile = RenderProfile('bench', trace_memory=False) if with_profile else None
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            func(profile) if with_profile else func()
+        seconds = time.perf_counter() - start
+        if seconds < best:
+            best = seconds
+            best_stages = {s['stage']: s['seconds'] for s in profile.stages} if profile else {}
+    return best, best_stages
+
+
+def run_case(case: BenchCase, work_dir: str, repeat: int = 3, seed: int = 0) -> List[BenchResult]:
+    """
+    1つのケースについて全ての読み込み・描画経路を計測
+
+    Args:
+        case: ベンチマークのケース
+        work_dir: 作業ディレクトリ（合成データ・キャッシュ・出力画像を置く）
+        repeat: 各経路を繰り返す回数（最も短い時間を採用）
+        seed: 合成データの乱数のシード
+
+    Returns:
+        BenchResult のリスト
+    """
+    from .core import CsvCache, load_csv_cached, load_csv_robust, load_csv_streaming, stream_pairplot_stats
+    from .core.sample_data import synthetic_column_names
+    from .plotters import create_basic_pairplot, create_colored_pairplot, create_scatter_boxplot
+
+    file_path = ensure_case_file(case, work_dir, seed)
+    cache = CsvCache(os.path.join(work_dir, 'cache'))
+    output_dir = os.path.join(work_dir, 'output')
+    os.makedirs(output_dir, exist_ok=True)
+
+    def output(name: str) -> str:
+        return os.path.join(output_dir, f"{case.case_id}_{name}.png")
+
+    def load_cold():
+        cache.invalidate(file_path)
+        load_csv_cached(file_path, cache=cache)
+
+    paths = {
+        'load_robust': lambda: load_csv_robust(file_path),
+        'load_streaming': lambda: load_csv_streaming(file_path, ['c0', 'c1']),
+        'load_cached_cold': load_cold,
+        'load_cached_warm': lambda: load_csv_cached(file_path, cache=cache),
+        'stats_streaming': lambda: stream_pairplot_stats(file_path, synthetic_column_names(case.cols)),
+        'stats_streaming_hist': lambda: stream_pairplot_stats(file_path, synthetic_column_names(case.cols),
+                                                              histograms=True, grouped=case.groups > 0),
+    }
+
+    results = [BenchResult(f"{case.case_id}/{name}", *_time(func, repeat)) for name, func in paths.items()]
+
+    with redirect_stdout(io.StringIO()):
+        df = load_csv_robust(file_path)
+    numeric_cols = [col for col in df.columns if col != 'z']
+
+    plots = {
+        'basic': lambda p: create_basic_pairplot(df, numeric_cols, output('basic'), 'none', profile=p),
+        'basic_correlation': lambda p: create_basic_pairplot(df, numeric_cols, output('basic_corr'),
+                                                             'correlation', profile=p),
+        'basic_regression': lambda p: create_basic_pairplot(df, numeric_cols, output('basic_reg'),
+                                                            'regression', profile=p),
+        'scatter': lambda p: create_scatter_boxplot(df, 'c0', 'c1', output('scatter'),
+                                                    case.groups > 0, False, 'none', profile=p),
+        'scatter_boxplot': lambda p: create_scatter_boxplot(df, 'c0', 'c1', output('scatter_box'),
+                                                            case.groups > 0, True, 'correlation', profile=p),
+    }
+    if case.groups > 0:
+        plots['colored'] = lambda p: create_colored_pairplot(df, output('colored'), 'none', profile=p)
+
+    for name, func in plots.items():
+        results.append(BenchResult(f"{case.case_id}/{name}", *_time(func, repeat, with_profile=True)))
+    return results
+
+
+def run_benchmarks(cases: List[BenchCase], work_dir: str, repeat: int = 3, seed: int = 0) -> dict:
+    """
+    全てのケースを計測し、JSONに保存できる結果をまとめる
+
+    Args:
+        cases: ベンチマークのケースのリスト
+        work_dir: 作業ディレクトリ
+        repeat: 各経路を繰り返す回数
+        seed: 合成データの乱数のシード
+
+    Returns:
+        計測結果の辞書（'environment' と 'results' を含む）
+    """
+    import matplotlib
+    import numpy as np
+    import pandas as pd
+
+    results = {}
+    for idx, case in enumerate(cases, 1):
+        print(f"[{idx}/{len(cases)}] {case.case_id}")
+        for result in run_case(case, work_dir, repeat, seed):
+            results[result.key] = {'seconds': result.seconds, 'stages': result.stages}
+            print(f"  {result.key.split('/', 1)[1]:<20} {result.seconds:8.3f}秒")
+
+    return {
+        'environment': {
+            'pairplot_lib': __version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'matplotlib': matplotlib.__version__,
+            'repeat': repeat,
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def save_results(report: dict, path: str) -> None:
+    """
+    計測結果をJSONファイルに保存
+
+    Args:
+        report: run_benchmarks の戻り値
+        path: 保存先のパス
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def load_results(path: str) -> dict:
+    """
+    保存済みの計測結果を読み込む
+
+    Args:
+        path: JSONファイルのパス
+
+    Returns:
+        計測結果の辞書
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def find_regressions(
+    report: dict,
+    baseline: dict,
+    threshold: float = REGRESSION_THRESHOLD,
+    min_seconds: float = REGRESSION_MIN_SECONDS
+) -> List[Regression]:
+    """
+    基準値と比べて遅くなった経路を検出
+
+    両方に存在する経路について、今回の秒数が基準値の (1 + threshold) 倍を超え、
+    かつ差が min_seconds を超えるものを性能低下とする。
+
+    Args:
+        report: 今回の計測結果
+        baseline: 基準値の計測結果
+        threshold: 許容する遅くなる割合
+        min_seconds: 許容する差の秒数
+
+    Returns:
+        Regression のリスト（遅くなった割合の大きい順）
+    """
+    regressions = []
+    for key, current in report['results'].items():
+        base = baseline['results'].get(key)
+        if base is None:
+            continue
+        if (current['seconds'] > base['seconds'] * (1.0 + threshold)
+                and current['seconds'] - base['seconds'] > min_seconds):
+            regressions.append(Regression(key, base['seconds'], current['seconds']))
+    return sorted(regressions, key=lambda r: r.ratio, reverse=True)
+
+
+def report_regressions(regressions: List[Regression], threshold: float = REGRESSION_THRESHOLD) -> None:
+    """
+    性能低下の一覧を表示
+
+    Args:
+        regressions: find_regressions の戻り値
+        threshold: 判定に使った割合（表示用）
+    """
+    print("=" * 60)
+    if not regressions:
+        print(f"✓ 基準値より{threshold:.0%}以上遅くなった経路はありません")
+    else:
+        print(f"✗ 基準値より{threshold:.0%}以上遅くなった経路: {len(regressions)}件")
+        for r in regressions:
+            print(f"  {r.key}: {r.baseline:.3f}秒 -> {r.current:.3f}秒 ({r.ratio:.2f}倍)")
+    print("=" * 60)
+
+
+def run_bench(
+    grid: str = 'quick',
+    work_dir: Optional[str] = None,
+    output_path: Optional[str] = None,
+    baseline_path: Optional[str] = None,
+    threshold: float = REGRESSION_THRESHOLD,
+    repeat: int = 3,
+    seed: int = 0
+) -> int:
+    """
+    ベンチマークを実行し、結果の保存と基準値との比較を行う
+
+    Args:
+        grid: BENCH_GRIDS のキー
+        work_dir: 作業ディレクトリ（Noneの場合は一時ディレクトリ）
+        output_path: 計測結果を保存するJSONファイル
+        baseline_path: 比較する基準値のJSONファイル
+        threshold: 性能低下とみなす遅くなる割合
+        repeat: 各経路を繰り返す回数
+        seed: 合成データの乱数のシード
+
+    Returns:
+        終了コード（性能低下があった場合は1）
+    """
+    import tempfile
+
+    if grid not in BENCH_GRIDS:
+        raise ValueError(f"エラー: 不明なグリッドです: {grid}")
+
+    if work_dir is None:
+        with tempfile.TemporaryDirectory(prefix='pairplot_bench_') as tmp:
+            report = run_benchmarks(BENCH_GRIDS[grid], tmp, repeat, seed)
+    else:
+        report = run_benchmarks(BENCH_GRIDS[grid], work_dir, repeat, seed)
+    report['grid'] = grid
+
+    if output_path:
+        save_results(report, output_path)
+        print(f"✓ 計測結果を保存しました: {output_path}")
+
+    if baseline_path:
+        regressions = find_regressions(report, load_results(baseline_path), threshold)
+        report_regressions(regressions, threshold)
+        return 1 if regressions else 0
+    return 0
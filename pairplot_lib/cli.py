@@ -3,24 +3,25 @@ CLIメインロジック - ユーザーインターフェースとプロッタ
 """
 import sys
 import os
-from typing import Optional
+import argparse
+from typing import List, Optional
 
-from .config import DATA_DIR, OUTPUT_DIR
-from .core import (
-    list_csv_files,
-    select_csv_file,
-    load_csv_robust,
-    get_numeric_columns,
-    select_columns_interactive
-)
+from .config import DATA_DIR, OUTPUT_DIR, SERVER_HOST, SERVER_PORT, STREAMING_THRESHOLD_BYTES
 from .core.file_utils import ensure_output_dir, generate_output_path, get_base_name
 from .core.sample_data import create_sample_data_files
-from .plotters import (
-    create_basic_pairplot,
-    create_colored_pairplot,
-    create_scatter_boxplot
+from .batch import (
+    ANNOTATION_TYPES,
+    PLOT_TYPES,
+    RenderJob,
+    expand_inputs,
+    print_summary,
+    report_result,
+    run_jobs
 )
 
+# pandas・matplotlib などの重いモジュールは、実際にデータを読み込む・描画する関数の中で読み込む
+# （`pairplot init` や `--help` では読み込まない）
+
 
 def display_menu() -> int:
     """
@@ -62,10 +63,47 @@ def display_menu() -> int:
             sys.exit(0)
 
 
+def is_large_file(file_path: str) -> bool:
+    """
+    ストリーミング読み込みを使うべき大きさのファイルかどうか
+    
+    Args:
+        file_path: CSVファイルのパス
+        
+    Returns:
+        STREAMING_THRESHOLD_BYTES を超える場合はTrue
+    """
+    return os.path.getsize(file_path) > STREAMING_THRESHOLD_BYTES
+
+
+def load_numeric_data(file_path: str):
+    """
+    ペアプロット用にデータを読み込む
+    大きなファイルは先頭行から数値列を判定し、数値列（と'z'列）のみを読み込む
+    
+    Args:
+        file_path: CSVファイルのパス
+        
+    Returns:
+        読み込まれたDataFrame
+    """
+    from .core import get_numeric_columns, load_csv_cached, load_csv_preview
+    
+    if not is_large_file(file_path):
+        return load_csv_cached(file_path)
+    
+    preview = load_csv_preview(file_path)
+    numeric_cols = get_numeric_columns(preview, exclude_cols=['z'])
+    return load_csv_cached(file_path, columns=numeric_cols)
+
+
 def run_basic_pairplot(data_dir: str = DATA_DIR, output_dir: str = OUTPUT_DIR) -> None:
     """
     基本ペアプロット（相関係数表示）の実行
     """
+    from .core import list_csv_files, select_csv_file, get_numeric_columns
+    from .plotters import create_basic_pairplot
+    
     print("\n【基本ペアプロット】")
     
     # 出力ディレクトリを確保
@@ -81,7 +119,7 @@ def run_basic_pairplot(data_dir: str = DATA_DIR, output_dir: str = OUTPUT_DIR) -
     selected_file = select_csv_file(csv_files)
     
     # データ読み込み
-    df = load_csv_robust(selected_file)
+    df = load_numeric_data(selected_file)
     
     # 数値列の取得
     numeric_cols = get_numeric_columns(df)
@@ -128,6 +166,9 @@ def run_colored_pairplot(data_dir: str = DATA_DIR, output_dir: str = OUTPUT_DIR)
     """
     色分けペアプロット（z列による分類）の実行
     """
+    from .core import list_csv_files, select_csv_file
+    from .plotters import create_colored_pairplot
+    
     print("\n【色分けペアプロット】")
     
     # 出力ディレクトリを確保
@@ -143,7 +184,7 @@ def run_colored_pairplot(data_dir: str = DATA_DIR, output_dir: str = OUTPUT_DIR)
     selected_file = select_csv_file(csv_files)
     
     # データ読み込み
-    df = load_csv_robust(selected_file)
+    df = load_numeric_data(selected_file)
     
     # 出力パスの生成
     base_name = get_base_name(selected_file)
@@ -192,6 +233,16 @@ def run_scatter_boxplot(data_dir: str = DATA_DIR, output_dir: str = OUTPUT_DIR)
     """
     散布図の実行（箱ひげ図はオプション）
     """
+    from .core import (
+        list_csv_files,
+        select_csv_file,
+        load_csv_cached,
+        load_csv_preview,
+        get_numeric_columns,
+        select_columns_interactive
+    )
+    from .plotters import create_scatter_boxplot
+    
     print("\n【散布図】")
     
     # 出力ディレクトリを確保
@@ -206,8 +257,12 @@ def run_scatter_boxplot(data_dir: str = DATA_DIR, output_dir: str = OUTPUT_DIR)
     # ファイル選択
     selected_file = select_csv_file(csv_files)
     
-    # データ読み込み
-    df = load_csv_robust(selected_file)
+    # データ読み込み（大きなファイルは先頭行のみ読み込み、列の選択後に必要な列だけを読み込む）
+    streaming = is_large_file(selected_file)
+    if streaming:
+        df = load_csv_preview(selected_file)
+    else:
+        df = load_csv_cached(selected_file)
     
     # z列が含まれているか確認
     has_z_column = 'z' in df.columns
@@ -230,6 +285,9 @@ def run_scatter_boxplot(data_dir: str = DATA_DIR, output_dir: str = OUTPUT_DIR)
     # Y軸の変数を選択
     y_var = select_columns_interactive(plot_cols, "\nY軸に使用する変数を選択してください:")
     
+    if streaming:
+        df = load_csv_cached(selected_file, columns=[x_var, y_var])
+    
     # 箱ひげ図を追加するか確認
     print("\n箱ひげ図を追加しますか？")
     print("1. はい（散布図 + 箱ひげ図）")
@@ -341,18 +399,207 @@ def init_workspace() -> None:
     print("=" * 60 + "\n")
 
 
-def main(data_dir: Optional[str] = None, output_dir: Optional[str] = None) -> None:
+def add_job_arguments(parser: argparse.ArgumentParser, parallel: bool = True) -> None:
+    """
+    描画ジョブの指定に使う引数を追加（render・watch・tail で共通）
+    
+    Args:
+        parser: 引数を追加するパーサー
+        parallel: Trueの場合は並列プロセス数の指定（-j）も追加する
+    """
+    parser.add_argument('--type', dest='plot_types', action='append', choices=PLOT_TYPES,
+                        help='プロットタイプ（複数指定可、既定: basic）')
+    parser.add_argument('--annotate', choices=ANNOTATION_TYPES, default='none',
+                        help='相関係数・回帰直線の表示（既定: none）')
+    parser.add_argument('--x', dest='x_var', help='散布図のX軸の列名')
+    parser.add_argument('--y', dest='y_var', help='散布図のY軸の列名')
+    parser.add_argument('--boxplot', action='store_true', help='散布図に箱ひげ図を追加')
+    parser.add_argument('--corner', action='store_true', help='ペアプロットの上三角を描画しない')
+    density_group = parser.add_mutually_exclusive_group()
+    density_group.add_argument('--density', dest='density', action='store_const', const=True,
+                               help='散布図を常に密度表示にする')
+    density_group.add_argument('--no-density', dest='density', action='store_const', const=False,
+                               help='散布図を常に点で描画する')
+    parser.add_argument('--tile-jobs', type=int, metavar='N',
+                        help='ペアプロットのパネルをタイルに分けて N 個のプロセスで並列に描画する（列数が多い場合に速い）')
+    parser.add_argument('--panel-cache', action='store_true',
+                        help='ペアプロットの描画済みパネルをキャッシュし、内容が変わったパネルだけを描画する（タイル描画になる）')
+    parser.add_argument('--output-dir', help='出力フォルダ（既定: output/）')
+    if parallel:
+        parser.add_argument('-j', '--jobs', type=int, default=1,
+                            help='並列に描画するプロセス数（既定: 1）')
+
+
+def build_jobs(args: argparse.Namespace, files: List[str], output_dir: str) -> List[RenderJob]:
+    """
+    add_job_arguments の引数から、ファイルごと・プロットタイプごとの描画ジョブを作成
+    
+    Args:
+        args: コマンドライン引数
+        files: 入力ファイルのリスト
+        output_dir: 出力ディレクトリ
+        
+    Returns:
+        描画ジョブのリスト
+    """
+    plot_types = list(dict.fromkeys(args.plot_types or ['basic']))
+    return [
+        RenderJob(file_path, plot_type, output_dir, args.annotate,
+                  args.x_var, args.y_var, args.boxplot, args.corner, args.density, args.tile_jobs,
+                  args.panel_cache)
+        for file_path in files
+        for plot_type in plot_types
+    ]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    コマンドライン引数のパーサーを作成
+    
+    Returns:
+        ArgumentParser
+    """
+    parser = argparse.ArgumentParser(
+        prog='pairplot',
+        description='CSVデータから白黒のペアプロット・散布図を生成します。'
+                    'サブコマンドを省略すると対話モードで起動します。'
+    )
+    subparsers = parser.add_subparsers(dest='command')
+    
+    subparsers.add_parser('init', help='data/ と output/ フォルダとサンプルデータを作成')
+    
+    cache_parser = subparsers.add_parser('clear-cache', help='読み込み済みデータのキャッシュを削除')
+    cache_parser.add_argument('file', nargs='?', help='このファイルのキャッシュのみ削除')
+    
+    render_parser = subparsers.add_parser('render', help='対話なしで画像を生成（バッチ処理）')
+    render_parser.add_argument('inputs', nargs='*',
+                               help='CSVファイルまたはフォルダ（省略時は data/ フォルダ）')
+    add_job_arguments(render_parser)
+    pool_group = render_parser.add_mutually_exclusive_group()
+    pool_group.add_argument('--threads', action='store_true',
+                            help='-j の並列描画をプロセスではなくスレッドで行う（読み込んだデータを共有する）')
+    pool_group.add_argument('--shared-memory', dest='shared_memory', action='store_true',
+                            help='各ファイルを1回だけ読み込んで共有メモリに置き、-j のワーカープロセスで共有する')
+    render_parser.add_argument('--mmap', action='store_true',
+                               help='数値列をキャッシュにメモリマップ用の形式で保存し、次回から読み込まずに開く')
+    render_parser.add_argument('-v', '--verbose', action='store_true', help='描画中のメッセージを表示')
+    render_parser.add_argument('--server', metavar='URL',
+                               help='描画サーバー（pairplot serve）にジョブを送信して描画させる')
+    render_parser.add_argument('--force', action='store_true',
+                               help='入力と条件が前回と同じでも全て描画し直す')
+    render_parser.add_argument('--profile', metavar='PATH',
+                               help='段階ごとの時間とメモリの計測結果をJSON Lines形式で追記するファイル')
+
+    watch_parser = subparsers.add_parser('watch', help='data/ フォルダを監視し、追加・変更されたCSVを自動で描画')
+    add_job_arguments(watch_parser)
+    watch_parser.add_argument('--interval', type=float, default=1.0,
+                              help='フォルダを確認する間隔（秒、既定: 1）')
+    watch_parser.add_argument('--debounce', type=float, default=2.0,
+                              help='最後の変更から描画までに待つ秒数（既定: 2）')
+
+    tail_parser = subparsers.add_parser('tail', help='追記され続けるCSVを監視し、追記された行だけを読み込んで描画し直す')
+    tail_parser.add_argument('file', help='監視するCSVファイル')
+    add_job_arguments(tail_parser, parallel=False)
+    tail_parser.add_argument('--interval', type=float, default=1.0,
+                             help='ファイルを確認する間隔（秒、既定: 1）')
+    
+    serve_parser = subparsers.add_parser('serve', help='描画サーバーを起動（重いモジュールとデータを常駐）')
+    serve_parser.add_argument('--host', default=SERVER_HOST, help=f'待ち受けるホスト（既定: {SERVER_HOST}）')
+    serve_parser.add_argument('--port', type=int, default=SERVER_PORT, help=f'待ち受けるポート（既定: {SERVER_PORT}）')
+    serve_parser.add_argument('-j', '--jobs', type=int, default=1, help='ワーカープロセス数（既定: 1）')
+    
+    bench_parser = subparsers.add_parser('bench', help='合成データで読み込み・描画の処理時間を計測')
+    bench_parser.add_argument('--grid', choices=['quick', 'full'], default='quick',
+                              help='計測するデータの条件の一覧（既定: quick、full は最大1千万行・100列）')
+    bench_parser.add_argument('--output', metavar='PATH', help='計測結果を保存するJSONファイル')
+    bench_parser.add_argument('--baseline', metavar='PATH',
+                              help='比較する基準値のJSONファイル（遅くなった経路があれば終了コード1）')
+    bench_parser.add_argument('--threshold', type=float, default=0.2,
+                              help='性能低下とみなす遅くなる割合（既定: 0.2 = 20%%）')
+    bench_parser.add_argument('--repeat', type=int, default=3, help='各経路を繰り返す回数（既定: 3）')
+    bench_parser.add_argument('--seed', type=int, default=0, help='合成データの乱数のシード（既定: 0）')
+    bench_parser.add_argument('--work-dir', help='合成データを置くフォルダ（指定すると次回も再利用する）')
+    
+    return parser
+
+
+def run_render(args: argparse.Namespace, data_dir: str, output_dir: str) -> int:
+    """
+    render サブコマンドの実行
+    
+    Args:
+        args: コマンドライン引数
+        data_dir: 入力省略時に使うデータディレクトリ
+        output_dir: 出力ディレクトリ
+        
+    Returns:
+        終了コード（全て成功した場合は0）
+    """
+    files = expand_inputs(args.inputs or [data_dir])
+    if not files:
+        print("エラー: CSVファイルが見つかりません。")
+        return 1
+    
+    from .manifest import BuildManifest
+    
+    output_dir = args.output_dir or output_dir
+    jobs = build_jobs(args, files, output_dir)
+    
+    # 出力フォルダのマニフェストで、前回から入力も条件も変わっていないジョブを省略する
+    manifest = BuildManifest(output_dir)
+    
+    if args.server:
+        from .server import submit_jobs
+        
+        pending, skipped = manifest.partition(jobs, args.force)
+        for result in skipped:
+            report_result(result)
+        try:
+            rendered = submit_jobs(pending, args.server, profile=bool(args.profile)) if pending else []
+        except OSError as e:
+            print(f"エラー: 描画サーバーに接続できませんでした（{args.server}）: {e}")
+            return 1
+        for result in rendered:
+            if args.verbose:
+                print(result.log, end='')
+            report_result(result)
+            manifest.record(result)
+        manifest.save()
+        results = skipped + rendered
+        print_summary(results)
+    else:
+        results = run_jobs(jobs, args.jobs, args.verbose, profile=bool(args.profile),
+                           manifest=manifest, force=args.force, threads=args.threads,
+                           shared=args.shared_memory, mmap=args.mmap)
+    
+    # 計測結果を1描画1行のJSONとして追記
+    if args.profile:
+        from .profiling import append_json_record
+        
+        for result in results:
+            if result.metrics is not None:
+                append_json_record(args.profile, result.metrics)
+        print(f"✓ 計測結果を保存しました: {args.profile}")
+    return 0 if all(r.error is None for r in results) else 1
+
+
+def main(
+    data_dir: Optional[str] = None,
+    output_dir: Optional[str] = None,
+    argv: Optional[List[str]] = None
+) -> None:
     """
     メインエントリーポイント
     
     Args:
         data_dir: データディレクトリ（指定がない場合はデフォルト使用）
         output_dir: 出力ディレクトリ（指定がない場合はデフォルト使用）
+        argv: コマンドライン引数（指定がない場合は sys.argv を使用）
     """
-    # コマンドライン引数をチェック（initコマンド）
-    if len(sys.argv) > 1 and sys.argv[1] == 'init':
-        init_workspace()
-        return
+    args = build_parser().parse_args(argv)
+    
+    # GUIバックエンドを探さずに、画像保存用のAggバックエンドを使う
+    os.environ.setdefault('MPLBACKEND', 'Agg')
     
     # デフォルト値の設定
     if data_dir is None:
@@ -360,6 +607,55 @@ def main(data_dir: Optional[str] = None, output_dir: Optional[str] = None) -> No
     if output_dir is None:
         output_dir = OUTPUT_DIR
     
+    # 作業ディレクトリの初期化（pairplot init）
+    if args.command == 'init':
+        init_workspace()
+        return
+    
+    # キャッシュ削除コマンド（pairplot clear-cache [ファイル]）
+    if args.command == 'clear-cache':
+        from .core import clear_cache
+        removed = clear_cache(args.file)
+        if args.file is None:
+            # 描画済みパネルのキャッシュは特定のファイルのものではないので、全削除のときだけ削除する
+            from .plotters.panel_cache import PanelCache
+            removed += PanelCache().clear()
+        print(f"✓ キャッシュを削除しました（{removed}件）")
+        return
+    
+    # 描画サーバーの起動（pairplot serve）
+    if args.command == 'serve':
+        from .server import serve
+        serve(args.host, args.port, args.jobs)
+        return
+    
+    # データフォルダの監視（pairplot watch ...）
+    if args.command == 'watch':
+        from .watch import watch
+        templates = build_jobs(args, [''], args.output_dir or output_dir)
+        watch(data_dir, templates, args.jobs, args.interval, args.debounce)
+        return
+    
+    # CSVへの追記の監視（pairplot tail FILE ...）
+    if args.command == 'tail':
+        from .watch import follow
+        if not os.path.isfile(args.file):
+            print(f"エラー: ファイル '{args.file}' が見つかりません。")
+            sys.exit(1)
+        templates = build_jobs(args, [''], args.output_dir or output_dir)
+        follow(args.file, templates, args.interval)
+        return
+    
+    # ベンチマーク（pairplot bench ...）
+    if args.command == 'bench':
+        from .bench import run_bench
+        sys.exit(run_bench(args.grid, args.work_dir, args.output, args.baseline,
+                           args.threshold, args.repeat, args.seed))
+    
+    # 非対話のバッチ描画（pairplot render ...）
+    if args.command == 'render':
+        sys.exit(run_render(args, data_dir, output_dir))
+    
     try:
         # メニュー表示と選択
         choice = display_menu()
@@ -384,4 +680,3 @@ def main(data_dir: Optional[str] = None, output_dir: Optional[str] = None) -> No
 
 if __name__ == '__main__':
     main()
-
@@ -12,3 +12,22 @@ CURRENT_DIR = os.getcwd()
 DATA_DIR = os.path.join(CURRENT_DIR, 'data')
 OUTPUT_DIR = os.path.join(CURRENT_DIR, 'output')
 
+
+# 読み込み済みデータのキャッシュフォルダと上限サイズ（環境変数で上書き可能）
+CACHE_DIR = os.environ.get('PAIRPLOT_CACHE_DIR', os.path.join(CURRENT_DIR, '.pairplot_cache'))
+CACHE_MAX_BYTES = int(os.environ.get('PAIRPLOT_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+CACHE_ENABLED = os.environ.get('PAIRPLOT_CACHE', '1') != '0'
+
+# 描画済みパネルのキャッシュフォルダと上限サイズ（--panel-cache で使う）
+PANEL_CACHE_DIR = os.environ.get('PAIRPLOT_PANEL_CACHE_DIR', os.path.join(CACHE_DIR, 'panels'))
+PANEL_CACHE_MAX_BYTES = int(os.environ.get('PAIRPLOT_PANEL_CACHE_MAX_BYTES', 1024 ** 3))
+
+# このサイズを超えるCSVは必要な列だけをストリーミングで読み込む
+STREAMING_THRESHOLD_BYTES = int(os.environ.get('PAIRPLOT_STREAMING_THRESHOLD_BYTES', 256 * 1024 ** 2))
+
+# 行数がこれを超える場合、散布図を点ではなく密度（2次元ヒストグラム）で描画する
+DENSITY_THRESHOLD_ROWS = int(os.environ.get('PAIRPLOT_DENSITY_THRESHOLD_ROWS', 200_000))
+
+# 描画サーバー（pairplot serve）の既定の待ち受けアドレス
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8765
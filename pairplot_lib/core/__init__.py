@@ -1,26 +1,53 @@
 """
 Core module - データ読み込みとファイル操作の共通機能
+
+pandas などの重いモジュールは、各関数が最初に使われたときに読み込む
+（`pairplot init` や `--help` の起動を速くするため）。
 """
+import importlib
+
+# 公開名 -> 定義しているサブモジュール
+_LAZY_IMPORTS = {
+    'list_csv_files': '.data_loader',
+    'select_csv_file': '.data_loader',
+    'load_csv_robust': '.data_loader',
+    'load_csv_preview': '.data_loader',
+    'load_csv_streaming': '.data_loader',
+    'stream_pairplot_stats': '.data_loader',
+    'sniff_dialect': '.data_loader',
+    'Dialect': '.data_loader',
+    'get_numeric_columns': '.data_loader',
+    'select_columns_interactive': '.data_loader',
+    'CsvCache': '.cache',
+    'load_csv_cached': '.cache',
+    'load_dataset_cached': '.cache',
+    'clear_cache': '.cache',
+    'Dataset': '.dataset',
+    'as_dataset': '.dataset',
+    'SharedDataset': '.shared',
+    'attach_dataset': '.shared',
+    'write_numeric_store': '.store',
+    'open_numeric_store': '.store',
+    'TailDataset': '.tail',
+    'ColumnHistogram': '.histogram',
+    'GroupIndex': '.groups',
+    'QuantileSketch': '.quantiles',
+    'boxplot_stats': '.quantiles',
+    'ensure_output_dir': '.file_utils',
+    'generate_output_path': '.file_utils',
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
 
-from .data_loader import (
-    list_csv_files,
-    select_csv_file,
-    load_csv_robust,
-    get_numeric_columns,
-    select_columns_interactive
-)
-from .file_utils import (
-    ensure_output_dir,
-    generate_output_path
-)
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(_LAZY_IMPORTS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-__all__ = [
-    'list_csv_files',
-    'select_csv_file',
-    'load_csv_robust',
-    'get_numeric_columns',
-    'select_columns_interactive',
-    'ensure_output_dir',
-    'generate_output_path'
-]
 
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,464 @@
+"""
+解析済みCSVのディスクキャッシュ
+
+load_csv_robust の結果（クリーニング済みDataFrame）をバイナリの列指向形式で保存し、
+ファイルが変更されていなければ次回以降はテキストを解析せずに読み込む。
+キーはパス・サイズ・更新時刻・内容のハッシュから作るフィンガープリント。
+数値列だけをメモリマップ用の形式（store.py）で保存し、読み込まずに開くこともできる。
+
+render -j のワーカーや watch・serve の複数のプロセスが同じキャッシュを使うので、
+index.json の読み込み・変更・書き込みはロックファイルで排他する。
+"""
+import os
+import json
+import shutil
+import hashlib
+import threading
+import contextlib
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from ..config import CACHE_DIR, CACHE_MAX_BYTES, CACHE_ENABLED
+from .data_loader import load_csv_robust, load_csv_streaming
+from .dataset import Dataset
+from .store import open_numeric_store, write_numeric_store
+
+# キャッシュ形式のバージョン（読み込み処理を変えたら上げる）
+CACHE_FORMAT_VERSION = 1
+
+# 内容ハッシュに使うブロックサイズ（先頭・中央・末尾の3ブロックを読む）
+HASH_BLOCK_BYTES = 1024 * 1024
+
+INDEX_FILE_NAME = 'index.json'
+LOCK_FILE_NAME = 'index.lock'
+
+# キャッシュのデータファイル（エントリごとに1つ）の拡張子
+DATA_SUFFIXES = ('.feather', '.pickle', '.store')
+
+try:
+    import fcntl
+except ImportError:
+    # Windows ではプロセス間の排他はせず、同じプロセスのスレッド間だけ排他する
+    fcntl = None
+
+_THREAD_LOCK = threading.Lock()
+
+try:
+    import pyarrow  # noqa: F401
+    _HAS_PYARROW = True
+except ImportError:
+    _HAS_PYARROW = False
+
+
+def fingerprint_file(file_path: str) -> str:
+    """
+    ファイルのフィンガープリントを計算
+
+    パス・サイズ・更新時刻に加えて、先頭・中央・末尾のブロックの内容ハッシュを使う。
+    巨大なファイルでも読むのは最大3ブロックなので一定時間で終わる。
+
+    Args:
+        file_path: ファイルのパス
+
+    Returns:
+        16進数のフィンガープリント文字列
+    """
+    abs_path = os.path.abspath(file_path)
+    st = os.stat(abs_path)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{CACHE_FORMAT_VERSION}|{abs_path}|{st.st_size}|{st.st_mtime_ns}".encode('utf-8'))
+
+    with open(abs_path, 'rb') as f:
+        if st.st_size <= 3 * HASH_BLOCK_BYTES:
+            h.update(f.read())
+        else:
+            for offset in (0, st.st_size // 2, st.st_size - HASH_BLOCK_BYTES):
+                f.seek(offset)
+                h.update(f.read(HASH_BLOCK_BYTES))
+
+    return h.hexdigest()
+
+
+class CsvCache:
+    """
+    サイズ上限付きLRUのDataFrameキャッシュ
+
+    データはエントリごとに1ファイルで保存し（pyarrowがあればFeather、なければpickle）、
+    エントリの元ファイル・サイズは index.json で管理する。
+    メモリマップ用の形式のエントリ（put_dataset）はエントリごとに1ディレクトリで保存する。
+    最終アクセス時刻は plotters/panel_cache.py と同じくデータファイルの更新時刻で管理するので、
+    読み込みのたびに index.json を書き直さない。
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, INDEX_FILE_NAME)
+        self.lock_path = os.path.join(cache_dir, LOCK_FILE_NAME)
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        """index.json の読み込みから書き込みまでを他のプロセス・スレッドと排他する"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with _THREAD_LOCK, open(self.lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_index(self) -> Dict[str, dict]:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index: Dict[str, dict]) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.index_path)
+
+    def _remove_file(self, file_name: str) -> None:
+        path = os.path.join(self.cache_dir, file_name)
+        try:
+            if os.path.isdir(path):
+                # メモリマップで開いている間に削除しても、開いている側は閉じるまで読める
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError:
+            pass
+
+    def _remove_entry(self, index: Dict[str, dict], key: str) -> None:
+        entry = index.pop(key, None)
+        if entry:
+            self._remove_file(entry['file'])
+
+    def _discard(self, key: str) -> None:
+        """壊れたエントリを削除して読み込み直させる"""
+        with self._locked():
+            index = self._load_index()
+            self._remove_entry(index, key)
+            self._save_index(index)
+
+    def _touch(self, entry: dict) -> None:
+        """最終アクセス時刻としてデータファイルの更新時刻を現在時刻にする"""
+        try:
+            os.utime(os.path.join(self.cache_dir, entry['file']))
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        キャッシュからDataFrameを取得（なければNone）
+
+        Args:
+            key: fingerprint_file で計算したキー
+
+        Returns:
+            キャッシュされたDataFrame、またはNone
+        """
+        index = self._load_index()
+        entry = index.get(key)
+        if entry is None or entry['format'] == 'store':
+            return None
+
+        data_path = os.path.join(self.cache_dir, entry['file'])
+        try:
+            if entry['format'] == 'feather':
+                df = pd.read_feather(data_path)
+            else:
+                df = pd.read_pickle(data_path)
+        except Exception:
+            self._discard(key)
+            return None
+
+        df.attrs.update(entry.get('attrs', {}))
+        self._touch(entry)
+        return df
+
+    def put(self, key: str, df: pd.DataFrame, source_path: str, fingerprint: str = '') -> None:
+        """
+        DataFrameをキャッシュに保存し、上限を超えた分を古い順に削除
+
+        Args:
+            key: エントリのキー
+            df: 保存するDataFrame
+            source_path: 元のCSVファイルのパス
+            fingerprint: 元ファイルのフィンガープリント（変更前の古いエントリの削除に使う）
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fmt = 'feather' if _HAS_PYARROW else 'pickle'
+        file_name = f"{key}.{fmt}"
+        data_path = os.path.join(self.cache_dir, file_name)
+        tmp_path = f"{data_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            if fmt == 'feather':
+                df.reset_index(drop=True).to_feather(tmp_path)
+            else:
+                df.to_pickle(tmp_path)
+            os.replace(tmp_path, data_path)
+        except BaseException:
+            # 保存できない列（pyarrowが扱えない型など）があった場合も一時ファイルを残さない
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+
+        self._register(key, file_name, fmt, source_path, fingerprint, os.path.getsize(data_path), df.attrs)
+
+    def get_dataset(self, key: str) -> Optional[Dataset]:
+        """
+        メモリマップ用の形式で保存したエントリを開く（なければNone）
+
+        Args:
+            key: エントリのキー
+
+        Returns:
+            配列がキャッシュのファイルを直接参照する Dataset、またはNone
+        """
+        index = self._load_index()
+        entry = index.get(key)
+        if entry is None or entry['format'] != 'store':
+            return None
+
+        try:
+            dataset = open_numeric_store(os.path.join(self.cache_dir, entry['file']))
+        except (OSError, ValueError):
+            self._discard(key)
+            return None
+
+        self._touch(entry)
+        return dataset
+
+    def put_dataset(self, key: str, df: pd.DataFrame, source_path: str, fingerprint: str = '') -> None:
+        """
+        DataFrameの数値列と'z'列をメモリマップ用の形式で保存し、上限を超えた分を古い順に削除
+
+        Args:
+            key: エントリのキー
+            df: 保存するDataFrame
+            source_path: 元のCSVファイルのパス
+            fingerprint: 元ファイルのフィンガープリント（変更前の古いエントリの削除に使う）
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        dir_name = f"{key}.store"
+        data_path = os.path.join(self.cache_dir, dir_name)
+        tmp_path = f"{data_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            write_numeric_store(df, tmp_path)
+            if os.path.isdir(data_path):
+                # 他のプロセスが先に保存した（同じ内容なのでそちらを使う）
+                shutil.rmtree(tmp_path)
+            else:
+                os.rename(tmp_path, data_path)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+        n_bytes = sum(entry.stat().st_size for entry in os.scandir(data_path))
+        self._register(key, dir_name, 'store', source_path, fingerprint, n_bytes, df.attrs)
+
+    def _register(self, key: str, file_name: str, fmt: str, source_path: str, fingerprint: str,
+                  n_bytes: int, attrs: dict) -> None:
+        """保存したエントリを index.json に追加し、上限を超えた分を古い順に削除"""
+        abs_source = os.path.abspath(source_path)
+        with self._locked():
+            index = self._load_index()
+
+            # 同じファイルの変更前のエントリは不要になるので削除
+            for old_key in [k for k, e in index.items()
+                            if e.get('source') == abs_source and e.get('fingerprint') != fingerprint]:
+                self._remove_entry(index, old_key)
+
+            index[key] = {
+                'file': file_name,
+                'format': fmt,
+                'source': abs_source,
+                'fingerprint': fingerprint,
+                'bytes': n_bytes,
+                'attrs': attrs,
+            }
+            self._evict(index)
+            self._save_index(index)
+
+    def _evict(self, index: Dict[str, dict]) -> None:
+        """
+        合計サイズが上限を超えている間、最終アクセスが古いものから削除
+
+        index.json にないデータファイル（中断したプロセスの残骸など）もサイズに数え、古い順に削除する。
+        保存中の一時ファイル（.tmp）は数えない。
+        """
+        keys = {e['file']: k for k, e in index.items()}
+        try:
+            items = [item for item in os.scandir(self.cache_dir) if item.name.endswith(DATA_SUFFIXES)]
+        except OSError:
+            return
+
+        files = []
+        for item in items:
+            key = keys.get(item.name)
+            try:
+                mtime = item.stat().st_mtime
+                if key is not None:
+                    n_bytes = index[key]['bytes']
+                elif item.is_dir():
+                    n_bytes = sum(sub.stat().st_size for sub in os.scandir(item.path))
+                else:
+                    n_bytes = item.stat().st_size
+            except OSError:
+                continue
+            files.append((mtime, n_bytes, item.name, key))
+
+        total = sum(n_bytes for _, n_bytes, _, _ in files)
+        for _, n_bytes, file_name, key in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if key is None:
+                self._remove_file(file_name)
+            else:
+                self._remove_entry(index, key)
+            total -= n_bytes
+
+    def invalidate(self, source_path: Optional[str] = None) -> int:
+        """
+        キャッシュを無効化
+
+        Args:
+            source_path: 指定した場合はそのファイルのエントリのみ削除、Noneなら全削除
+
+        Returns:
+            削除したエントリ数
+        """
+        with self._locked():
+            index = self._load_index()
+            if source_path is None:
+                keys = list(index)
+            else:
+                abs_source = os.path.abspath(source_path)
+                keys = [k for k, e in index.items() if e.get('source') == abs_source]
+
+            for key in keys:
+                self._remove_entry(index, key)
+            if source_path is None:
+                # index.json にない残骸のデータファイルも削除する
+                for item in os.scandir(self.cache_dir):
+                    if item.name.endswith(DATA_SUFFIXES):
+                        self._remove_file(item.name)
+            if keys:
+                self._save_index(index)
+        return len(keys)
+
+
+def load_csv_cached(
+    file_path: str,
+    cache: Optional[CsvCache] = None,
+    columns: Optional[List[str]] = None,
+    float32: bool = False
+) -> pd.DataFrame:
+    """
+    キャッシュを使ってCSVを読み込む（load_csv_robust の透過的な置き換え）
+
+    ファイルが前回から変わっていなければキャッシュから読み込み、
+    変わっていれば解析してキャッシュに保存する。
+    columns を指定した場合は load_csv_streaming で必要な列だけを読み込み、
+    列の組み合わせごとに別のエントリとして保存する。
+
+    Args:
+        file_path: CSVファイルのパス
+        cache: 使用するキャッシュ（Noneの場合はデフォルト設定のキャッシュ）
+        columns: 読み込む列名のリスト（Noneの場合は全列）
+        float32: columns 指定時、浮動小数点数の列をfloat32で保持する
+
+    Returns:
+        読み込まれたDataFrame
+    """
+    def load() -> pd.DataFrame:
+        if columns is None:
+            return load_csv_robust(file_path)
+        return load_csv_streaming(file_path, columns, float32=float32)
+
+    if not CACHE_ENABLED and cache is None:
+        return load()
+
+    if cache is None:
+        cache = CsvCache()
+
+    fingerprint = fingerprint_file(file_path)
+    key = fingerprint
+    if columns is not None:
+        options = json.dumps([list(columns), float32], ensure_ascii=False)
+        key = hashlib.blake2b(f"{fingerprint}|{options}".encode('utf-8'), digest_size=16).hexdigest()
+
+    df = cache.get(key)
+    if df is not None:
+        print(f"✓ データを読み込みました（キャッシュ）")
+        return df
+
+    df = load()
+    try:
+        cache.put(key, df, file_path, fingerprint)
+    except Exception as e:
+        # ディスクの書き込みエラーに加えて、Feather/pickleにできない列（ArrowTypeError など）の場合も
+        # キャッシュせずに読み込んだDataFrameを返す
+        print(f"警告: キャッシュを保存できませんでした: {e}")
+    return df
+
+
+def load_dataset_cached(file_path: str, cache: Optional[CsvCache] = None) -> Dataset:
+    """
+    キャッシュを使ってCSVを Dataset として開く（数値列をメモリマップする）
+
+    初回はCSVを解析して数値列と'z'列をキャッシュに保存し、2回目以降はファイルが変わっていなければ
+    解析もメモリの確保もせずにメモリマップで開く。描画に使う列のページだけがディスクから読み込まれる。
+
+    Args:
+        file_path: CSVファイルのパス
+        cache: 使用するキャッシュ（Noneの場合はデフォルト設定のキャッシュ）
+
+    Returns:
+        読み込まれたデータの Dataset
+    """
+    if not CACHE_ENABLED and cache is None:
+        return Dataset.from_frame(load_csv_robust(file_path))
+
+    if cache is None:
+        cache = CsvCache()
+
+    fingerprint = fingerprint_file(file_path)
+    key = hashlib.blake2b(f"{fingerprint}|store".encode('utf-8'), digest_size=16).hexdigest()
+
+    dataset = cache.get_dataset(key)
+    if dataset is not None:
+        print(f"✓ データを読み込みました（メモリマップ）")
+        return dataset
+
+    df = load_csv_robust(file_path)
+    try:
+        cache.put_dataset(key, df, file_path, fingerprint)
+    except Exception as e:
+        print(f"警告: キャッシュを保存できませんでした: {e}")
+        return Dataset.from_frame(df)
+    # 保存したファイルを開き直して、解析したDataFrameのメモリは手放す
+    return cache.get_dataset(key) or Dataset.from_frame(df)
+
+
+def clear_cache(file_path: Optional[str] = None, cache: Optional[CsvCache] = None) -> int:
+    """
+    キャッシュを削除
+
+    Args:
+        file_path: 指定した場合はそのファイルのキャッシュのみ削除
+        cache: 対象のキャッシュ（Noneの場合はデフォルト設定のキャッシュ）
+
+    Returns:
+        削除したエントリ数
+    """
+    if cache is None:
+        cache = CsvCache()
+    return cache.invalidate(file_path)
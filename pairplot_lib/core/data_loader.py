@@ -2,8 +2,10 @@
 データ読み込みと選択のための共通ロジック
 """
 import os
+import csv
 import glob
-from typing import List, Tuple, Optional
+from collections import Counter
+from typing import Iterator, List, NamedTuple, Sequence, Tuple, Optional
 import pandas as pd
 import numpy as np
 
@@ -63,83 +65,449 @@ def select_csv_file(csv_files: List[str]) -> str:
     return selected_file
 
 
+# ストリーミング読み込みの1チャンクあたりの行数
+STREAMING_CHUNK_ROWS = 500_000
+
+# 区切り文字判定に使う先頭サンプルの最大バイト数
+SNIFF_SAMPLE_BYTES = 64 * 1024
+
+# 判定候補の区切り文字（優先順）と表示名
+CANDIDATE_DELIMITERS = [
+    (',', 'カンマ区切り'),
+    ('\t', 'タブ区切り'),
+    (';', 'セミコロン区切り'),
+    ('|', 'パイプ区切り'),
+]
+WHITESPACE_DELIMITER = r"\s+"
+
+
+class Dialect(NamedTuple):
+    """
+    先頭サンプルから判定したCSVの方言
+    
+    Attributes:
+        delimiter: pandasに渡す区切り文字（空白区切りの場合は正規表現）
+        label: 表示用の区切り文字名
+        reason: その区切り文字を選んだ理由
+        trailing_delimiter: 行末に余分な区切り文字があるかどうか
+    """
+    delimiter: str
+    label: str
+    reason: str
+    trailing_delimiter: bool
+
+
+def _read_sample_lines(file_path: str, sample_bytes: int) -> List[str]:
+    """
+    ファイル先頭の有限サイズのサンプルから、空行とコメント行を除いた行を取得
+    
+    Args:
+        file_path: CSVファイルのパス
+        sample_bytes: 読み込む最大バイト数
+        
+    Returns:
+        データ行（ヘッダーを含む）のリスト
+    """
+    with open(file_path, 'rb') as f:
+        raw = f.read(sample_bytes)
+        truncated = bool(f.read(1))
+    
+    text = raw.decode('utf-8', errors='replace').lstrip('\ufeff')
+    lines = text.splitlines()
+    # サンプルの途中で切れた最終行は判定に使わない
+    if truncated and lines:
+        lines = lines[:-1]
+    
+    return [line for line in lines if line.strip() and not line.lstrip().startswith('#')]
+
+
+def _count_fields(lines: List[str], delimiter: str) -> Tuple[List[int], bool]:
+    """
+    各行のフィールド数を数える（行末の余分な区切り文字は数えない）
+    
+    Args:
+        lines: データ行のリスト
+        delimiter: 区切り文字
+        
+    Returns:
+        (各行のフィールド数のリスト, 行末に区切り文字がある行が存在するか)
+    """
+    counts = []
+    trailing = False
+    for row in csv.reader(lines, delimiter=delimiter, skipinitialspace=True):
+        while row and not row[-1].strip():
+            row = row[:-1]
+            trailing = True
+        counts.append(len(row))
+    return counts, trailing
+
+
+def sniff_dialect(file_path: str, sample_bytes: int = SNIFF_SAMPLE_BYTES) -> Dialect:
+    """
+    ファイル先頭のサンプルだけを見て区切り文字を判定
+    
+    候補の区切り文字ごとに各行のフィールド数を数え、
+    2列以上で行ごとの列数が最も揃っているものを選ぶ
+    （同率の場合は列数が多い方、さらに同率なら候補順）。
+    どの候補でも2列以上にならない場合は空白区切りを試す。
+    
+    Args:
+        file_path: CSVファイルのパス
+        sample_bytes: 判定に使う先頭サンプルの最大バイト数
+        
+    Returns:
+        判定されたDialect
+    """
+    lines = _read_sample_lines(file_path, sample_bytes)
+    if not lines:
+        raise ValueError(f"ファイル '{file_path}' にデータ行がありません。")
+    
+    best = None
+    best_score = None
+    for delimiter, label in CANDIDATE_DELIMITERS:
+        counts, trailing = _count_fields(lines, delimiter)
+        mode = Counter(counts).most_common(1)[0][0]
+        if mode < 2:
+            continue
+        consistency = sum(1 for c in counts if c == mode) / len(counts)
+        score = (consistency, mode)
+        if best_score is None or score > best_score:
+            best_score = score
+            reason = f"先頭{len(lines)}行中{consistency:.0%}が{mode}列"
+            if trailing:
+                reason += "、行末の余分な区切り文字を無視"
+            best = Dialect(delimiter, label, reason, trailing)
+    
+    if best is not None:
+        return best
+    
+    # 区切り文字が見つからない場合は空白区切りを試す
+    counts = [len(line.split()) for line in lines]
+    mode = Counter(counts).most_common(1)[0][0]
+    if mode >= 2:
+        consistency = sum(1 for c in counts if c == mode) / len(counts)
+        reason = f"先頭{len(lines)}行中{consistency:.0%}が空白で{mode}列"
+        return Dialect(WHITESPACE_DELIMITER, '空白区切り', reason, False)
+    
+    raise ValueError(f"ファイル '{file_path}' の区切り文字を判定できませんでした。")
+
+
+def _read_csv_kwargs(dialect: Dialect) -> dict:
+    """
+    判定した方言に対応する pd.read_csv の引数を作成
+    
+    Args:
+        dialect: sniff_dialect で判定したDialect
+        
+    Returns:
+        pd.read_csv に渡すキーワード引数
+    """
+    # index_col=False: 行末の余分な区切り文字で先頭列がインデックスになるのを防ぐ
+    return dict(sep=dialect.delimiter, engine='c', comment='#',
+                skipinitialspace=True, skip_blank_lines=True, index_col=False)
+
+
 def load_csv_robust(file_path: str) -> pd.DataFrame:
     """
     様々な区切り文字に対応した堅牢なCSV読み込み
     タブ、カンマ、セミコロン、空白区切りなどを自動判定
     コメント行（#で始まる行）は自動的にスキップ
     
+    区切り文字は先頭サンプルだけで判定し（sniff_dialect）、
+    ファイル全体はCエンジンで1回だけ解析する。
+    判定結果は df.attrs['dialect'] に保存される。
+    
     Args:
         file_path: CSVファイルのパス
         
     Returns:
         読み込まれたDataFrame
     """
-    # 1) 自動検出（タブ/カンマ/セミコロンなど）+ 末尾の余分な区切り文字を無視
+    dialect = sniff_dialect(file_path)
+    
     try:
-        df_auto = pd.read_csv(file_path, sep=None, engine='python', comment='#', 
-                              skipinitialspace=True, skip_blank_lines=True)
-        df_auto.columns = df_auto.columns.str.strip()
-        # 空の列を削除（末尾にカンマがある場合に生成される）
-        df_auto = df_auto.loc[:, ~df_auto.columns.str.match('^Unnamed')]
-        if len(df_auto.columns) > 1:
-            print(f"✓ データを読み込みました（自動検出: カンマ/タブ/その他）")
-            return df_auto
+        df = pd.read_csv(file_path, **_read_csv_kwargs(dialect))
     except Exception as e:
-        pass
+        raise ValueError(f"ファイル '{file_path}' を読み込めませんでした。ファイル形式を確認してください。（{e}）")
     
-    # 2) カンマ区切り（明示的に指定）
-    try:
-        df_comma = pd.read_csv(file_path, sep=',', comment='#', 
-                               skipinitialspace=True, skip_blank_lines=True)
-        df_comma.columns = df_comma.columns.str.strip()
-        # 空の列を削除
-        df_comma = df_comma.loc[:, ~df_comma.columns.str.match('^Unnamed')]
-        if len(df_comma.columns) > 1:
-            print(f"✓ データを読み込みました（カンマ区切り）")
-            return df_comma
-    except Exception:
-        pass
-    
-    # 3) タブ区切り
-    try:
-        df_tab = pd.read_csv(file_path, sep='\t', comment='#', 
-                            skipinitialspace=True, skip_blank_lines=True)
-        df_tab.columns = df_tab.columns.str.strip()
-        # 空の列を削除
-        df_tab = df_tab.loc[:, ~df_tab.columns.str.match('^Unnamed')]
-        if len(df_tab.columns) > 1:
-            print(f"✓ データを読み込みました（タブ区切り）")
-            return df_tab
-    except Exception:
-        pass
-    
-    # 4) 任意空白（タブ＋空白混在も分割）
-    try:
-        df_ws = pd.read_csv(file_path, sep=r"\s+", engine='python', comment='#',
-                           skip_blank_lines=True)
-        df_ws.columns = df_ws.columns.str.strip()
-        if len(df_ws.columns) > 1:
-            print(f"✓ データを読み込みました（空白区切り）")
-            return df_ws
-    except Exception:
-        pass
-    
-    # 5) セミコロン区切り
-    try:
-        df_semi = pd.read_csv(file_path, sep=';', comment='#',
-                             skipinitialspace=True, skip_blank_lines=True)
-        df_semi.columns = df_semi.columns.str.strip()
-        # 空の列を削除
-        df_semi = df_semi.loc[:, ~df_semi.columns.str.match('^Unnamed')]
-        if len(df_semi.columns) > 1:
-            print(f"✓ データを読み込みました（セミコロン区切り）")
-            return df_semi
-    except Exception:
-        pass
+    df.columns = df.columns.str.strip()
+    # 空の列を削除（末尾に区切り文字がある場合に生成される）
+    df = df.loc[:, ~df.columns.str.match('^Unnamed')]
+    
+    if len(df.columns) <= 1:
+        raise ValueError(f"ファイル '{file_path}' を読み込めませんでした。ファイル形式を確認してください。")
+    
+    df.attrs['dialect'] = dialect._asdict()
+    print(f"✓ データを読み込みました（{dialect.label}: {dialect.reason}）")
+    return df
+
+
+def load_csv_preview(file_path: str, nrows: int = 1000) -> pd.DataFrame:
+    """
+    ファイルの先頭だけを読み込む（列の選択用）
     
-    # どの方法でも読み込めなかった場合はエラー
-    raise ValueError(f"ファイル '{file_path}' を読み込めませんでした。ファイル形式を確認してください。")
+    Args:
+        file_path: CSVファイルのパス
+        nrows: 読み込む最大行数
+        
+    Returns:
+        先頭nrows行のDataFrame
+    """
+    dialect = sniff_dialect(file_path)
+    df = pd.read_csv(file_path, nrows=nrows, **_read_csv_kwargs(dialect))
+    df.columns = df.columns.str.strip()
+    df = df.loc[:, ~df.columns.str.match('^Unnamed')]
+    df.attrs['dialect'] = dialect._asdict()
+    return df
+
+
+def _smallest_dtype(values: np.ndarray, float32: bool) -> np.dtype:
+    """
+    値を失わずに格納できる最小の数値型を求める
+    
+    Args:
+        values: 数値配列
+        float32: Trueの場合は浮動小数点数をfloat32にする
+        
+    Returns:
+        最小の数値型
+    """
+    if values.dtype.kind in 'iu':
+        if values.size == 0:
+            return np.dtype(np.int8)
+        lo, hi = values.min(), values.max()
+        for candidate in (np.int8, np.int16, np.int32):
+            info = np.iinfo(candidate)
+            if info.min <= lo and hi <= info.max:
+                return np.dtype(candidate)
+        return np.dtype(np.int64)
+    if values.dtype.kind == 'f' and float32:
+        return np.dtype(np.float32)
+    return values.dtype
+
+
+def _read_column_chunks(
+    file_path: str,
+    columns: List[str],
+    chunksize: int,
+    with_z: bool = True,
+    text_columns: Sequence[str] = ()
+) -> Tuple[Dialect, List[str], Iterator[pd.DataFrame]]:
+    """
+    指定した列だけをチャンク単位で読み込むイテレーターを作成
+    
+    Args:
+        file_path: CSVファイルのパス
+        columns: 読み込む列名のリスト
+        chunksize: 1チャンクの行数
+        with_z: Trueの場合は'z'列がファイルにあれば常に読み込む
+        text_columns: 型を推定せずに文字列のまま読み込む列
+        
+    Returns:
+        (区切り文字の判定結果, 読み込む列名のリスト, 列名の前後の空白を除いたチャンクのイテレーター) のタプル
+    """
+    dialect = sniff_dialect(file_path)
+    kwargs = _read_csv_kwargs(dialect)
+    
+    # ヘッダー行のみ読み込み、前後の空白を除いた列名と元の列名を対応付ける
+    header = pd.read_csv(file_path, nrows=0, **kwargs).columns
+    raw_names = {name.strip(): name for name in header}
+    
+    wanted = list(dict.fromkeys(columns))
+    if with_z and 'z' in raw_names and 'z' not in wanted:
+        wanted.append('z')
+    missing = [col for col in wanted if col not in raw_names]
+    if missing:
+        raise ValueError(f"エラー: 列が見つかりません: {missing}")
+    usecols = [raw_names[col] for col in wanted]
+    dtype = {raw_names[col]: str for col in text_columns if col in wanted}
+    
+    def chunks() -> Iterator[pd.DataFrame]:
+        for chunk in pd.read_csv(file_path, usecols=usecols, chunksize=chunksize, dtype=dtype or None, **kwargs):
+            chunk.columns = chunk.columns.str.strip()
+            yield chunk
+    
+    return dialect, wanted, chunks()
+
+
+def load_csv_streaming(
+    file_path: str,
+    columns: List[str],
+    chunksize: int = STREAMING_CHUNK_ROWS,
+    float32: bool = False
+) -> pd.DataFrame:
+    """
+    指定した列だけをチャンク単位で読み込み、最小の数値型に縮小する
+    
+    ファイル全体を一度に展開しないため、ピークメモリは
+    ファイルの列数ではなく読み込む列数に比例する。
+    'z'列がファイルにある場合は常に読み込む。
+    数値に変換できない値は欠損値として扱う（'z'列を除く）。
+    'z'列はグループ分けに使うので数値に変換・縮小せず、全ての値が数値の場合だけ数値の列にする
+    （load_csv_robust と同じ。チャンクごとに型を推定すると、チャンクによって型が変わるため）。
+    
+    Args:
+        file_path: CSVファイルのパス
+        columns: 読み込む列名のリスト
+        chunksize: 1チャンクの行数
+        float32: Trueの場合は浮動小数点数の列をfloat32で保持する
+        
+    Returns:
+        指定した列（と'z'列）のみを持つDataFrame
+    """
+    dialect, wanted, chunks = _read_column_chunks(file_path, columns, chunksize, text_columns=['z'])
+    numeric = [col for col in wanted if col != 'z']
+    
+    # 列ごとにチャンクを縮小した配列で保持し、最後に共通の型で連結する
+    parts = {col: [] for col in numeric}
+    z_parts = []
+    n_rows = 0
+    for chunk in chunks:
+        for col in numeric:
+            values = pd.to_numeric(chunk[col], errors='coerce').to_numpy()
+            parts[col].append(values.astype(_smallest_dtype(values, float32), copy=False))
+        if 'z' in wanted:
+            z_parts.append(chunk['z'])
+        n_rows += len(chunk)
+    
+    data = {}
+    for col in wanted:
+        if col == 'z':
+            z = pd.concat(z_parts, ignore_index=True) if z_parts else pd.Series([], dtype=object)
+            try:
+                z = pd.to_numeric(z)
+            except (ValueError, TypeError):
+                pass
+            data[col] = z
+            continue
+        chunks = parts.pop(col)
+        dtype = np.result_type(*chunks) if chunks else np.dtype(np.float64)
+        out = np.empty(n_rows, dtype=dtype)
+        pos = 0
+        for values in chunks:
+            out[pos:pos + len(values)] = values
+            pos += len(values)
+        data[col] = out
+        del chunks
+    
+    df = pd.DataFrame(data, copy=False)
+    df.attrs['dialect'] = dialect._asdict()
+    n_bytes = int(df.memory_usage(index=False, deep=True).sum())
+    print(f"✓ データを読み込みました（{dialect.label}、{len(wanted)}列をストリーミング読み込み: "
+          f"{n_bytes / 1024 ** 2:.1f} MB）")
+    return df
+
+
+def stream_pairplot_stats(
+    file_path: str,
+    columns: List[str],
+    chunksize: int = STREAMING_CHUNK_ROWS,
+    n_jobs: int = 1,
+    histograms: bool = False,
+    grouped: bool = False
+):
+    """
+    指定した列のペアプロット用の統計量を、データ全体をメモリに載せずに集計
+    
+    チャンクごとに列ペアのモーメントと範囲を計算し、merge_moments で合わせていく。
+    メモリ使用量はファイルの大きさによらず、1チャンク分と列数の2乗に比例する。
+    n_jobs が2以上の場合は、読み込みと並行して複数のスレッドでチャンクを集計する
+    （行列演算中はGILが解放されるため）。
+    
+    対角のヒストグラムも求める場合は、1回目の読み込みで集計した件数・最小値・最大値・
+    四分位範囲（分位点のスケッチ）からビンを決め、2回目の読み込みで度数を数える。
+    
+    Args:
+        file_path: CSVファイルのパス
+        columns: 集計する列名のリスト
+        chunksize: 1チャンクの行数
+        n_jobs: チャンクを集計するスレッド数
+        histograms: Trueの場合は対角のヒストグラムも集計する
+        grouped: Trueの場合はヒストグラムを'z'列の値ごとに数える（色分けペアプロット用）
+        
+    Returns:
+        PairplotStats。添字は columns の順序
+    """
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+    
+    from .histogram import ColumnHistogram, auto_bin_count
+    from .quantiles import QuantileSketch
+    from .stats import PairplotStats, merge_moments, merge_ranges, pairwise_moments, pairwise_ranges
+    
+    columns = list(dict.fromkeys(columns))
+    grouped = grouped and histograms
+    
+    def numeric(chunk: pd.DataFrame) -> np.ndarray:
+        return np.column_stack([pd.to_numeric(chunk[col], errors='coerce').to_numpy(dtype=np.float64)
+                                for col in columns])
+    
+    def summarize(chunk: pd.DataFrame):
+        values = numeric(chunk)
+        sketches = None
+        if histograms:
+            sketches = [QuantileSketch() for _ in columns]
+            for k, sketch in enumerate(sketches):
+                sketch.add(values[:, k])
+        groups = set(chunk['z'].dropna().unique()) if grouped and 'z' in chunk.columns else set()
+        return pairwise_moments(values), pairwise_ranges(values), sketches, groups
+    
+    total = None
+    
+    def merge(part) -> None:
+        nonlocal total
+        if total is None:
+            total = part
+            return
+        moments, ranges, sketches, groups = total
+        total = (
+            merge_moments(moments, part[0]),
+            merge_ranges(ranges, part[1]),
+            [a.merge(b) for a, b in zip(sketches, part[2])] if sketches is not None else None,
+            groups | part[3],
+        )
+    
+    _, _, chunks = _read_column_chunks(file_path, columns, chunksize, with_z=grouped)
+    if n_jobs <= 1:
+        for chunk in chunks:
+            merge(summarize(chunk))
+    else:
+        # 未集計のチャンクを溜めすぎないよう、実行中の数を制限して読み込む順に合わせる
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            running = deque()
+            for chunk in chunks:
+                running.append(executor.submit(summarize, chunk))
+                if len(running) >= 2 * n_jobs:
+                    merge(running.popleft().result())
+            while running:
+                merge(running.popleft().result())
+    
+    if total is None:
+        total = summarize(pd.DataFrame({col: [] for col in columns}))
+    moments, ranges, sketches, groups = total
+    if not histograms:
+        return PairplotStats(moments, ranges[0], ranges[1])
+    
+    # 2回目の読み込み: 決めたビンで列ごと・グループごとの度数を数える
+    groups = pd.Index(sorted(groups))
+    n_groups = len(groups) if grouped else 1
+    hists = []
+    for sketch in sketches:
+        if sketch.count == 0:
+            hists.append(None)
+            continue
+        q1, q3 = sketch.quantiles([0.25, 0.75])
+        n_bins = auto_bin_count(sketch.count, sketch.min, sketch.max, q3 - q1)
+        hists.append(ColumnHistogram.from_range(sketch.min, sketch.max, n_bins, n_groups))
+    
+    _, _, chunks = _read_column_chunks(file_path, columns, chunksize, with_z=grouped)
+    for chunk in chunks:
+        values = numeric(chunk)
+        codes = groups.get_indexer(chunk['z']) if grouped and 'z' in chunk.columns else None
+        for k, hist in enumerate(hists):
+            if hist is not None:
+                hist.add(values[:, k], codes)
+    return PairplotStats(moments, ranges[0], ranges[1], hists)
 
 
 def get_numeric_columns(df: pd.DataFrame, exclude_cols: Optional[List[str]] = None) -> List[str]:
@@ -147,13 +515,18 @@ def get_numeric_columns(df: pd.DataFrame, exclude_cols: Optional[List[str]] = No
     DataFrameから数値列を取得
     
     Args:
-        df: DataFrame
+        df: DataFrame（Dataset の場合は解析済みの数値列をそのまま使う）
         exclude_cols: 除外する列名のリスト
         
     Returns:
         数値列名のリスト
     """
-    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    from .dataset import Dataset
+
+    if isinstance(df, Dataset):
+        numeric_cols = list(df.columns)
+    else:
+        numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
     
     if exclude_cols:
         numeric_cols = [col for col in numeric_cols if col not in exclude_cols]
@@ -0,0 +1,279 @@
+"""
+描画用に解析済みのデータ
+
+DataFrame の数値列を1回だけ連続した配列に変換し、'z'列のグループの索引・欠損値のマスクと
+一緒に保持する。統計量（モーメント・相関係数・回帰直線・ヒストグラム・箱ひげ図）は最初に
+必要になったときに計算して覚えておくので、同じファイルから複数のプロットを描画しても
+重い処理は1回で済む。
+"""
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .data_loader import get_numeric_columns
+from .groups import GroupIndex
+from .histogram import ColumnHistogram
+from .quantiles import boxplot_stats
+from .stats import (CorrelationResult, PairwiseMoments, RegressionResult, correlation_from_moments,
+                    pairwise_moments, pairwise_ranges, regression_from_moments)
+
+
+class Dataset:
+    """
+    数値列の配列・列名の索引・'z'列のグループ・計算済みの統計量
+
+    Attributes:
+        values: (行数, 列数) の数値配列（列ごとに連続した Fortran 順、欠損値はNaN）
+        columns: values の列名（数値列、'z'列が数値の場合は含む）
+        column_index: 列名 -> values の列番号
+        groups: 'z'列のグループの索引（'z'列がない場合はNone、最初に使われたときに作成）
+        source_columns: 元のデータの全ての列名
+    """
+
+    def __init__(self, values: np.ndarray, columns: List[str], groups: Optional[GroupIndex] = None,
+                 source_columns: Optional[List[str]] = None, z: Optional[pd.Series] = None):
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 2 and values.strides[0] != values.itemsize:
+            # 列ごとに連続していればコピーしない（大きな配列の先頭の行だけを使う TailDataset の場合も含む）
+            values = np.asfortranarray(values)
+        if values.ndim != 2 or values.shape[1] != len(columns):
+            raise ValueError("エラー: 数値配列の列数と列名の数が一致しません。")
+        self.values = values
+        self.columns = list(columns)
+        self.column_index = {col: k for k, col in enumerate(self.columns)}
+        # groups を指定しない場合は z からグループ番号を作る（色分けしない描画では作らない）
+        self._groups = groups
+        self._z = z
+        self.source_columns = list(source_columns) if source_columns is not None else list(self.columns)
+        self._missing = None
+        self._cache: Dict[tuple, object] = {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, columns: Optional[List[str]] = None) -> "Dataset":
+        """
+        DataFrame から作成
+
+        Args:
+            df: 入力DataFrame
+            columns: 配列に変換する列（Noneの場合は全ての数値列）
+
+        Returns:
+            Dataset
+        """
+        if columns is None:
+            columns = get_numeric_columns(df)
+        z = df['z'] if 'z' in df.columns else None
+        return cls(df[columns].to_numpy(dtype=float), columns, source_columns=df.columns.tolist(), z=z)
+
+    @property
+    def n_rows(self) -> int:
+        return self.values.shape[0]
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """元のデータの (行数, 列数)"""
+        return self.n_rows, len(self.source_columns)
+
+    @property
+    def has_z(self) -> bool:
+        return self._groups is not None or self._z is not None
+
+    @property
+    def groups(self) -> Optional[GroupIndex]:
+        if self._groups is None and self._z is not None:
+            self._groups = GroupIndex.from_series(self._z)
+            self._z = None
+        return self._groups
+
+    @property
+    def missing(self) -> np.ndarray:
+        """values と同じ形の欠損値のマスク（最初に使われたときに作成）"""
+        if self._missing is None:
+            self._missing = np.isnan(self.values)
+        return self._missing
+
+    def n_missing(self, columns: List[str]) -> int:
+        """
+        指定した列の欠損値の数
+
+        Args:
+            columns: 列名のリスト
+
+        Returns:
+            欠損値の数
+        """
+        if self._missing is not None:
+            return int(self._missing[:, self._indices(columns)].sum())
+        # メモリマップした配列では、使わない列まで読み込まないように指定した列だけを調べる
+        return int(np.isnan(self.select(columns)).sum())
+
+    def _indices(self, columns: List[str]) -> List[int]:
+        for col in columns:
+            if col not in self.column_index:
+                raise ValueError(f"エラー: 数値列 '{col}' が見つかりません。")
+        return [self.column_index[col] for col in columns]
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        1列分の値（コピーではなく values の一部）
+
+        Args:
+            name: 列名
+
+        Returns:
+            1次元の配列
+        """
+        return self.values[:, self._indices([name])[0]]
+
+    def select(self, columns: List[str]) -> np.ndarray:
+        """
+        指定した列の (行数, 列数) の配列
+
+        列が values の中で連続して並んでいる場合はコピーしない。
+
+        Args:
+            columns: 列名のリスト
+
+        Returns:
+            数値配列
+        """
+        idx = self._indices(columns)
+        if idx and idx == list(range(idx[0], idx[0] + len(idx))):
+            return self.values[:, idx[0]:idx[0] + len(idx)]
+        return self.values[:, idx]
+
+    def _pairwise(self, name: str, columns: List[str], compute: Callable, subset: Callable):
+        """
+        列ペアごとの統計量を計算済みなら取り出す
+
+        列ペアごとの統計量はその2列だけで決まるので、指定した列を全て含む列について
+        計算済みであれば、そこから行・列を選んで使う。
+        """
+        key = (name, tuple(columns))
+        if key in self._cache:
+            return self._cache[key]
+        wanted = set(columns)
+        for cached_key, result in list(self._cache.items()):
+            if cached_key[0] == name and wanted <= set(cached_key[1]):
+                idx = [cached_key[1].index(col) for col in columns]
+                value = subset(result, np.ix_(idx, idx))
+                break
+        else:
+            value = compute(self.select(columns))
+        self._cache[key] = value
+        return value
+
+    def moments(self, columns: List[str]) -> PairwiseMoments:
+        """
+        列ペアごとのモーメント（pairwise_moments）
+
+        Args:
+            columns: 列名のリスト
+
+        Returns:
+            PairwiseMoments（添字は columns の順序）
+        """
+        return self._pairwise('moments', columns, pairwise_moments,
+                              lambda m, sub: PairwiseMoments(*(a[sub] for a in m)))
+
+    def ranges(self, columns: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        列ペアごとの x の最小値・最大値（pairwise_ranges）
+
+        Args:
+            columns: 列名のリスト
+
+        Returns:
+            (x_min, x_max) のタプル
+        """
+        return self._pairwise('ranges', columns, pairwise_ranges,
+                              lambda r, sub: (r[0][sub], r[1][sub]))
+
+    def correlation(self, columns: List[str], with_pvalues: bool = False) -> CorrelationResult:
+        """
+        列ペアごとの相関係数（pairwise_correlation と同じ値）
+
+        Args:
+            columns: 列名のリスト
+            with_pvalues: Trueの場合は無相関検定のp値も計算する
+
+        Returns:
+            CorrelationResult
+        """
+        key = ('correlation', tuple(columns), with_pvalues)
+        if key not in self._cache:
+            self._cache[key] = correlation_from_moments(self.moments(columns), with_pvalues)
+        return self._cache[key]
+
+    def regression(self, columns: List[str]) -> RegressionResult:
+        """
+        列ペアごとの回帰直線（pairwise_regression と同じ値）
+
+        Args:
+            columns: 列名のリスト
+
+        Returns:
+            RegressionResult
+        """
+        key = ('regression', tuple(columns))
+        if key not in self._cache:
+            x_min, x_max = self.ranges(columns)
+            self._cache[key] = regression_from_moments(self.moments(columns), x_min, x_max)
+        return self._cache[key]
+
+    def histograms(self, columns: List[str], grouped: bool = False) -> List[Optional[ColumnHistogram]]:
+        """
+        列ごとの対角のヒストグラム
+
+        Args:
+            columns: 列名のリスト
+            grouped: Trueの場合は'z'のグループごとに数える（'z'が欠損の行は数えない）
+
+        Returns:
+            ColumnHistogram のリスト（有限の値が1つもない列はNone）
+        """
+        if grouped and self.groups is None:
+            raise ValueError("エラー: 'z' 列が見つかりません。色分けには 'z' 列が必要です。")
+        hists = []
+        for col in columns:
+            key = ('histogram', col, grouped)
+            if key not in self._cache:
+                if grouped:
+                    hist = ColumnHistogram.from_values(self.column(col), self.groups.codes, self.groups.n_groups)
+                else:
+                    hist = ColumnHistogram.from_values(self.column(col))
+                self._cache[key] = hist
+            hists.append(self._cache[key])
+        return hists
+
+    def boxplot_stats(self, column: str) -> Optional[dict]:
+        """
+        1列分の箱ひげ図の統計量（quantiles.boxplot_stats）
+
+        Args:
+            column: 列名
+
+        Returns:
+            Axes.bxp に渡す辞書（有限の値が1つもない場合はNone）
+        """
+        key = ('boxplot', column)
+        if key not in self._cache:
+            self._cache[key] = boxplot_stats(self.column(column))
+        return self._cache[key]
+
+
+def as_dataset(data: Union[pd.DataFrame, Dataset], columns: Optional[List[str]] = None) -> Dataset:
+    """
+    DataFrame なら Dataset に変換し、Dataset ならそのまま返す
+
+    Args:
+        data: DataFrame または Dataset
+        columns: DataFrame の場合に配列に変換する列（Noneの場合は全ての数値列）
+
+    Returns:
+        Dataset
+    """
+    if isinstance(data, Dataset):
+        return data
+    return Dataset.from_frame(data, columns)
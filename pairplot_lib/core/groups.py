@@ -0,0 +1,106 @@
+"""
+z列によるグループ分け
+
+z列を1回だけ整数のグループ番号に変換し、行番号をグループ順に並べ替えておく。
+散布図・ヒストグラムなどグループごとに描画・集計する処理は、DataFrame を
+グループごとに絞り込む（z列をグループ数だけ走査してコピーする）代わりにこれを使い回す。
+"""
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+
+class GroupIndex:
+    """
+    z列の値ごとの行の索引
+
+    Attributes:
+        codes: 各行のグループ番号（0から n_groups-1、z列が欠損の行は-1）
+        labels: グループ番号に対応するz列の値（昇順）
+        counts: グループごとの行数
+    """
+
+    def __init__(self, codes: np.ndarray, labels: List):
+        self.codes = np.asarray(codes, dtype=np.intp)
+        self.labels = list(labels)
+        n_groups = len(self.labels)
+        valid = self.codes >= 0
+        self.counts = np.bincount(self.codes[valid], minlength=n_groups)
+        # グループ番号の順に並べた行番号（グループ内は元の行の順）。グループ数が少なければ
+        # 小さい整数型にして基数ソートで並べ替える
+        sort_codes = self.codes[valid]
+        if n_groups <= np.iinfo(np.int16).max:
+            sort_codes = sort_codes.astype(np.int16)
+        self._order = np.flatnonzero(valid)[np.argsort(sort_codes, kind='stable')]
+        self._offsets = np.concatenate([[0], np.cumsum(self.counts)])
+
+    @classmethod
+    def from_parts(cls, codes: np.ndarray, labels: List, order: np.ndarray, counts: np.ndarray) -> "GroupIndex":
+        """
+        作成済みの索引の配列から作成（並べ替えをやり直さず、配列もコピーしない）
+
+        Args:
+            codes: 各行のグループ番号
+            labels: グループ番号に対応するz列の値
+            order: グループ番号の順に並べた行番号
+            counts: グループごとの行数
+
+        Returns:
+            GroupIndex
+        """
+        index = cls.__new__(cls)
+        index.codes = codes
+        index.labels = list(labels)
+        index.counts = counts
+        index._order = order
+        index._offsets = np.concatenate([[0], np.cumsum(counts)])
+        return index
+
+    @classmethod
+    def from_series(cls, z: pd.Series) -> "GroupIndex":
+        """
+        z列からグループの索引を作成
+
+        Args:
+            z: z列
+
+        Returns:
+            GroupIndex
+        """
+        codes, labels = pd.factorize(z, sort=True)
+        return cls(codes, labels.tolist())
+
+    @property
+    def n_groups(self) -> int:
+        return len(self.labels)
+
+    @property
+    def order(self) -> np.ndarray:
+        """グループ番号の順に並べた行番号（z列が欠損の行を除く）"""
+        return self._order
+
+    def rows(self, group: int) -> np.ndarray:
+        """
+        グループに属する行番号（元の行の順）
+
+        Args:
+            group: グループ番号
+
+        Returns:
+            行番号の配列（コピーではなく共有の配列の一部）
+        """
+        return self._order[self._offsets[group]:self._offsets[group + 1]]
+
+    def take(self, values: np.ndarray, group: int) -> np.ndarray:
+        """
+        配列からグループに属する行だけを取り出す
+
+        Args:
+            values: 行数が元のデータと同じ配列
+            group: グループ番号
+
+        Returns:
+            グループの行の値
+        """
+        return np.asarray(values)[self.rows(group)]
@@ -0,0 +1,200 @@
+"""
+ペアプロットの対角に描くヒストグラムの集計
+
+ビンは等幅で、範囲外の値が追加されたらビンを足して範囲を広げる（既にあるビンの境界は動かさない）。
+グループごとの度数を1つの配列で持ち、チャンク単位で np.bincount により加算する。
+"""
+from typing import Optional
+
+import numpy as np
+
+# 範囲を広げてビン数がこれを超える場合は、隣り合うビンを2つずつまとめて幅を2倍にする
+MAX_BINS = 1000
+
+
+def auto_bin_count(count: int, lo: float, hi: float, iqr: float) -> int:
+    """
+    件数・最小値・最大値・四分位範囲だけから np.histogram_bin_edges(bins='auto') のビン数を求める
+
+    データ全体を渡さずに（集計済みの統計量から）ビンを決めるために使う。
+    ビン幅は Freedman-Diaconis 則と Sturges 則の小さい方（NumPy 2 と同じく、
+    Freedman-Diaconis 則の幅は平方根則の幅の半分を下限にする）。
+
+    Args:
+        count: 有限の値の数
+        lo: 最小値
+        hi: 最大値
+        iqr: 四分位範囲
+
+    Returns:
+        ビン数
+    """
+    if count == 0 or hi <= lo:
+        return 1
+    fd = 2.0 * iqr * count ** (-1.0 / 3.0)
+    sturges = (hi - lo) / (np.log2(count) + 1.0)
+    sqrt = (hi - lo) / np.sqrt(count)
+    width = min(max(fd, sqrt / 2), sturges)
+    return max(1, int(np.ceil((hi - lo) / width)))
+
+
+class ColumnHistogram:
+    """
+    1列分の等幅ビンのヒストグラム（グループごとの度数を持つ）
+
+    ビンの境界は origin + k * width（k は整数）で決める。ビンを足したり2つずつまとめたりしても
+    既にあるビンの境界は変わらないので、集計済みの度数と描画に使う境界が常に一致する。
+
+    Attributes:
+        origin: 境界の基準点
+        width: ビンの幅
+        first: 最初のビンの左端の番号 k
+        counts: (グループ数, ビン数) の度数
+    """
+
+    def __init__(self, origin: float, width: float, n_bins: int, n_groups: int = 1, first: int = 0):
+        if not width > 0:
+            raise ValueError("エラー: ビンの幅が正しくありません。")
+        self.origin = float(origin)
+        self.width = float(width)
+        self.first = int(first)
+        self.counts = np.zeros((n_groups, n_bins), dtype=np.int64)
+
+    @classmethod
+    def from_range(cls, lo: float, hi: float, n_bins: int, n_groups: int = 1) -> "ColumnHistogram":
+        """
+        範囲 [lo, hi] を n_bins 個の等幅ビンに分けた空のヒストグラムを作成
+
+        Args:
+            lo: 最小値
+            hi: 最大値（lo と同じ場合は前後に0.5ずつ広げる、np.histogram と同じ）
+            n_bins: ビン数
+            n_groups: グループ数
+
+        Returns:
+            度数が0の ColumnHistogram
+        """
+        if lo == hi:
+            lo, hi = lo - 0.5, hi + 0.5
+        width = (hi - lo) / n_bins
+        step = np.spacing(width)
+        while lo + n_bins * width <= hi:
+            # ビンは右端を含まないので、最大値が最後のビンの右端より小さくなるよう幅をわずかに広げる
+            width += step
+            step *= 2
+        return cls(lo, width, n_bins, n_groups)
+
+    @classmethod
+    def from_values(
+        cls,
+        values: np.ndarray,
+        group_codes: Optional[np.ndarray] = None,
+        n_groups: int = 1
+    ) -> Optional["ColumnHistogram"]:
+        """
+        値の分布から np.histogram_bin_edges(bins='auto') と同じ範囲・ビン数で集計
+
+        Args:
+            values: 1列分の値（欠損値はNaN）
+            group_codes: 各行のグループ番号（0から n_groups-1、-1は数えない）
+            n_groups: グループ数
+
+        Returns:
+            ColumnHistogram（有限の値が1つもない場合はNone）
+        """
+        values = np.asarray(values, dtype=np.float64)
+        finite = values[np.isfinite(values)]
+        if finite.size == 0:
+            return None
+        edges = np.histogram_bin_edges(finite, bins='auto')
+        hist = cls.from_range(edges[0], edges[-1], len(edges) - 1, n_groups)
+        hist.add(values, group_codes)
+        return hist
+
+    @property
+    def n_bins(self) -> int:
+        return self.counts.shape[1]
+
+    @property
+    def edges(self) -> np.ndarray:
+        """ビンの境界（ビン数+1個）"""
+        return self.origin + np.arange(self.first, self.first + self.n_bins + 1) * self.width
+
+    def _extend(self, lo: float, hi: float) -> None:
+        """[lo, hi] が収まるようにビンを追加する（ビン数が MAX_BINS を超える場合は先にビンをまとめる）"""
+        while True:
+            left = max(0, self.first - int(np.floor((lo - self.origin) / self.width)))
+            right = max(0, int(np.floor((hi - self.origin) / self.width)) + 1 - (self.first + self.n_bins))
+            # 割り算の丸め誤差で足りない場合も1つは足す
+            edges = self.edges
+            left = max(left, int(lo < edges[0]))
+            right = max(right, int(hi >= edges[-1]))
+            if self.n_bins + left + right <= MAX_BINS:
+                break
+            self._coarsen()
+        if left or right:
+            self.counts = np.pad(self.counts, ((0, 0), (left, right)))
+            self.first -= left
+
+    def _coarsen(self) -> None:
+        """隣り合うビンを2つずつまとめて幅を2倍にする"""
+        # 番号が偶数の境界だけを残す（幅2倍の格子の境界は元の格子の境界と完全に同じ値になる）
+        if self.first % 2:
+            self.counts = np.pad(self.counts, ((0, 0), (1, 0)))
+            self.first -= 1
+        if self.n_bins % 2:
+            self.counts = np.pad(self.counts, ((0, 0), (0, 1)))
+        self.counts = self.counts[:, 0::2] + self.counts[:, 1::2]
+        self.first //= 2
+        self.width *= 2
+
+    def add(self, values: np.ndarray, group_codes: Optional[np.ndarray] = None) -> None:
+        """
+        値を度数に加える
+
+        Args:
+            values: 1列分の値（欠損値はNaN）
+            group_codes: 各行のグループ番号（Noneの場合は全てグループ0、-1は数えない）
+        """
+        values = np.asarray(values, dtype=np.float64)
+        keep = np.isfinite(values)
+        if group_codes is not None:
+            keep &= np.asarray(group_codes) >= 0
+        values = values[keep]
+        if values.size == 0:
+            return
+        codes = np.zeros(values.size, dtype=np.intp) if group_codes is None else np.asarray(group_codes)[keep]
+
+        # 各ビンは右端を含まない（範囲を広げても、既に数えた値の入るビンが変わらないようにするため）
+        lo, hi = values.min(), values.max()
+        edges = self.edges
+        while lo < edges[0] or hi >= edges[-1]:
+            self._extend(lo, hi)
+            edges = self.edges
+        idx = np.floor((values - edges[0]) / self.width).astype(np.intp)
+        np.clip(idx, 0, self.n_bins - 1, out=idx)
+        # 丸め誤差で隣のビンに入った値を境界と比べて直す
+        idx -= (values < edges[idx]) & (idx > 0)
+        idx += (values >= edges[idx + 1]) & (idx != self.n_bins - 1)
+        n_groups, n_bins = self.counts.shape
+        self.counts += np.bincount(codes * n_bins + idx, minlength=n_groups * n_bins).reshape(n_groups, n_bins)
+
+    def regroup(self, index_map: np.ndarray, n_groups: int) -> "ColumnHistogram":
+        """
+        グループ番号を付け直したヒストグラムを作成
+
+        新しいグループが増えたときの並べ替えのほか、複数のグループを1つにまとめたり
+        （同じ番号を指定）、グループを除いたり（-1を指定）できる。
+
+        Args:
+            index_map: 古いグループ番号 -> 新しいグループ番号（-1は除く）
+            n_groups: 新しいグループ数
+
+        Returns:
+            同じビンで、グループだけを付け直した ColumnHistogram
+        """
+        index_map = np.asarray(index_map, dtype=np.intp)
+        hist = ColumnHistogram(self.origin, self.width, self.n_bins, n_groups, self.first)
+        keep = index_map >= 0
+        np.add.at(hist.counts, index_map[keep], self.counts[keep])
+        return hist
@@ -0,0 +1,228 @@
+"""
+箱ひげ図の統計量と分位点のスケッチ
+
+箱ひげ図は四分位点・ひげの端・外れ値だけを描画すればよいので、統計量を先に計算して
+Axes.bxp に渡す（Axes.boxplot のように全データを渡すと、並べ替えと外れ値ごとの描画で遅くなる）。
+外れ値は重なって見分けられない点を除き、最大 MAX_FLIERS 個に間引いて描画する。
+
+チャンク単位で読み込むデータには QuantileSketch を使う。一定の大きさのまま値を追加でき、
+別々に集計したスケッチを merge で合わせられる（KLL型のスケッチを決定的に間引く）。
+"""
+from typing import List, Optional
+
+import numpy as np
+
+# 箱ひげ図に描画する外れ値の最大数
+MAX_FLIERS = 1000
+
+# スケッチの各段に保持する値の数（大きいほど分位点が正確になる）
+SKETCH_CAPACITY = 4096
+
+
+def sample_fliers(fliers: np.ndarray, max_fliers: int = MAX_FLIERS) -> np.ndarray:
+    """
+    外れ値を最大 max_fliers 個に間引く
+
+    最小値・最大値を残し、外れ値の範囲を残りの個数の区間に分けて各区間から1つずつ残す。
+    重なって見分けられない点だけを減らすので、描画される外れ値の見た目（最小値・最大値や
+    まばらな裾の点）は変わらない。
+
+    Args:
+        fliers: 外れ値
+        max_fliers: 残す外れ値の最大数
+
+    Returns:
+        間引いた外れ値
+    """
+    if fliers.size <= max_fliers:
+        return fliers
+    lo, hi = fliers.min(), fliers.max()
+    if hi == lo:
+        # 全て同じ値の場合は重なって1点に見えるので1つだけ残す（区間の幅が0になるため）
+        return fliers[:1]
+    # 各区間で最初に現れた値を残すだけでは端の値が落ちることがあるので、最小値・最大値は必ず残す
+    extremes = np.array([fliers.argmin(), fliers.argmax()])
+    if max_fliers <= extremes.size:
+        return fliers[np.sort(extremes[:max_fliers])]
+    buckets = np.floor((fliers - lo) / (hi - lo) * (max_fliers - extremes.size - 1)).astype(np.intp)
+    _, first = np.unique(buckets, return_index=True)
+    return fliers[np.union1d(first, extremes)]
+
+
+def _box_stats(values: np.ndarray, q1: float, med: float, q3: float, mean: float,
+               whis: float, max_fliers: int) -> dict:
+    """
+    四分位点から、ひげの端（範囲内で最も外側の値）と外れ値を求めて Axes.bxp 用の辞書にする
+    """
+    iqr = q3 - q1
+    inside = values[(values >= q1 - whis * iqr) & (values <= q3 + whis * iqr)]
+    # 範囲内に値がない場合は箱の端をひげの端にする（matplotlib.cbook.boxplot_stats と同じ）
+    whislo = float(inside.min()) if inside.size else q1
+    whishi = float(inside.max()) if inside.size else q3
+    fliers = values[(values < whislo) | (values > whishi)]
+    return {
+        'med': med, 'q1': q1, 'q3': q3, 'mean': mean, 'iqr': iqr,
+        'whislo': whislo, 'whishi': whishi,
+        'fliers': sample_fliers(fliers, max_fliers),
+    }
+
+
+def boxplot_stats(values: np.ndarray, whis: float = 1.5, max_fliers: int = MAX_FLIERS) -> Optional[dict]:
+    """
+    1列分の箱ひげ図の統計量を計算（Axes.boxplot と同じ四分位点・ひげ）
+
+    Args:
+        values: 1列分の値（欠損値はNaN）
+        whis: ひげの長さ（四分位範囲の倍数）
+        max_fliers: 描画する外れ値の最大数
+
+    Returns:
+        Axes.bxp に渡す辞書（有限の値が1つもない場合はNone）
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    if values.size == 0:
+        return None
+    q1, med, q3 = (float(q) for q in np.percentile(values, [25, 50, 75]))
+    return _box_stats(values, q1, med, q3, float(values.mean()), whis, max_fliers)
+
+
+class QuantileSketch:
+    """
+    チャンク単位で更新・合成できる分位点のスケッチ
+
+    段 h に保持する値は、それぞれ 2**h 個の元の値を代表する。ある段の値が
+    SKETCH_CAPACITY 個を超えたら、並べ替えて1つおきに選んだ値を次の段に移す。
+    保持する値の数は全体の行数の対数にしか比例しない。
+    件数・合計・最小値・最大値は正確に数える。
+
+    Attributes:
+        count: 追加した有限の値の数
+        total: 追加した値の合計
+        min: 最小値
+        max: 最大値
+    """
+
+    def __init__(self, capacity: int = SKETCH_CAPACITY):
+        self.capacity = capacity
+        self.count = 0
+        self.total = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self._levels: List[np.ndarray] = [np.empty(0)]
+        # 1つおきに選ぶときに偶数番目と奇数番目を交互に使い、偏りを打ち消す
+        self._parity = 0
+
+    def _append(self, level: int, values: np.ndarray) -> None:
+        while len(self._levels) <= level:
+            self._levels.append(np.empty(0))
+        self._levels[level] = np.concatenate([self._levels[level], values])
+
+    def add(self, values: np.ndarray) -> None:
+        """
+        値を追加する
+
+        Args:
+            values: 追加する値（欠損値はNaN、数えない）
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return
+        self.count += values.size
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        if values.size <= self.capacity:
+            self._append(0, values)
+        else:
+            # 大きなチャンクは1回並べ替えて、段の容量に収まる間隔で直接間引く
+            level = int(np.ceil(np.log2(values.size / self.capacity)))
+            step = 2 ** level
+            self._append(level, np.sort(values)[step // 2::step])
+        self._compact()
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """
+        別の行について集計したスケッチと合わせる
+
+        Args:
+            other: もう一方のスケッチ
+
+        Returns:
+            両方の値を合わせたスケッチ（元のスケッチは変更しない）
+        """
+        merged = QuantileSketch(self.capacity)
+        merged.count = self.count + other.count
+        merged.total = self.total + other.total
+        merged.min = min(self.min, other.min)
+        merged.max = max(self.max, other.max)
+        merged._parity = self._parity
+        for level in range(max(len(self._levels), len(other._levels))):
+            for sketch in (self, other):
+                if level < len(sketch._levels):
+                    merged._append(level, sketch._levels[level])
+        merged._compact()
+        return merged
+
+    def _compact(self) -> None:
+        level = 0
+        while level < len(self._levels):
+            items = self._levels[level]
+            if items.size > self.capacity:
+                items = np.sort(items)
+                # 奇数個の場合は最後の1つをこの段に残す
+                keep = items[-1:] if items.size % 2 else items[:0]
+                pairs = items[:items.size - keep.size]
+                self._levels[level] = keep
+                self._append(level + 1, pairs[self._parity::2])
+                self._parity ^= 1
+            level += 1
+
+    def _weighted(self):
+        """保持している値を並べ替え、各値が代表する元の値の数と合わせて返す"""
+        items = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(level.size, 2.0 ** h) for h, level in enumerate(self._levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], weights[order]
+
+    def quantiles(self, qs: List[float]) -> np.ndarray:
+        """
+        分位点を求める
+
+        Args:
+            qs: 0から1の確率のリスト
+
+        Returns:
+            分位点（値を追加していない場合はNaN）
+        """
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.count == 0:
+            return np.full(qs.shape, np.nan)
+        items, weights = self._weighted()
+        # 各値を、それが代表する範囲の中央の順位に置いて線形補間する
+        ranks = (np.cumsum(weights) - weights / 2) / weights.sum()
+        out = np.interp(qs, ranks, items)
+        out[qs <= 0] = self.min
+        out[qs >= 1] = self.max
+        return out
+
+    def boxplot_stats(self, whis: float = 1.5, max_fliers: int = MAX_FLIERS) -> Optional[dict]:
+        """
+        スケッチから箱ひげ図の統計量を求める
+
+        四分位点は近似値。ひげの端と外れ値はスケッチに残っている値（と正確な最小値・最大値）から選ぶ。
+
+        Args:
+            whis: ひげの長さ（四分位範囲の倍数）
+            max_fliers: 描画する外れ値の最大数
+
+        Returns:
+            Axes.bxp に渡す辞書（値を追加していない場合はNone）
+        """
+        if self.count == 0:
+            return None
+        q1, med, q3 = (float(q) for q in self.quantiles([0.25, 0.5, 0.75]))
+        values = np.concatenate([self._weighted()[0], [self.min, self.max]])
+        return _box_stats(values, q1, med, q3, self.total / self.count, whis, max_fliers)
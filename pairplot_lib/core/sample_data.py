@@ -2,6 +2,10 @@
 サンプルデータ生成モジュール
 """
 import os
+from typing import List
+
+# 合成データを書き出すときに1度に生成する行数
+SYNTHETIC_CHUNK_ROWS = 500_000
 
 
 # タブ区切りのサンプルデータ（sample_data1.csv）
@@ -136,3 +140,85 @@ def create_sample_data_files(data_dir: str) -> None:
         with open(sample2_path, 'w', encoding='utf-8') as f:
             f.write(SAMPLE_DATA2_CSV)
         print(f"  ✓ sample_data2.csv を作成しました（カンマ区切り）")
+
+
+def synthetic_column_names(n_cols: int) -> List[str]:
+    """
+    合成データの数値列名を作成
+
+    Args:
+        n_cols: 数値列の数
+
+    Returns:
+        列名のリスト（'c0', 'c1', ...）
+    """
+    return [f"c{i}" for i in range(n_cols)]
+
+
+def generate_synthetic_csv(
+    file_path: str,
+    n_rows: int,
+    n_cols: int,
+    nan_fraction: float = 0.0,
+    delimiter: str = ',',
+    n_groups: int = 0,
+    seed: int = 0
+) -> str:
+    """
+    ベンチマーク用の合成データCSVを作成
+
+    各列は共通の因子と列ごとのノイズの和なので、列ペアには適度な相関がある。
+    同じ引数（seedを含む）であれば常に同じ内容のファイルになる。
+    大きなファイルでもメモリを使いすぎないよう SYNTHETIC_CHUNK_ROWS 行ずつ書き出す。
+
+    Args:
+        file_path: 出力ファイルのパス
+        n_rows: 行数
+        n_cols: 数値列の数
+        nan_fraction: 欠損値にするセルの割合（0〜1）
+        delimiter: 区切り文字（',', '\t', ';', '|', ' ' のいずれか）
+        n_groups: z列のグループ数（0の場合はz列を作らない）
+        seed: 乱数のシード
+
+    Returns:
+        作成したファイルのパス
+    """
+    import numpy as np
+    import pandas as pd
+
+    if n_rows < 1 or n_cols < 1:
+        raise ValueError("エラー: 行数と列数は1以上を指定してください。")
+    if not 0.0 <= nan_fraction < 1.0:
+        raise ValueError("エラー: 欠損値の割合は0以上1未満を指定してください。")
+
+    rng = np.random.default_rng(seed)
+    columns = synthetic_column_names(n_cols)
+    # 列ごとに因子の重み・スケール・オフセットを変えて、値の範囲が列ごとに異なるようにする
+    loadings = rng.uniform(-1.0, 1.0, n_cols)
+    scales = 10.0 ** rng.integers(0, 6, n_cols)
+    offsets = rng.uniform(0.0, 10.0, n_cols) * scales
+
+    # 空白区切りでは空欄を欠損値として表せないので 'nan' と書く
+    na_rep = 'nan' if delimiter == ' ' else ''
+
+    with open(file_path, 'w', encoding='utf-8', newline='') as f:
+        f.write("# Synthetic data for pairplot benchmarks\n")
+        f.write(f"# rows={n_rows} cols={n_cols} nan_fraction={nan_fraction} "
+                f"groups={n_groups} seed={seed}\n")
+        header = True
+        for start in range(0, n_rows, SYNTHETIC_CHUNK_ROWS):
+            size = min(SYNTHETIC_CHUNK_ROWS, n_rows - start)
+            factor = rng.standard_normal((size, 1))
+            noise = rng.standard_normal((size, n_cols))
+            values = (factor * loadings + noise) * scales + offsets
+            if nan_fraction > 0:
+                values[rng.random((size, n_cols)) < nan_fraction] = np.nan
+
+            chunk = pd.DataFrame(values, columns=columns)
+            if n_groups > 0:
+                chunk['z'] = rng.integers(0, n_groups, size)
+            chunk.to_csv(f, sep=delimiter, index=False, header=header,
+                         na_rep=na_rep, float_format='%.6g')
+            header = False
+
+    return file_path
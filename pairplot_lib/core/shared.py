@@ -0,0 +1,175 @@
+"""
+共有メモリ上の Dataset
+
+親プロセスで1回だけ読み込んだ数値列の配列と'z'列のグループ番号を共有メモリ
+（multiprocessing.shared_memory）に置き、ワーカープロセスには共有メモリの名前と配列の形だけ
+（SharedDatasetHandle）を渡す。ワーカーは同じメモリをコピーせずに配列として参照するので、
+ワーカー数を増やしてもデータのコピーは増えない。
+
+共有メモリの中身は次の順に並べる:
+    values: (行数, 列数) の float64（列ごとに連続した Fortran 順）
+    codes:  各行のグループ番号（intp、'z'列がある場合のみ）
+    order:  グループ番号の順に並べた行番号（intp、'z'列がある場合のみ）
+    counts: グループごとの行数（intp、'z'列がある場合のみ）
+"""
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from .data_loader import get_numeric_columns
+from .dataset import Dataset
+from .groups import GroupIndex
+
+# ワーカープロセスが開いたままにしておく共有メモリの最大数
+MAX_ATTACHED = 4
+
+
+class SharedDatasetHandle(NamedTuple):
+    """
+    共有メモリ上の Dataset をワーカーで開くための情報（pickle してもデータを含まない）
+
+    Attributes:
+        name: 共有メモリの名前
+        n_rows: 行数
+        columns: 数値列の列名
+        source_columns: 元のデータの全ての列名
+        labels: 'z'列のグループ番号に対応する値（'z'列がない場合はNone）
+        n_grouped: 'z'列が欠損していない行数
+    """
+    name: str
+    n_rows: int
+    columns: List[str]
+    source_columns: List[str]
+    labels: Optional[list] = None
+    n_grouped: int = 0
+
+
+def _layout(handle: SharedDatasetHandle):
+    """共有メモリ内の各配列の (dtype, 形, 開始位置) と全体のバイト数"""
+    parts = [('values', np.float64, (handle.n_rows, len(handle.columns)))]
+    if handle.labels is not None:
+        parts += [('codes', np.intp, (handle.n_rows,)),
+                  ('order', np.intp, (handle.n_grouped,)),
+                  ('counts', np.intp, (len(handle.labels),))]
+    layout = {}
+    offset = 0
+    for name, dtype, shape in parts:
+        layout[name] = (dtype, shape, offset)
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return layout, offset
+
+
+def _arrays(buffer, handle: SharedDatasetHandle) -> dict:
+    """共有メモリを各配列として参照する（コピーしない）"""
+    layout, _ = _layout(handle)
+    return {
+        name: np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset,
+                         order='F' if name == 'values' else 'C')
+        for name, (dtype, shape, offset) in layout.items()
+    }
+
+
+class SharedDataset:
+    """
+    共有メモリに置いた Dataset（作成したプロセスが所有し、close で共有メモリを削除する）
+
+    with 文で使うと、抜けるときに必ず共有メモリを削除する。
+
+    Attributes:
+        handle: ワーカーに渡す SharedDatasetHandle
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        DataFrame の数値列と'z'列のグループ番号を共有メモリに書き込む
+
+        数値列は1列ずつ共有メモリに直接変換するので、DataFrame 以外に全体のコピーを作らない。
+
+        Args:
+            df: 入力DataFrame
+        """
+        columns = get_numeric_columns(df)
+        groups = GroupIndex.from_series(df['z']) if 'z' in df.columns else None
+        self.handle = SharedDatasetHandle(
+            name='',
+            n_rows=len(df),
+            columns=columns,
+            source_columns=df.columns.tolist(),
+            labels=groups.labels if groups is not None else None,
+            n_grouped=int(groups.counts.sum()) if groups is not None else 0,
+        )
+        _, size = _layout(self.handle)
+        # 大きさ0の共有メモリは作れないので最低1バイト確保する
+        self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.handle = self.handle._replace(name=self._shm.name)
+        arrays = _arrays(self._shm.buf, self.handle)
+        try:
+            for k, col in enumerate(columns):
+                arrays['values'][:, k] = df[col].to_numpy(dtype=float)
+            if groups is not None:
+                arrays['codes'][:] = groups.codes
+                arrays['order'][:] = groups.order
+                arrays['counts'][:] = groups.counts
+        except BaseException:
+            # 共有メモリを参照している配列を手放してから削除する
+            arrays = None
+            self.close()
+            raise
+
+    def close(self) -> None:
+        """共有メモリを削除する（ワーカーが開いている間は、閉じられるまでメモリは残る）"""
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self) -> "SharedDataset":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# ワーカープロセス内で開いている共有メモリ（名前 -> (SharedMemory, Dataset)）
+_attached: "OrderedDict[str, tuple]" = OrderedDict()
+
+
+def attach_dataset(handle: SharedDatasetHandle) -> Dataset:
+    """
+    共有メモリ上の Dataset を開く（ワーカープロセスで使う）
+
+    配列は共有メモリをそのまま参照し、書き換えられないようにする。同じ共有メモリは
+    プロセスごとに1回だけ開き、最近使った MAX_ATTACHED 個まで開いたままにしておく。
+
+    Args:
+        handle: SharedDataset.handle
+
+    Returns:
+        Dataset
+    """
+    if handle.name in _attached:
+        _attached.move_to_end(handle.name)
+        return _attached[handle.name][1]
+
+    shm = shared_memory.SharedMemory(name=handle.name)
+    arrays = _arrays(shm.buf, handle)
+    for array in arrays.values():
+        array.flags.writeable = False
+    groups = None
+    if handle.labels is not None:
+        groups = GroupIndex.from_parts(arrays['codes'], handle.labels, arrays['order'], arrays['counts'])
+    dataset = Dataset(arrays['values'], handle.columns, groups, handle.source_columns)
+
+    _attached[handle.name] = (shm, dataset)
+    while len(_attached) > MAX_ATTACHED:
+        _, (old_shm, old_dataset) = _attached.popitem(last=False)
+        del old_dataset
+        try:
+            old_shm.close()
+        except BufferError:
+            # 配列がまだ使われている場合は、参照がなくなったときに解放される
+            pass
+    return dataset
@@ -0,0 +1,345 @@
+"""
+列ペアの統計量をまとめて計算する数値計算エンジン
+
+全ての列ペアについて、両方の値が揃っている行（pairwise-complete）だけを使った
+相関係数や回帰直線などを、列ペアごとのループではなく行列演算1回で計算する。
+
+統計量は列ペアごとの平均・偏差平方和・偏差積和（PairwiseMoments）から求める。
+チャンクごとに計算したモーメントは merge_moments で合わせられるので（Chanらの更新式）、
+ファイル全体をメモリに載せずに、またワーカーごとに分担して計算した結果を合わせて集計できる。
+"""
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+# 行列演算をまとめて行う行数（一時配列のメモリ使用量を抑える）
+BLOCK_ROWS = 65536
+
+
+class PairwiseSums(NamedTuple):
+    """
+    列ペアごとの集計値（各列は shift を引いて中心化済み）
+
+    Attributes:
+        n: n[i, j] = 列iと列jの両方が欠損していない行数
+        sx: sx[i, j] = その行における列iの値の和
+        sxx: sxx[i, j] = その行における列iの値の二乗和
+        sxy: sxy[i, j] = その行における列iと列jの積の和
+        shift: 各列から引いた値（数値誤差を抑えるための列平均）
+    """
+    n: np.ndarray
+    sx: np.ndarray
+    sxx: np.ndarray
+    sxy: np.ndarray
+    shift: np.ndarray
+
+
+class PairwiseMoments(NamedTuple):
+    """
+    列ペアごとのモーメント（両方の値が揃っている行のみ）
+
+    Attributes:
+        n: n[i, j] = 列iと列jの両方が欠損していない行数
+        mean: mean[i, j] = その行における列iの平均
+        m2: m2[i, j] = その行における列iの偏差平方和
+        cxy: cxy[i, j] = その行における列iと列jの偏差積和
+    """
+    n: np.ndarray
+    mean: np.ndarray
+    m2: np.ndarray
+    cxy: np.ndarray
+
+
+class CorrelationResult(NamedTuple):
+    """
+    相関係数行列の計算結果
+
+    Attributes:
+        r: 相関係数行列（計算できないペアはNaN）
+        n: 各ペアの計算に使った行数
+        p: 無相関検定のp値行列（要求しなかった場合はNone）
+    """
+    r: np.ndarray
+    n: np.ndarray
+    p: Optional[np.ndarray]
+
+
+class RegressionResult(NamedTuple):
+    """
+    全ての列ペアの単回帰（最小二乗法）の計算結果
+
+    添字 [i, j] は列jをx、列iをyとした回帰（ペアプロットの i 行 j 列目のパネル）。
+
+    Attributes:
+        slope: 傾き
+        intercept: 切片
+        r2: 決定係数
+        stderr: 傾きの標準誤差
+        n: 計算に使った行数
+        x_min: 計算に使った行における x の最小値
+        x_max: 計算に使った行における x の最大値
+    """
+    slope: np.ndarray
+    intercept: np.ndarray
+    r2: np.ndarray
+    stderr: np.ndarray
+    n: np.ndarray
+    x_min: np.ndarray
+    x_max: np.ndarray
+
+
+class PairplotStats(NamedTuple):
+    """
+    ペアプロットの注釈と対角に使う集計済みの統計量（添字は描画する列の順序）
+
+    Attributes:
+        moments: 列ペアごとのモーメント（pairwise_moments）
+        x_min: 列ペアごとの x の最小値（pairwise_ranges）
+        x_max: 列ペアごとの x の最大値（pairwise_ranges）
+        histograms: 列ごとの対角のヒストグラム（ColumnHistogram、値のない列はNone）
+    """
+    moments: PairwiseMoments
+    x_min: np.ndarray
+    x_max: np.ndarray
+    histograms: Optional[list] = None
+
+
+def pairwise_sums(values: np.ndarray) -> PairwiseSums:
+    """
+    全ての列ペアについて pairwise-complete な和を計算
+
+    Args:
+        values: (行数, 列数) の数値配列（欠損値はNaN）
+
+    Returns:
+        PairwiseSums
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim != 2:
+        raise ValueError("エラー: 2次元の配列が必要です。")
+
+    n_cols = values.shape[1]
+    with np.errstate(invalid='ignore'):
+        counts = np.sum(np.isfinite(values), axis=0)
+        shift = np.where(counts > 0, np.nansum(values, axis=0) / np.maximum(counts, 1), 0.0)
+
+    n = np.zeros((n_cols, n_cols))
+    sx = np.zeros((n_cols, n_cols))
+    sxx = np.zeros((n_cols, n_cols))
+    sxy = np.zeros((n_cols, n_cols))
+    for start in range(0, values.shape[0], BLOCK_ROWS):
+        block = values[start:start + BLOCK_ROWS]
+        valid = np.isfinite(block)
+        mask = valid.astype(np.float64)
+        centered = np.where(valid, block - shift, 0.0)
+        n += mask.T @ mask
+        sx += centered.T @ mask
+        sxx += (centered * centered).T @ mask
+        sxy += centered.T @ centered
+
+    return PairwiseSums(n, sx, sxx, sxy, shift)
+
+
+def moments_from_sums(sums: PairwiseSums) -> PairwiseMoments:
+    """
+    pairwise_sums の結果を列ペアごとのモーメントに変換
+
+    Args:
+        sums: pairwise_sums の戻り値
+
+    Returns:
+        PairwiseMoments（行数が0のペアの平均はNaN）
+    """
+    n = sums.n
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = sums.shift[:, None] + sums.sx / n
+        m2 = sums.sxx - sums.sx ** 2 / n
+        cxy = sums.sxy - sums.sx * sums.sx.T / n
+    empty = n == 0
+    return PairwiseMoments(n, np.where(empty, np.nan, mean), np.where(empty, 0.0, m2),
+                           np.where(empty, 0.0, cxy))
+
+
+def pairwise_moments(values: np.ndarray) -> PairwiseMoments:
+    """
+    全ての列ペアのモーメントを pairwise-complete で計算
+
+    Args:
+        values: (行数, 列数) の数値配列（欠損値はNaN）
+
+    Returns:
+        PairwiseMoments
+    """
+    return moments_from_sums(pairwise_sums(values))
+
+
+def merge_moments(a: PairwiseMoments, b: PairwiseMoments) -> PairwiseMoments:
+    """
+    別々の行について計算した2つのモーメントを合わせる（Chanらの更新式）
+
+    和をそのまま足すのではなく平均の差で補正するので、チャンクごとに平均が大きく
+    異なっても桁落ちしない。順序によらず同じ結果になるため、並列に計算した結果を
+    どの順で合わせてもよい。
+
+    Args:
+        a: 一方の行のモーメント
+        b: もう一方の行のモーメント（列の並びは a と同じ）
+
+    Returns:
+        両方の行を合わせた PairwiseMoments
+    """
+    if a.n.shape != b.n.shape:
+        raise ValueError("エラー: 列数の異なるモーメントは合わせられません。")
+    n = a.n + b.n
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # [i, j] は列iの平均の差、転置すると同じ行での列jの平均の差
+        delta = b.mean - a.mean
+        weight = a.n * b.n / n
+        mean = a.mean + delta * (b.n / n)
+        m2 = a.m2 + b.m2 + delta ** 2 * weight
+        cxy = a.cxy + b.cxy + delta * delta.T * weight
+
+    # 片方に行がないペアはもう片方の値をそのまま使う
+    only_a = b.n == 0
+    only_b = a.n == 0
+    return PairwiseMoments(
+        n,
+        np.where(only_a, a.mean, np.where(only_b, b.mean, mean)),
+        np.where(only_a, a.m2, np.where(only_b, b.m2, m2)),
+        np.where(only_a, a.cxy, np.where(only_b, b.cxy, cxy)),
+    )
+
+
+def correlation_from_moments(moments: PairwiseMoments, with_pvalues: bool = False) -> CorrelationResult:
+    """
+    列ペアごとのモーメントからPearsonの相関係数行列を計算
+
+    Args:
+        moments: pairwise_moments・merge_moments の戻り値
+        with_pvalues: Trueの場合は無相関検定のp値も計算する
+
+    Returns:
+        CorrelationResult
+    """
+    n = moments.n
+    var_x = moments.m2
+    var_y = var_x.T
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = moments.cxy / np.sqrt(var_x * var_y)
+    r = np.where((n >= 2) & (var_x > 0) & (var_y > 0), np.clip(r, -1.0, 1.0), np.nan)
+
+    p = None
+    if with_pvalues:
+        from scipy import stats
+        dof = n - 2
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = r * np.sqrt(dof / (1.0 - r * r))
+            p = 2.0 * stats.t.sf(np.abs(t), dof)
+        p = np.where(np.isnan(r) | (dof < 1), np.nan, p)
+
+    return CorrelationResult(r, n.astype(np.int64), p)
+
+
+def pairwise_correlation(values: np.ndarray, with_pvalues: bool = False) -> CorrelationResult:
+    """
+    全ての列ペアの相関係数を pairwise-complete で一括計算
+
+    DataFrame.corr() や列ペアごとの scipy.stats.pearsonr と同じ値になる。
+
+    Args:
+        values: (行数, 列数) の数値配列（欠損値はNaN）
+        with_pvalues: Trueの場合は無相関検定のp値も計算する
+
+    Returns:
+        CorrelationResult
+    """
+    return correlation_from_moments(pairwise_moments(values), with_pvalues)
+
+
+def pairwise_ranges(values: np.ndarray):
+    """
+    全ての列ペアについて、両方の値が揃っている行での最小値・最大値を計算
+
+    Args:
+        values: (行数, 列数) の数値配列（欠損値はNaN）
+
+    Returns:
+        (x_min, x_max) のタプル。x_min[i, j] は列iと列jが揃っている行での列jの最小値
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_cols = values.shape[1]
+    x_min = np.full((n_cols, n_cols), np.inf)
+    x_max = np.full((n_cols, n_cols), -np.inf)
+    for start in range(0, values.shape[0], BLOCK_ROWS):
+        block = values[start:start + BLOCK_ROWS]
+        valid = np.isfinite(block)
+        for j in range(n_cols):
+            both = valid & valid[:, j:j + 1]
+            x = block[:, j:j + 1]
+            x_min[:, j] = np.minimum(x_min[:, j], np.where(both, x, np.inf).min(axis=0))
+            x_max[:, j] = np.maximum(x_max[:, j], np.where(both, x, -np.inf).max(axis=0))
+
+    x_min[np.isinf(x_min)] = np.nan
+    x_max[np.isinf(x_max)] = np.nan
+    return x_min, x_max
+
+
+def merge_ranges(a, b):
+    """
+    2つの pairwise_ranges の結果を合わせる（欠損値のペアは他方の値を使う）
+
+    Args:
+        a: 元のデータの (x_min, x_max)
+        b: 追加したデータの (x_min, x_max)
+
+    Returns:
+        両方のデータを合わせた (x_min, x_max) のタプル
+    """
+    return np.fmin(a[0], b[0]), np.fmax(a[1], b[1])
+
+
+def regression_from_moments(moments: PairwiseMoments, x_min: np.ndarray, x_max: np.ndarray) -> RegressionResult:
+    """
+    列ペアごとのモーメントから全ての列ペアの回帰直線を計算
+
+    Args:
+        moments: pairwise_moments・merge_moments の戻り値
+        x_min: pairwise_ranges の戻り値の最小値
+        x_max: pairwise_ranges の戻り値の最大値
+
+    Returns:
+        RegressionResult
+    """
+    n = moments.n
+    # [i, j]: y = 列i, x = 列j
+    cov = moments.cxy
+    ss_y = moments.m2
+    ss_x = ss_y.T
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = cov / ss_x
+        intercept = moments.mean - slope * moments.mean.T
+        r2 = np.clip(cov * cov / (ss_x * ss_y), 0.0, 1.0)
+        stderr = np.sqrt((1.0 - r2) * ss_y / ss_x / (n - 2))
+
+    valid = (n >= 2) & (ss_x > 0)
+    slope = np.where(valid, slope, np.nan)
+    intercept = np.where(valid, intercept, np.nan)
+    r2 = np.where(valid & (ss_y > 0), r2, np.nan)
+    stderr = np.where(valid & (n > 2), stderr, np.nan)
+    return RegressionResult(slope, intercept, r2, stderr, n.astype(np.int64), x_min, x_max)
+
+
+def pairwise_regression(values: np.ndarray) -> RegressionResult:
+    """
+    全ての列ペアの単回帰を pairwise-complete で一括計算
+
+    列ペアごとの scipy.stats.linregress と同じ傾き・切片・標準誤差になる。
+
+    Args:
+        values: (行数, 列数) の数値配列（欠損値はNaN）
+
+    Returns:
+        RegressionResult
+    """
+    x_min, x_max = pairwise_ranges(values)
+    return regression_from_moments(pairwise_moments(values), x_min, x_max)
@@ -0,0 +1,98 @@
+"""
+数値列のメモリマップ保存
+
+クリーニング済みの数値列と'z'列のグループ番号を .npy ファイルに保存し、np.memmap で開く。
+開くときはファイルを読まずにメモリマップするだけなので、メモリより大きなデータでもすぐに開け、
+実際に読み込まれるのは描画に使う列のページだけになる。
+
+保存先のディレクトリの中身:
+    schema.json: 形式のバージョン・行数・列名・'z'列のグループの値（最後に書き込む）
+    values.npy:  (行数, 列数) の float64（Fortran 順なので1列ずつ連続している）
+    codes.npy:   各行のグループ番号（'z'列がある場合のみ）
+    order.npy:   グループ番号の順に並べた行番号（'z'列がある場合のみ）
+"""
+import json
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .data_loader import get_numeric_columns
+from .dataset import Dataset
+from .groups import GroupIndex
+
+# 保存形式のバージョン（形式を変えたら上げる）
+STORE_FORMAT_VERSION = 1
+
+SCHEMA_FILE_NAME = 'schema.json'
+
+
+def write_numeric_store(df: pd.DataFrame, directory: str) -> None:
+    """
+    DataFrame の数値列と'z'列のグループ番号を保存
+
+    数値列は1列ずつメモリマップしたファイルに直接書き込むので、DataFrame 以外に全体のコピーを作らない。
+    schema.json を最後に書き込むので、途中で中断したディレクトリは開けない（不完全なまま使われない）。
+
+    Args:
+        df: 入力DataFrame（load_csv_robust の戻り値など）
+        directory: 保存先のディレクトリ（なければ作成する）
+    """
+    os.makedirs(directory, exist_ok=True)
+    columns = get_numeric_columns(df)
+    values = np.lib.format.open_memmap(os.path.join(directory, 'values.npy'), mode='w+', dtype=np.float64,
+                                       shape=(len(df), len(columns)), fortran_order=True)
+    for k, col in enumerate(columns):
+        values[:, k] = df[col].to_numpy(dtype=float)
+    values.flush()
+    del values
+
+    schema = {
+        'version': STORE_FORMAT_VERSION,
+        'n_rows': len(df),
+        'columns': columns,
+        'source_columns': df.columns.tolist(),
+        'z': None,
+    }
+    if 'z' in df.columns:
+        groups = GroupIndex.from_series(df['z'])
+        np.save(os.path.join(directory, 'codes.npy'), groups.codes)
+        np.save(os.path.join(directory, 'order.npy'), groups.order)
+        schema['z'] = {'labels': groups.labels, 'counts': groups.counts.tolist()}
+
+    # JSONにできない'z'の値（日時など）は文字列にする（グループの値は表示にしか使わない）
+    with open(os.path.join(directory, SCHEMA_FILE_NAME), 'w', encoding='utf-8') as f:
+        json.dump(schema, f, ensure_ascii=False, default=str)
+
+
+def open_numeric_store(directory: str) -> Dataset:
+    """
+    write_numeric_store で保存したデータをメモリマップで開く
+
+    Args:
+        directory: 保存先のディレクトリ
+
+    Returns:
+        配列がファイルを直接参照する（書き換えできない）Dataset
+
+    Raises:
+        ValueError: 保存形式のバージョンが異なる、または書き込みが完了していない場合
+    """
+    schema_path = os.path.join(directory, SCHEMA_FILE_NAME)
+    try:
+        with open(schema_path, 'r', encoding='utf-8') as f:
+            schema = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"エラー: 保存されたデータを開けません: {directory} ({e})")
+    if schema.get('version') != STORE_FORMAT_VERSION:
+        raise ValueError(f"エラー: 保存されたデータの形式が異なります: {directory}")
+
+    values = np.load(os.path.join(directory, 'values.npy'), mmap_mode='r')
+    groups: Optional[GroupIndex] = None
+    if schema['z'] is not None:
+        groups = GroupIndex.from_parts(np.load(os.path.join(directory, 'codes.npy'), mmap_mode='r'),
+                                       schema['z']['labels'],
+                                       np.load(os.path.join(directory, 'order.npy'), mmap_mode='r'),
+                                       np.asarray(schema['z']['counts'], dtype=np.intp))
+    return Dataset(values, schema['columns'], groups, schema['source_columns'])
@@ -0,0 +1,262 @@
+"""
+追記され続けるCSVの差分読み込み
+
+前回読み込んだ位置（バイトオフセット）を覚えておき、2回目以降は追記された行だけを解析する。
+ペアプロットの注釈に使う列ペアのモーメント・範囲と対角のヒストグラムも追記分だけで更新するので、
+更新にかかる時間はファイル全体ではなく追記された行数に比例する。
+数値列の値と'z'のグループ番号は容量を倍々に広げる配列に追記し、Dataset はその先頭の行を
+コピーせずに参照する（散布図のパネルは全ての行を描画する）。
+"""
+import hashlib
+import io
+import os
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from .data_loader import _read_csv_kwargs, sniff_dialect
+from .dataset import Dataset
+from .groups import GroupIndex
+from .histogram import ColumnHistogram
+from .quantiles import QuantileSketch
+from .stats import PairplotStats, PairwiseMoments, merge_moments, merge_ranges, pairwise_moments, pairwise_ranges
+
+# ファイルの先頭が書き換えられていないかを確認するために読むバイト数
+HEAD_CHECK_BYTES = 64 * 1024
+
+
+def _complete_lines_end(file_path: str, size: int) -> int:
+    """
+    ファイルの最後の改行の直後のバイト位置（書き込み途中の最終行を除いた終わり）
+
+    Args:
+        file_path: ファイルのパス
+        size: ファイルサイズ
+
+    Returns:
+        バイト位置（改行がない場合は0）
+    """
+    block = 64 * 1024
+    with open(file_path, 'rb') as f:
+        pos = size
+        while pos > 0:
+            start = max(0, pos - block)
+            f.seek(start)
+            found = f.read(pos - start).rfind(b'\n')
+            if found >= 0:
+                return start + found + 1
+            pos = start
+    return 0
+
+
+class _PrefixReader(io.RawIOBase):
+    """ファイルの先頭 limit バイトだけを読むリーダー（解析中に追記された行を含めないため）"""
+
+    def __init__(self, f, limit: int):
+        self._f = f
+        self._left = limit
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        n = self._f.readinto(memoryview(buffer)[:min(len(buffer), self._left)])
+        self._left -= n
+        return n
+
+
+def _head_digest(file_path: str, n_bytes: int) -> str:
+    """ファイル先頭 n_bytes バイトのハッシュ"""
+    with open(file_path, 'rb') as f:
+        return hashlib.blake2b(f.read(n_bytes), digest_size=16).hexdigest()
+
+
+class TailDataset:
+    """
+    追記され続けるCSVを差分で読み込み、ペアプロット用の統計量を更新し続ける
+
+    ファイルが短くなった場合や先頭が書き換えられた場合は、全体を読み込み直す。
+    最後の改行より後ろ（書き込み途中の行）は次回の更新で読み込む。
+
+    Attributes:
+        file_path: CSVファイルのパス
+        n_rows: 読み込み済みの行数
+        columns: 元のデータの列名
+        dataset: 読み込み済みのデータの Dataset（描画はこれを使い、計算した統計量を描画の間で共有する）
+        numeric_cols: 統計量を集計する数値列（'z'列を含む）
+        groups: 'z'列の値の一覧（昇順）
+        sketches: 数値列ごとの分位点のスケッチ（散布図の箱ひげ図用）
+        offset: 次に読み込むバイト位置
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.load()
+
+    def load(self) -> None:
+        """ファイル全体を読み込み、統計量を最初から集計する"""
+        self.dialect = sniff_dialect(self.file_path)
+        self._kwargs = _read_csv_kwargs(self.dialect)
+
+        size = os.path.getsize(self.file_path)
+        end = _complete_lines_end(self.file_path, size)
+        # 最後の改行までだけを解析する（書き込み途中の行と解析中の追記は次回の更新で読む）
+        with open(self.file_path, 'rb') as f:
+            df = pd.read_csv(io.BufferedReader(_PrefixReader(f, end)), **self._kwargs)
+
+        # 後から追記される行はヘッダーがないので、元の列名（空白や空の列を含む）を覚えておく
+        self._raw_columns = list(df.columns)
+        df.columns = df.columns.str.strip()
+        self._keep = ~df.columns.str.match('^Unnamed')
+        df = df.loc[:, self._keep]
+        if len(df.columns) <= 1:
+            raise ValueError(f"ファイル '{self.file_path}' を読み込めませんでした。ファイル形式を確認してください。")
+
+        self.numeric_cols = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col])]
+        self.columns = df.columns.tolist()
+        self.n_rows = 0
+        # 追記する配列（容量は行数より大きく、先頭の n_rows 行だけが読み込み済みのデータ）
+        self._values = np.empty((0, len(self.numeric_cols)), order='F')
+        self._codes = np.empty(0, dtype=np.intp)
+        self._dataset = None
+        self.offset = end
+        self._head_bytes = min(end, HEAD_CHECK_BYTES)
+        self._head = _head_digest(self.file_path, self._head_bytes)
+
+        values = df[self.numeric_cols].to_numpy(dtype=float)
+        self.moments = pairwise_moments(values)
+        self.ranges = pairwise_ranges(values)
+        self.groups = sorted(df['z'].dropna().unique()) if 'z' in df.columns else []
+        codes = self._group_codes(df)
+        self.histograms = [ColumnHistogram.from_values(values[:, k], codes, len(self.groups) + 1)
+                           for k in range(len(self.numeric_cols))]
+        self.sketches = {col: QuantileSketch() for col in self.numeric_cols}
+        for k, col in enumerate(self.numeric_cols):
+            self.sketches[col].add(values[:, k])
+        self._append(values, codes)
+
+    def _append(self, values: np.ndarray, codes: np.ndarray) -> None:
+        """数値列の値とグループ番号を追記する（容量が足りない場合は倍に広げる）"""
+        n = self.n_rows + len(values)
+        if n > len(self._values):
+            capacity = max(n, 2 * len(self._values))
+            grown = np.empty((capacity, len(self.numeric_cols)), order='F')
+            grown[:self.n_rows] = self._values[:self.n_rows]
+            grown_codes = np.empty(capacity, dtype=np.intp)
+            grown_codes[:self.n_rows] = self._codes[:self.n_rows]
+            self._values, self._codes = grown, grown_codes
+        # 作成済みの Dataset は先頭の n_rows 行だけを参照しているので、後ろに書き込んでも変わらない
+        self._values[self.n_rows:n] = values
+        self._codes[self.n_rows:n] = np.where(codes < len(self.groups), codes, -1)
+        self.n_rows = n
+
+    def _group_codes(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        各行のグループ番号（'z'が欠損・'z'列なしの行は最後の番号 len(groups)）
+
+        ヒストグラムはグループごとの度数に加えて、グループのない行の度数も持つ
+        （基本ペアプロットでは全ての行を数えるため）。
+        """
+        if 'z' not in df.columns:
+            return np.zeros(len(df), dtype=np.intp)
+        codes = pd.Index(self.groups).get_indexer(df['z'])
+        codes[codes < 0] = len(self.groups)
+        return codes
+
+    def _add_groups(self, z: pd.Series) -> None:
+        """追記された行に新しい'z'の値があればグループを増やし、ヒストグラムの番号を付け直す"""
+        new = set(z.dropna().unique()) - set(self.groups)
+        if not new:
+            return
+        groups = sorted(set(self.groups) | new)
+        index_map = [groups.index(g) for g in self.groups] + [len(groups)]
+        self.histograms = [h.regroup(index_map, len(groups) + 1) if h is not None else None
+                           for h in self.histograms]
+        # 読み込み済みの行のグループ番号も付け直す（作成済みの Dataset が参照している配列は書き換えない）
+        codes = self._codes.copy()
+        head = codes[:self.n_rows]
+        head[head >= 0] = np.asarray(index_map, dtype=np.intp)[head[head >= 0]]
+        self._codes = codes
+        self.groups = groups
+
+    def refresh(self) -> int:
+        """
+        追記された行を読み込み、統計量を更新する
+
+        Returns:
+            新しく読み込んだ行数（全体を読み込み直した場合は全行数）
+        """
+        size = os.path.getsize(self.file_path)
+        if size < self.offset or _head_digest(self.file_path, self._head_bytes) != self._head:
+            print("ファイルが書き換えられたため、全体を読み込み直します。")
+            self.load()
+            return self.n_rows
+
+        with open(self.file_path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return 0
+        self.offset += end
+
+        new = pd.read_csv(io.BytesIO(data[:end]), header=None, names=self._raw_columns, **self._kwargs)
+        new = new.loc[:, self._keep]
+        new.columns = self.columns
+        if new.empty:
+            return 0
+        for col in self.numeric_cols:
+            new[col] = pd.to_numeric(new[col], errors='coerce')
+
+        values = new[self.numeric_cols].to_numpy(dtype=float)
+        self.moments = merge_moments(self.moments, pairwise_moments(values))
+        self.ranges = merge_ranges(self.ranges, pairwise_ranges(values))
+        if 'z' in new.columns:
+            self._add_groups(new['z'])
+        codes = self._group_codes(new)
+        for k, hist in enumerate(self.histograms):
+            if hist is None:
+                self.histograms[k] = ColumnHistogram.from_values(values[:, k], codes, len(self.groups) + 1)
+            else:
+                hist.add(values[:, k], codes)
+        for k, col in enumerate(self.numeric_cols):
+            self.sketches[col].add(values[:, k])
+
+        self._append(values, codes)
+        self._dataset = None
+        return len(new)
+
+    @property
+    def dataset(self) -> Dataset:
+        """読み込み済みのデータの Dataset（次に行が追記されるまで使い回す）"""
+        if self._dataset is None:
+            groups = GroupIndex(self._codes[:self.n_rows], self.groups) if 'z' in self.columns else None
+            self._dataset = Dataset(self._values[:self.n_rows], self.numeric_cols, groups, self.columns)
+        return self._dataset
+
+    def pairplot_stats(self, columns: List[str], grouped: bool = False) -> PairplotStats:
+        """
+        指定した列の集計済み統計量を取り出す
+
+        Args:
+            columns: 描画する列（numeric_cols に含まれる列）
+            grouped: Trueの場合はヒストグラムを'z'のグループごとにする（色分けペアプロット用）
+
+        Returns:
+            PairplotStats
+        """
+        idx = [self.numeric_cols.index(col) for col in columns]
+        sub = np.ix_(idx, idx)
+        moments = PairwiseMoments(*(m[sub] for m in self.moments))
+
+        n_groups = len(self.groups)
+        if grouped:
+            index_map = list(range(n_groups)) + [-1]
+            out_groups = n_groups
+        else:
+            index_map = [0] * (n_groups + 1)
+            out_groups = 1
+        histograms = [self.histograms[k].regroup(index_map, out_groups) if self.histograms[k] is not None
+                      else None for k in idx]
+        return PairplotStats(moments, self.ranges[0][sub], self.ranges[1][sub], histograms)
@@ -0,0 +1,226 @@
+"""
+ビルドマニフェスト - 出力画像ごとに入力と描画条件を記録し、変更のないジョブを省略する
+
+出力フォルダに .pairplot_manifest.json を置き、画像ごとに
+入力ファイルの内容ハッシュ・プロットタイプ・列・表示タイプ・ライブラリのバージョンを記録する。
+同じ条件のジョブを再び実行するとき、入力の内容が変わっておらず画像も残っていれば描画を省略する。
+表示タイプなどが違うジョブは同じ画像ファイルに書き込むので、画像のサイズと更新時刻も記録し、
+記録した後に別の条件で上書きされた画像は描画し直す。
+"""
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, Tuple
+
+from . import __version__
+from .batch import JobResult, RenderJob
+
+MANIFEST_FILE_NAME = '.pairplot_manifest.json'
+
+# 内容ハッシュを計算するときに1度に読む大きさ
+HASH_READ_BYTES = 4 * 1024 * 1024
+
+
+def content_hash(file_path: str) -> str:
+    """
+    ファイル全体の内容ハッシュを計算
+
+    Args:
+        file_path: ファイルのパス
+
+    Returns:
+        16進数のハッシュ文字列
+    """
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_READ_BYTES), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def job_signature(job: RenderJob) -> dict:
+    """
+    出力画像を決める描画条件（出力フォルダ以外で、プロットタイプに関係する RenderJob の内容）
+
+    Args:
+        job: 描画ジョブ
+
+    Returns:
+        描画条件の辞書（入力ファイルは絶対パス）
+    """
+    signature = job._asdict()
+    signature.pop('output_dir')
+    signature['file_path'] = os.path.abspath(job.file_path)
+    # プロットタイプに関係のない指定は画像に影響しないので含めない
+    unused = ('corner',) if job.plot_type == 'scatter' else ('x_var', 'y_var', 'with_boxplot')
+    for name in unused:
+        signature.pop(name)
+    # タイルに分けた画像はプロセス数・パネルのキャッシュの有無によらず同じなので、
+    # タイルに分けたかどうかだけを含める（タイルに分けない場合は含めず、以前のマニフェストのキーを変えない）
+    tile_jobs = signature.pop('tile_jobs')
+    panel_cache = signature.pop('panel_cache')
+    if (tile_jobs is not None or panel_cache) and job.plot_type != 'scatter':
+        signature['tiled'] = True
+    return signature
+
+
+def job_key(job: RenderJob) -> str:
+    """
+    マニフェストのキー（描画条件のハッシュ）
+
+    Args:
+        job: 描画ジョブ
+
+    Returns:
+        16進数のキー文字列
+    """
+    text = json.dumps(job_signature(job), sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _output_state(output_path: str) -> Tuple[int, int]:
+    """画像ファイルの (サイズ, 更新時刻(ns))"""
+    st = os.stat(output_path)
+    return st.st_size, st.st_mtime_ns
+
+
+class BuildManifest:
+    """
+    出力フォルダごとのビルドマニフェスト
+
+    入力の内容ハッシュは、サイズと更新時刻が記録と同じであれば記録済みの値を使い、
+    変わっている場合だけファイル全体を読んで計算し直す。
+    """
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_FILE_NAME)
+        self.entries: Dict[str, dict] = self._load()
+        # 入力ファイルの絶対パス -> (サイズ, 更新時刻, 内容ハッシュ)
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}
+        for entry in self.entries.values():
+            self._hashes.setdefault(entry['file_path'], (entry['input_size'], entry['input_mtime_ns'],
+                                                         entry['input_hash']))
+        # 描画前に確認した入力の状態（描画中に入力が変更されても古い内容で記録しないため）
+        self._before_render: Dict[str, Tuple[int, int, str]] = {}
+
+    def _load(self) -> Dict[str, dict]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self) -> None:
+        """マニフェストをファイルに保存（書き込み途中で壊れないよう置き換えで保存）"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def input_state(self, file_path: str) -> Tuple[int, int, str]:
+        """
+        入力ファイルの (サイズ, 更新時刻, 内容ハッシュ) を取得
+
+        Args:
+            file_path: 入力ファイルのパス
+
+        Returns:
+            (サイズ, 更新時刻(ns), 内容ハッシュ) のタプル
+        """
+        abs_path = os.path.abspath(file_path)
+        st = os.stat(abs_path)
+        known = self._hashes.get(abs_path)
+        if known is not None and known[:2] == (st.st_size, st.st_mtime_ns):
+            return known
+
+        state = (st.st_size, st.st_mtime_ns, content_hash(abs_path))
+        self._hashes[abs_path] = state
+        return state
+
+    def is_up_to_date(self, job: RenderJob) -> bool:
+        """
+        前回と同じ条件・同じ入力で描画済みで、画像も残っているか
+
+        Args:
+            job: 描画ジョブ
+
+        Returns:
+            描画を省略できる場合はTrue
+        """
+        entry = self.entries.get(job_key(job))
+        if entry is None or entry['version'] != __version__:
+            return False
+        try:
+            # 記録した後に別の条件のジョブ（または他のプログラム）が画像を上書きしていないか
+            if _output_state(entry['output_path']) != (entry.get('output_size'), entry.get('output_mtime_ns')):
+                return False
+            return self.input_state(job.file_path)[2] == entry['input_hash']
+        except OSError:
+            return False
+
+    def record(self, result: JobResult) -> None:
+        """
+        成功したジョブの結果を記録（失敗したジョブは記録を消して次回も描画する）
+
+        Args:
+            result: ジョブの実行結果
+        """
+        key = job_key(result.job)
+        if result.error is not None:
+            self.entries.pop(key, None)
+            return
+
+        state = self._before_render.pop(key, None) or self.input_state(result.job.file_path)
+        size, mtime_ns, input_hash = state
+        output_path = os.path.abspath(result.output_path)
+        try:
+            output_size, output_mtime_ns = _output_state(output_path)
+        except OSError:
+            self.entries.pop(key, None)
+            return
+        # 同じ画像に書き込んだ別の条件の記録は、画像が上書きされたので使えない
+        for other in [k for k, e in self.entries.items() if e['output_path'] == output_path and k != key]:
+            del self.entries[other]
+
+        entry = job_signature(result.job)
+        entry.update(
+            output_path=output_path,
+            output_size=output_size,
+            output_mtime_ns=output_mtime_ns,
+            columns=result.columns,
+            input_hash=input_hash,
+            input_size=size,
+            input_mtime_ns=mtime_ns,
+            version=__version__,
+            rendered_at=time.strftime('%Y-%m-%dT%H:%M:%S'),
+        )
+        self.entries[key] = entry
+
+    def partition(self, jobs: List[RenderJob], force: bool = False) -> Tuple[List[RenderJob], List[JobResult]]:
+        """
+        ジョブを「描画が必要なもの」と「省略できるもの」に分ける
+
+        Args:
+            jobs: 描画ジョブのリスト
+            force: Trueの場合は全てのジョブを描画する
+
+        Returns:
+            (描画するジョブのリスト, 省略したジョブの JobResult のリスト) のタプル
+        """
+        pending, skipped = [], []
+        for job in jobs:
+            if not force and self.is_up_to_date(job):
+                entry = self.entries[job_key(job)]
+                skipped.append(JobResult(job, entry['output_path'], None, 0.0, '',
+                                         columns=entry['columns'], skipped=True))
+            else:
+                pending.append(job)
+                try:
+                    self._before_render[job_key(job)] = self.input_state(job.file_path)
+                except OSError:
+                    pass
+        return pending, skipped
+
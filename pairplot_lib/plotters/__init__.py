@@ -1,14 +1,28 @@
 """
 Plotters module - 各種プロット生成機能
+
+matplotlib などの重いモジュールは、描画関数が最初に使われたときに読み込む。
 """
+import importlib
+
+# 公開名 -> 定義しているサブモジュール
+_LAZY_IMPORTS = {
+    'create_basic_pairplot': '.basic_pairplot',
+    'create_colored_pairplot': '.colored_pairplot',
+    'create_scatter_boxplot': '.scatter_boxplot',
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
 
-from .basic_pairplot import create_basic_pairplot
-from .colored_pairplot import create_colored_pairplot
-from .scatter_boxplot import create_scatter_boxplot
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(_LAZY_IMPORTS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-__all__ = [
-    'create_basic_pairplot',
-    'create_colored_pairplot',
-    'create_scatter_boxplot'
-]
 
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -2,21 +2,46 @@
 基本的なペアプロット（相関係数表示付き）
 pairplot2.pyの機能を移植
 """
+from typing import Optional, Union
+
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-from .utils import corr_func, regress_func
+from ..core.dataset import Dataset, as_dataset
+from ..core.stats import PairplotStats, correlation_from_moments, regression_from_moments
+from ..profiling import RenderProfile, stage
+from .grid import draw_pair_grid
+from .panel_cache import PanelCache
+from .tiles import render_tiled_pair_grid, save_image
+from .utils import annotate_correlation, draw_regression_line
 
 
-def create_basic_pairplot(df: pd.DataFrame, numeric_cols: list, output_path: str, annotation_type: str = "none") -> str:
+def create_basic_pairplot(
+    df: Union[pd.DataFrame, Dataset],
+    numeric_cols: list,
+    output_path: str,
+    annotation_type: str = "none",
+    corner: bool = False,
+    density: Optional[bool] = None,
+    profile: Optional[RenderProfile] = None,
+    precomputed: Optional[PairplotStats] = None,
+    tile_jobs: Optional[int] = None,
+    panel_cache: Optional[PanelCache] = None
+) -> str:
     """
     基本的なペアプロット（相関係数表示付き）を作成
     
     Args:
-        df: 入力DataFrame
+        df: 入力DataFrame、または解析済みの Dataset（計算済みの統計量を使い回す）
         numeric_cols: プロットする数値列のリスト
         output_path: 出力ファイルパス
         annotation_type: 表示タイプ（"correlation": 相関係数、"regression": 回帰直線、"none": なし）
+        corner: Trueの場合は上三角のパネルを描画しない
+        density: Trueの場合は散布図を密度表示にする（Noneの場合は行数で自動判定）
+        profile: 段階ごとの計測先（Noneの場合は計測しない）
+        precomputed: 集計済みの統計量（TailDataset.pairplot_stats など、Noneの場合はデータから計算する）
+        tile_jobs: 指定した場合はパネルをタイルに分けて、このプロセス数で並列に描画してからつなぎ合わせる
+            （列数が多い場合に速い。Noneの場合は1つの Figure に描画する）
+        panel_cache: 描画済みパネルのキャッシュ。指定した場合はタイルに分けて描画し、
+            キャッシュにないパネルだけを描画する（tile_jobs がNoneの場合は現在のプロセスで描画）
         
     Returns:
         保存したファイルパス
@@ -25,44 +50,75 @@ def create_basic_pairplot(df: pd.DataFrame, numeric_cols: list, output_path: str
     if len(numeric_cols) < 2:
         raise ValueError("エラー: 少なくとも2つの数値列が必要です。")
     
-    # プロットするデータを選択
-    plots = df[numeric_cols]
+    # 数値列の配列への変換は Dataset で1回だけ行う
+    dataset = as_dataset(df, numeric_cols)
+    values = dataset.select(numeric_cols)
     
     # データ情報を表示
     print(f"利用可能な数値列: {numeric_cols}")
-    print(f"データの形状: {df.shape}")
-    print(f"数値データの形状: {plots.shape}")
-    print(f"欠損値の数: {plots.isnull().sum().sum()}\n")
-    
-    # 相関係数を計算
-    corr_matrix = plots.corr()
+    print(f"データの形状: {dataset.shape}")
+    print(f"数値データの形状: {values.shape}")
+    print(f"欠損値の数: {dataset.n_missing(numeric_cols)}\n")
     
-    # Seabornのpairplotをカスタマイズ（白黒で描画）
-    pg = sns.pairplot(plots, diag_kind="hist", 
-                      plot_kws={'color': 'black', 's': 30, 'alpha': 0.6},
-                      diag_kws={'color': 'black', 'edgecolor': 'black'})
+    # 表示タイプに応じた統計量を全ペア分まとめて計算
+    with stage(profile, 'stats'):
+        if precomputed is not None:
+            # 集計済みのモーメントから求める（全行を計算し直さない）
+            corr = correlation_from_moments(precomputed.moments) if annotation_type == "correlation" else None
+            reg = (regression_from_moments(precomputed.moments, precomputed.x_min, precomputed.x_max)
+                   if annotation_type == "regression" else None)
+        else:
+            corr = dataset.correlation(numeric_cols) if annotation_type == "correlation" else None
+            reg = dataset.regression(numeric_cols) if annotation_type == "regression" else None
     
-    # 表示タイプに応じて下半分の三角形に情報を追加
-    if annotation_type == "correlation":
-        pg.map_lower(corr_func)
-        print("表示オプション: 相関係数を表示")
-    elif annotation_type == "regression":
-        pg.map_lower(regress_func)
-        print("表示オプション: 回帰直線を表示")
-    else:
-        print("表示オプション: なし")
+    with stage(profile, 'draw'):
+        # ペアプロットを描画（白黒で描画）
+        grid_kws = dict(
+            scatter_kws={'color': 'black', 's': 30, 'alpha': 0.6},
+            hist_kws={'color': 'black', 'edgecolor': 'black'},
+            corner=corner, density=density,
+            diag_hists=(precomputed.histograms if precomputed is not None
+                        else dataset.histograms(numeric_cols)))
+        if tile_jobs is not None or panel_cache is not None:
+            # パネルをタイルに分けてワーカープロセスで描画する（注釈もタイルごとに描画する）
+            image = render_tiled_pair_grid(values, numeric_cols, tile_jobs or 1,
+                                           corr_r=corr.r if corr is not None else None, reg=reg,
+                                           cache=panel_cache, **grid_kws)
+            fig = None
+        else:
+            fig, axes = draw_pair_grid(values, numeric_cols, **grid_kws)
+        
+        # 表示タイプに応じて下半分の三角形に情報を追加
+        if corr is not None:
+            # 各サブプロットは一括計算した相関係数行列から読む
+            if fig is not None:
+                for i in range(len(numeric_cols)):
+                    for j in range(i):
+                        annotate_correlation(axes[i, j], corr.r[i, j])
+            print("表示オプション: 相関係数を表示")
+        elif reg is not None:
+            # 各サブプロットには一括計算した回帰直線を描画するだけ
+            if fig is not None:
+                for i in range(len(numeric_cols)):
+                    for j in range(i):
+                        draw_regression_line(axes[i, j], reg.slope[i, j], reg.intercept[i, j],
+                                             reg.x_min[i, j], reg.x_max[i, j])
+            print("表示オプション: 回帰直線を表示")
+        else:
+            print("表示オプション: なし")
     
     # プロットを保存
-    pg.savefig(output_path)
+    with stage(profile, 'encode'):
+        if fig is not None:
+            fig.savefig(output_path)
+        else:
+            save_image(output_path, image)
     
     # 相関係数の行列を表示（相関係数表示の場合のみ）
-    if annotation_type == "correlation":
+    if corr is not None:
         print("\n相関係数行列:")
-        print(corr_matrix)
+        print(pd.DataFrame(corr.r, index=numeric_cols, columns=numeric_cols))
         print()
     
-    # matplotlib のフィギュアをクローズしてメモリを解放
-    plt.close()
-    
     return output_path
 
@@ -2,107 +2,123 @@
 色分け識別ありペアプロット
 pairplot4.pyの機能を移植
 """
+from typing import Optional, Union
+
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-import numpy as np
-from scipy import stats
-from .utils import corr_func
+from ..core.dataset import Dataset, as_dataset
+from ..core.stats import PairplotStats, correlation_from_moments, regression_from_moments
+from ..profiling import RenderProfile, stage
+from .grid import draw_pair_grid
+from .panel_cache import PanelCache
+from .tiles import render_tiled_pair_grid, save_image
+from .utils import annotate_correlation, draw_regression_line
 
 
-def create_colored_pairplot(df: pd.DataFrame, output_path: str, annotation_type: str = "none") -> str:
+def create_colored_pairplot(
+    df: Union[pd.DataFrame, Dataset],
+    output_path: str,
+    annotation_type: str = "none",
+    corner: bool = False,
+    density: Optional[bool] = None,
+    profile: Optional[RenderProfile] = None,
+    precomputed: Optional[PairplotStats] = None,
+    tile_jobs: Optional[int] = None,
+    panel_cache: Optional[PanelCache] = None
+) -> str:
     """
     色分け識別ありペアプロットを作成（z列による色分け）
     
     Args:
-        df: 入力DataFrame（z列を含む必要がある）
+        df: 入力DataFrame、または解析済みの Dataset（z列を含む必要がある）
         output_path: 出力ファイルパス
         annotation_type: 表示タイプ（"correlation": 相関係数、"regression": 回帰直線、"none": なし）
+        corner: Trueの場合は上三角のパネルを描画しない
+        density: Trueの場合は散布図を密度表示にする（Noneの場合は行数で自動判定）
+        profile: 段階ごとの計測先（Noneの場合は計測しない）
+        precomputed: 集計済みの統計量（TailDataset.pairplot_stats など、Noneの場合はデータから計算する）
+        tile_jobs: 指定した場合はパネルをタイルに分けて、このプロセス数で並列に描画してからつなぎ合わせる
+            （列数が多い場合に速い。Noneの場合は1つの Figure に描画する）
+        panel_cache: 描画済みパネルのキャッシュ。指定した場合はタイルに分けて描画し、
+            キャッシュにないパネルだけを描画する（tile_jobs がNoneの場合は現在のプロセスで描画）
         
     Returns:
         保存したファイルパス
     """
+    # 数値列の配列とz列のグループ番号への変換は Dataset で1回だけ行う
+    dataset = as_dataset(df)
+    
     # z列が存在するかチェック
-    if 'z' not in df.columns:
+    if not dataset.has_z:
         raise ValueError("エラー: 'z' 列が見つかりません。色分けには 'z' 列が必要です。")
     
     # 列情報を表示
-    print(f"利用可能な列: {df.columns.tolist()}\n")
-    
-    # z列のユニークな値を取得
-    unique_z = sorted(df['z'].unique())
-    print(f"z列のユニークな値: {unique_z}\n")
-    
-    # 白黒のパレット設定（黒と白のみ）
-    # 黒丸（塗りつぶし）と白抜き丸で区別
-    palette = {unique_z[0]: 'black', unique_z[1]: 'white' if len(unique_z) > 1 else 'black'}
+    print(f"利用可能な列: {dataset.source_columns}\n")
     
-    # マーカーは全て丸（'o'）に統一
-    marker_list = ['o'] * len(unique_z)
+    # z列のグループごとの行は全パネルで共有する（欠損値は描画しない）
+    groups = dataset.groups
+    print(f"z列のユニークな値: {groups.labels}\n")
     
     # 数値列のみを取得（z列を除く）
-    numeric_cols = [col for col in df.columns if col != 'z' and pd.api.types.is_numeric_dtype(df[col])]
+    numeric_cols = [col for col in dataset.columns if col != 'z']
+    values = dataset.select(numeric_cols)
     
-    # ペアプロットの作成（白黒）
-    pg = sns.pairplot(df, hue='z', markers=marker_list, diag_kind="hist",
-                      palette=palette, 
-                      plot_kws={'edgecolor': 'black', 's': 50, 'linewidth': 1.5, 'alpha': 0.7},
-                      diag_kws={'edgecolor': 'black'})
+    # 表示タイプに応じた統計量を数値列のみで全ペア分まとめて計算
+    with stage(profile, 'stats'):
+        if precomputed is not None:
+            # 集計済みのモーメントから求める（全行を計算し直さない）
+            corr = correlation_from_moments(precomputed.moments) if annotation_type == "correlation" else None
+            reg = (regression_from_moments(precomputed.moments, precomputed.x_min, precomputed.x_max)
+                   if annotation_type == "regression" else None)
+        else:
+            corr = dataset.correlation(numeric_cols) if annotation_type == "correlation" else None
+            reg = dataset.regression(numeric_cols) if annotation_type == "regression" else None
     
-    # 凡例を削除
-    pg._legend.remove()
+    with stage(profile, 'draw'):
+        # ペアプロットの作成（白黒）
+        # 黒丸（塗りつぶし）と白抜き丸で区別、マーカーは全て丸、凡例なし
+        grid_kws = dict(
+            groups=groups,
+            scatter_kws={'edgecolors': 'black', 's': 50, 'linewidth': 1.5, 'alpha': 0.7},
+            hist_kws={'edgecolor': 'black'},
+            corner=corner, density=density,
+            diag_hists=(precomputed.histograms if precomputed is not None
+                        else dataset.histograms(numeric_cols, grouped=True)))
+        if tile_jobs is not None or panel_cache is not None:
+            # パネルをタイルに分けてワーカープロセスで描画する（注釈もタイルごとに描画する）
+            image = render_tiled_pair_grid(values, numeric_cols, tile_jobs or 1,
+                                           corr_r=corr.r if corr is not None else None, reg=reg,
+                                           cache=panel_cache, **grid_kws)
+            fig = None
+        else:
+            fig, axes = draw_pair_grid(values, numeric_cols, **grid_kws)
 
-    # 表示タイプに応じて下半分の三角形に情報を追加
-    if annotation_type == "correlation":
-        # 数値列のみで相関係数を計算
-        numeric_data = df[numeric_cols]
-        corr_matrix = numeric_data.corr()
+        # 表示タイプに応じて下半分の三角形に情報を追加
+        if corr is not None:
+            # 下三角部分の各サブプロットに相関係数を表示
+            if fig is not None:
+                for i in range(len(numeric_cols)):
+                    for j in range(i):
+                        annotate_correlation(axes[i, j], corr.r[i, j])
+            print("表示オプション: 相関係数を表示")
         
-        # 下三角部分の各サブプロットに相関係数を表示
-        for i in range(len(numeric_cols)):
-            for j in range(i):
-                ax = pg.axes[i, j]
-                corr_value = corr_matrix.iloc[i, j]
-                ax.annotate(f"r = {corr_value:.3f}",
-                           xy=(.2, .5),
-                           xycoords=ax.transAxes,
-                           size=16)
-        print("表示オプション: 相関係数を表示")
-    
-    elif annotation_type == "regression":
-        # 下三角部分の各サブプロットに回帰直線を表示
-        numeric_data = df[numeric_cols]
-        for i in range(len(numeric_cols)):
-            for j in range(i):
-                ax = pg.axes[i, j]
-                
-                # プロット内のデータ点を取得して回帰直線を計算
-                x_data = numeric_data.iloc[:, j].dropna()
-                y_data = numeric_data.iloc[:, i].dropna()
-                
-                # NaNを除いたデータで回帰を計算
-                mask = ~(np.isnan(x_data.values) | np.isnan(y_data.values))
-                x_clean = x_data.values[mask]
-                y_clean = y_data.values[mask]
-                
-                if len(x_clean) >= 2:
-                    try:
-                        slope, intercept, _, _, _ = stats.linregress(x_clean, y_clean)
-                        x_line = np.array([x_clean.min(), x_clean.max()])
-                        y_line = slope * x_line + intercept
-                        ax.plot(x_line, y_line, 'k-', linewidth=2, alpha=0.8)
-                    except (ValueError, RuntimeError):
-                        pass
-        print("表示オプション: 回帰直線を表示")
-    
-    else:
-        print("表示オプション: なし")
+        elif reg is not None:
+            # 下三角部分の各サブプロットに回帰直線を描画
+            if fig is not None:
+                for i in range(len(numeric_cols)):
+                    for j in range(i):
+                        draw_regression_line(axes[i, j], reg.slope[i, j], reg.intercept[i, j],
+                                             reg.x_min[i, j], reg.x_max[i, j])
+            print("表示オプション: 回帰直線を表示")
+        
+        else:
+            print("表示オプション: なし")
     
     # 画像にして保存
-    pg.savefig(output_path)
-    
-    # matplotlib のフィギュアをクローズしてメモリを解放
-    plt.close()
+    with stage(profile, 'encode'):
+        if fig is not None:
+            fig.savefig(output_path)
+        else:
+            save_image(output_path, image)
     
     return output_path
 
@@ -0,0 +1,171 @@
+"""
+白黒ペアプロット用のグリッド描画
+seaborn.pairplot の代わりに matplotlib で直接描画する
+"""
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from ..core.groups import GroupIndex
+from ..core.histogram import ColumnHistogram
+from .utils import axis_limits, draw_density, new_figure, use_density
+
+# 1パネルあたりの大きさ（インチ、seaborn.pairplot の既定値と同じ）
+PANEL_HEIGHT = 2.5
+
+# グループごとの塗りつぶし色（黒丸と白抜き丸を交互に使う）
+GROUP_FACECOLORS = ['black', 'white']
+
+
+def draw_pair_grid(
+    values: np.ndarray,
+    columns: List[str],
+    groups: Optional[GroupIndex] = None,
+    scatter_kws: Optional[dict] = None,
+    hist_kws: Optional[dict] = None,
+    corner: bool = False,
+    facecolors: Sequence[str] = GROUP_FACECOLORS,
+    density: Optional[bool] = None,
+    diag_hists: Optional[list] = None
+):
+    """
+    ペアプロットのグリッドを描画
+
+    散布図はグループごとに1回の scatter（1つのコレクション）で描画し、
+    対角のヒストグラムは列ごとに1回だけビンを決め、全グループの度数をまとめて数える。
+    軸の範囲は列ごとに1回計算し、同じ列の行・列で共有する。
+
+    Args:
+        values: (行数, 列数) の数値配列（欠損値はNaN）
+        columns: 列名のリスト
+        groups: z列のグループの索引（グループ番号が-1の行は描画しない）。Noneの場合は色分けなし
+        scatter_kws: 散布図に渡す追加のキーワード引数
+        hist_kws: ヒストグラムに渡す追加のキーワード引数
+        corner: Trueの場合は上三角のパネルを作成しない
+        facecolors: グループごとの塗りつぶし色（グループ数より少ない場合は繰り返す）
+        density: Trueの場合は散布図の代わりに密度を描画（Noneの場合は行数で自動判定）。
+            密度表示ではグループによる色分けは行わない
+        diag_hists: 列ごとの集計済みヒストグラム（ColumnHistogram、グループ数は groups と同じ）。
+            Noneの場合は values から計算する（チャンク単位で集計したものを渡せば全行を数え直さない）
+
+    Returns:
+        (Figure, Axes の2次元配列) のタプル。corner=True の場合、上三角の要素はNone
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_cols = len(columns)
+    scatter_kws = scatter_kws or {}
+    hist_kws = hist_kws or {}
+
+    if groups is None:
+        group_codes = None
+        group_rows = [slice(None)]
+    else:
+        # グループごとの行番号は索引を作るときに1回だけ求めてあり、全パネルで使い回す
+        group_codes = groups.codes
+        group_rows = [groups.rows(g) for g in range(groups.n_groups)]
+    grouped = groups is not None
+
+    size = PANEL_HEIGHT * n_cols
+    fig = new_figure(figsize=(size, size))
+    axes = fig.subplots(n_cols, n_cols, sharex='col', sharey='row', squeeze=False)
+
+    limits = [axis_limits(values[:, k]) for k in range(n_cols)]
+    density = use_density(len(values), density)
+
+    for i in range(n_cols):
+        for j in range(n_cols):
+            ax = axes[i, j]
+            if corner and j > i:
+                ax.remove()
+                axes[i, j] = None
+                continue
+
+            ax.spines['top'].set_visible(False)
+            ax.spines['right'].set_visible(False)
+
+            if i == j:
+                continue
+
+            draw_scatter_panel(ax, values[:, j], values[:, i], limits[j], limits[i], group_rows,
+                               grouped, density, scatter_kws, facecolors)
+
+    # 対角のヒストグラム
+    for k in range(n_cols):
+        if diag_hists is not None:
+            hist = diag_hists[k]
+        else:
+            # 全グループの度数を1回の np.bincount で数える
+            hist = ColumnHistogram.from_values(values[:, k], group_codes, len(group_rows))
+        draw_histogram_panel(axes[k, k], hist, grouped, hist_kws, facecolors)
+
+    # 軸の範囲とラベル（共有軸なので各列・各行で1回ずつ設定すればよい）
+    for k in range(n_cols):
+        if limits[k] is not None:
+            axes[n_cols - 1, k].set_xlim(limits[k])
+            axes[k, 0].set_ylim(limits[k])
+        axes[n_cols - 1, k].set_xlabel(columns[k])
+        axes[k, 0].set_ylabel(columns[k])
+
+    # corner の場合、先頭行は対角のヒストグラムのみなのでy軸の目盛りは不要
+    if corner:
+        axes[0, 0].tick_params(axis='y', left=False, labelleft=False)
+
+    fig.tight_layout()
+    return fig, axes
+
+
+def draw_scatter_panel(ax, x: np.ndarray, y: np.ndarray, x_limits, y_limits, group_rows: list,
+                       grouped: bool, density: bool, scatter_kws: dict,
+                       facecolors: Sequence[str] = GROUP_FACECOLORS) -> None:
+    """
+    対角以外の1パネルに散布図（または密度）を描画
+
+    Args:
+        ax: 描画先のAxes
+        x: x軸の列の値
+        y: y軸の列の値
+        x_limits: x軸の範囲（axis_limits の戻り値）
+        y_limits: y軸の範囲（axis_limits の戻り値）
+        group_rows: グループごとの行番号（色分けなしの場合は [slice(None)]）
+        grouped: Trueの場合はグループごとに facecolors の色で塗り分ける
+        density: Trueの場合は散布図の代わりに密度を描画
+        scatter_kws: 散布図に渡すキーワード引数
+        facecolors: グループごとの塗りつぶし色
+    """
+    if density:
+        if x_limits is not None and y_limits is not None:
+            draw_density(ax, x, y, x_limits, y_limits)
+        return
+    for g, rows in enumerate(group_rows):
+        kws = dict(scatter_kws)
+        if grouped:
+            kws.setdefault('facecolors', facecolors[g % len(facecolors)])
+        ax.scatter(x[rows], y[rows], **kws)
+
+
+def draw_histogram_panel(ax, hist: Optional[ColumnHistogram], grouped: bool, hist_kws: dict,
+                         facecolors: Sequence[str] = GROUP_FACECOLORS) -> None:
+    """
+    対角の1パネルにヒストグラムを描画
+
+    y軸は行の散布図と共有しないように、同じ位置に重ねた別の軸に描く。
+
+    Args:
+        ax: 描画先のAxes
+        hist: 列のヒストグラム（Noneの場合は軸だけ作成する）
+        grouped: Trueの場合はグループごとに facecolors の色で重ねて描く
+        hist_kws: ヒストグラムに渡すキーワード引数
+        facecolors: グループごとの塗りつぶし色
+    """
+    diag_ax = ax.twinx()
+    diag_ax.set_axis_off()
+    if hist is None:
+        return
+    edges = hist.edges
+    widths = np.diff(edges)
+    for g, counts in enumerate(hist.counts):
+        kws = dict(hist_kws)
+        if grouped:
+            kws.setdefault('color', facecolors[g % len(facecolors)])
+            kws.setdefault('alpha', 0.5)
+        diag_ax.bar(edges[:-1], counts, width=widths, align='edge', **kws)
@@ -0,0 +1,128 @@
+"""
+描画済みパネルのキャッシュ
+
+タイル描画（tiles.py）の1パネル分の画像を、そのパネルの見た目を決める内容（2列の値・軸の範囲・
+描画条件・注釈・ラベル）のハッシュをキーにしてPNGで保存する。列を追加した・注釈を切り替えた
+などの場合も、内容が変わらないパネルは保存した画像を使い、新しいパネルと内容が変わったパネルだけを描画する。
+
+パネルの数が多いので index.json は使わず、エントリごとに1ファイルで保存し、
+最終アクセス時刻はファイルの更新時刻で管理する。
+"""
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+
+from ..config import PANEL_CACHE_DIR, PANEL_CACHE_MAX_BYTES
+
+# キャッシュ形式のバージョン（パネルの描画処理を変えたら上げる）
+PANEL_CACHE_FORMAT_VERSION = 1
+
+
+class PanelCache:
+    """
+    サイズ上限付きLRUのパネル画像キャッシュ
+
+    Attributes:
+        cache_dir: 保存先のフォルダ
+        max_bytes: 合計サイズの上限
+    """
+
+    def __init__(self, cache_dir: str = PANEL_CACHE_DIR, max_bytes: int = PANEL_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        パネルの画像を取得（なければNone）
+
+        Args:
+            key: パネルのキー（tiles.panel_keys で計算したもの）
+
+        Returns:
+            (高さ, 幅, 4) の RGBA 画像、またはNone
+        """
+        from PIL import Image
+
+        path = self._path(key)
+        try:
+            with Image.open(path) as image:
+                pixels = np.array(image.convert('RGBA'))
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # 壊れたエントリは削除して描画し直させる
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return pixels
+
+    def put(self, key: str, pixels: np.ndarray) -> None:
+        """
+        パネルの画像を保存
+
+        Args:
+            key: パネルのキー
+            pixels: RGBA 画像
+        """
+        from PIL import Image
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        # 同じプロセスの複数のスレッドが同時に保存しても衝突しない一時ファイル名にする
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        Image.fromarray(pixels).save(tmp_path, format='PNG', compress_level=1)
+        os.replace(tmp_path, path)
+
+    def evict(self) -> int:
+        """
+        合計サイズが上限を超えている間、最終アクセスが古いエントリから削除
+
+        Returns:
+            削除したエントリ数
+        """
+        try:
+            entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith('.png')]
+        except OSError:
+            return 0
+        stats = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in entries]
+        total = sum(size for _, size, _ in stats)
+        removed = 0
+        for _, size, path in sorted(stats):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self) -> int:
+        """
+        全てのエントリを削除
+
+        Returns:
+            削除したエントリ数
+        """
+        removed = 0
+        try:
+            entries = list(os.scandir(self.cache_dir))
+        except OSError:
+            return 0
+        for entry in entries:
+            if entry.name.endswith('.png'):
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
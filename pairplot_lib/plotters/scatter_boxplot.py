@@ -3,33 +3,42 @@
 scatter_with_boxplot.pyの機能を移植
 """
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib.gridspec import GridSpec
-from scipy import stats
-from typing import Tuple
+from typing import Optional, Tuple, Union
+
+from ..core.dataset import Dataset, as_dataset
+from ..profiling import RenderProfile, stage
+from .utils import axis_limits, draw_boxplot, draw_density, draw_regression_line, new_figure, use_density
 
 
 def create_scatter_boxplot(
-    df: pd.DataFrame,
+    df: Union[pd.DataFrame, Dataset],
     x_var: str,
     y_var: str,
     output_path: str,
     has_z_column: bool = False,
     with_boxplot: bool = True,
-    annotation_type: str = "none"
+    annotation_type: str = "none",
+    density: Optional[bool] = None,
+    profile: Optional[RenderProfile] = None,
+    box_stats: Optional[Tuple[Optional[dict], Optional[dict]]] = None
 ) -> str:
     """
     散布図を作成（オプションで箱ひげ図も追加可能）
     
     Args:
-        df: 入力DataFrame
+        df: 入力DataFrame、または解析済みの Dataset（計算済みの統計量を使い回す）
         x_var: X軸の変数名
         y_var: Y軸の変数名
         output_path: 出力ファイルパス
         has_z_column: z列が存在する場合はTrue（色分けする）
         with_boxplot: Trueの場合は箱ひげ図も表示
         annotation_type: 表示タイプ（"correlation": 相関係数、"regression": 回帰直線、"none": なし）
+        density: Trueの場合は散布図を密度表示にする（Noneの場合は行数で自動判定）
+        profile: 段階ごとの計測先（Noneの場合は計測しない）
+        box_stats: 集計済みの (X軸, Y軸) の箱ひげ図の統計量（QuantileSketch.boxplot_stats など、
+            Noneの場合はデータから計算する）
         
     Returns:
         保存したファイルパス
@@ -39,68 +48,92 @@ def create_scatter_boxplot(
     else:
         print(f"\n散布図を作成中: X={x_var}, Y={y_var}")
     
-    # レイアウトの作成（箱ひげ図の有無で変更）
-    if with_boxplot:
-        # GridSpecを使用してレイアウトを作成
-        fig = plt.figure(figsize=(12, 10))
-        gs = GridSpec(3, 3, figure=fig, 
-                      width_ratios=[1, 4, 0.5], 
-                      height_ratios=[1, 4, 0.5],
-                      hspace=0.05, wspace=0.05)
-        
-        # メインの散布図
-        ax_scatter = fig.add_subplot(gs[1, 1])
-        
-        # 上部の箱ひげ図（X軸方向）
-        ax_box_x = fig.add_subplot(gs[0, 1], sharex=ax_scatter)
-        
-        # 右側の箱ひげ図（Y軸方向）
-        ax_box_y = fig.add_subplot(gs[1, 2], sharey=ax_scatter)
-    else:
-        # 散布図のみの場合はシンプルなレイアウト
-        fig, ax_scatter = plt.subplots(figsize=(10, 8))
+    # 数値列の配列とz列のグループ番号への変換は Dataset で1回だけ行う
+    dataset = as_dataset(df, [x_var, y_var])
+    x_values = dataset.column(x_var)
+    y_values = dataset.column(y_var)
     
-    # z列がある場合は色分けして描画（散布図のみ）
-    if has_z_column and 'z' in df.columns:
-        unique_z = sorted(df['z'].unique())
-        print(f"z列のユニークな値: {unique_z}")
-        
-        # 白黒の色設定（黒丸と白抜き丸）
-        colors = ['black', 'white']
-        edgecolors = ['black', 'black']
-        markers = ['o', 'o']
+    # 相関係数・回帰直線の計算（両方の値が揃っている行のみを使う）
+    corr = reg = None
+    with stage(profile, 'stats'):
+        if annotation_type == "correlation" or annotation_type == "regression":
+            xy_cols = [x_var, y_var]
+            n_complete = int(dataset.moments(xy_cols).n[0, 1])
+            if n_complete >= 2 and annotation_type == "correlation":
+                corr = dataset.correlation(xy_cols, with_pvalues=True)
+            elif n_complete >= 2:
+                reg = dataset.regression(xy_cols)
         
-        # 散布図の描画（凡例なし）
-        for idx, z_val in enumerate(unique_z):
-            df_subset = df[df['z'] == z_val]
-            color_idx = idx % 2
-            
-            ax_scatter.scatter(df_subset[x_var], df_subset[y_var],
-                              c=colors[color_idx],
-                              edgecolors=edgecolors[color_idx],
-                              marker=markers[color_idx],
-                              s=100,
-                              linewidth=1.5,
-                              alpha=0.7)
-    else:
-        # z列がない場合は通常の散布図（黒丸）
-        ax_scatter.scatter(df[x_var], df[y_var], c='black', alpha=0.7, s=100)
+        # 箱ひげ図は四分位点・ひげ・間引いた外れ値だけを計算して描画する（全データを渡さない）
+        if with_boxplot and box_stats is None:
+            box_stats = (dataset.boxplot_stats(x_var), dataset.boxplot_stats(y_var))
     
-    # 相関係数と回帰直線の表示
-    if annotation_type == "correlation" or annotation_type == "regression":
-        x_data = df[x_var].dropna()
-        y_data = df[y_var].dropna()
+    with stage(profile, 'draw'):
+        # レイアウトの作成（箱ひげ図の有無で変更）
+        if with_boxplot:
+            # GridSpecを使用してレイアウトを作成
+            fig = new_figure(figsize=(12, 10))
+            gs = GridSpec(3, 3, figure=fig, 
+                          width_ratios=[1, 4, 0.5], 
+                          height_ratios=[1, 4, 0.5],
+                          hspace=0.05, wspace=0.05)
+            
+            # メインの散布図
+            ax_scatter = fig.add_subplot(gs[1, 1])
+            
+            # 上部の箱ひげ図（X軸方向）
+            ax_box_x = fig.add_subplot(gs[0, 1], sharex=ax_scatter)
+            
+            # 右側の箱ひげ図（Y軸方向）
+            ax_box_y = fig.add_subplot(gs[1, 2], sharey=ax_scatter)
+        else:
+            # 散布図のみの場合はシンプルなレイアウト
+            fig = new_figure(figsize=(10, 8))
+            ax_scatter = fig.subplots()
         
-        # NaNを除いたデータを取得
-        mask = ~(np.isnan(x_data.values) | np.isnan(y_data.values))
-        x_clean = x_data.values[mask]
-        y_clean = y_data.values[mask]
+        # 行数が多い場合は点の代わりに密度を描画（色分けはしない）
+        if use_density(dataset.n_rows, density):
+            x_range, y_range = axis_limits(x_values), axis_limits(y_values)
+            if x_range is not None and y_range is not None:
+                draw_density(ax_scatter, x_values, y_values, x_range, y_range, bins=400)
+                ax_scatter.set_xlim(x_range)
+                ax_scatter.set_ylim(y_range)
+            print(f"密度表示で描画します（{dataset.n_rows}行）")
+        # z列がある場合は色分けして描画（散布図のみ）
+        elif has_z_column and dataset.has_z:
+            # z列のグループごとの行番号で取り出す（グループごとに DataFrame を絞り込まない）
+            groups = dataset.groups
+            print(f"z列のユニークな値: {groups.labels}")
+            
+            # 白黒の色設定（黒丸と白抜き丸）
+            colors = ['black', 'white']
+            edgecolors = ['black', 'black']
+            markers = ['o', 'o']
+            
+            # 散布図の描画（凡例なし）
+            for idx in range(groups.n_groups):
+                rows = groups.rows(idx)
+                color_idx = idx % 2
+                
+                ax_scatter.scatter(x_values[rows], y_values[rows],
+                                  c=colors[color_idx],
+                                  edgecolors=edgecolors[color_idx],
+                                  marker=markers[color_idx],
+                                  s=100,
+                                  linewidth=1.5,
+                                  alpha=0.7)
+        else:
+            # z列がない場合は通常の散布図（黒丸）
+            ax_scatter.scatter(x_values, y_values, c='black', alpha=0.7, s=100)
         
-        if len(x_clean) >= 2:
+        # 相関係数と回帰直線の表示
+        if corr is not None or reg is not None:
             try:
-                if annotation_type == "correlation":
-                    # 相関係数を計算して表示
-                    r, p_value = stats.pearsonr(x_clean, y_clean)
+                if corr is not None:
+                    # 相関係数とp値を表示
+                    r, p_value = corr.r[0, 1], corr.p[0, 1]
+                    if np.isnan(r):
+                        raise ValueError("分散が0のため相関係数を計算できません")
                     corr_text = f"r = {r:.3f}\n(p < 0.001)" if p_value < 0.001 else f"r = {r:.3f}\n(p = {p_value:.3f})"
                     ax_scatter.text(0.05, 0.95, corr_text, 
                                    transform=ax_scatter.transAxes,
@@ -109,76 +142,71 @@ def create_scatter_boxplot(
                                    bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
                     print(f"相関係数: r = {r:.3f}, p値 = {p_value:.3f}")
                 
-                elif annotation_type == "regression":
-                    # 回帰直線を計算して描画
-                    slope, intercept, r_value, p_value, std_err = stats.linregress(x_clean, y_clean)
-                    x_line = np.array([x_clean.min(), x_clean.max()])
-                    y_line = slope * x_line + intercept
-                    ax_scatter.plot(x_line, y_line, 'k-', linewidth=2, alpha=0.8, label='回帰直線')
+                else:
+                    # 回帰直線を描画（[1, 0]: y = y_var, x = x_var）
+                    slope, intercept, r2 = reg.slope[1, 0], reg.intercept[1, 0], reg.r2[1, 0]
+                    if np.isnan(slope):
+                        raise ValueError("xの分散が0のため回帰直線を計算できません")
+                    draw_regression_line(ax_scatter, slope, intercept,
+                                         reg.x_min[1, 0], reg.x_max[1, 0], label='回帰直線')
                     
                     # 回帰式をターミナル上に表示
-                    print(f"回帰直線: y = {slope:.3f}x + {intercept:.3f}, R² = {r_value**2:.3f}")
+                    print(f"回帰直線: y = {slope:.3f}x + {intercept:.3f}, R² = {r2:.3f}")
             
             except (ValueError, RuntimeError) as e:
                 print(f"相関係数・回帰直線の計算に失敗しました: {e}")
-    
-    # 散布図の設定
-    ax_scatter.set_xlabel(x_var, fontsize=14)
-    ax_scatter.set_ylabel(y_var, fontsize=14)
-    ax_scatter.grid(True, alpha=0.3)
-    
-    # 箱ひげ図を描画する場合のみ
-    if with_boxplot:
-        # 箱ひげ図の描画（z値に関係なく全データを1つの箱ひげ図に、白黒）
-        x_data = df[x_var].dropna()
-        y_data = df[y_var].dropna()
-        
-        # X軸方向の箱ひげ図（横向き、白黒）
-        bp_x = ax_box_x.boxplot([x_data], vert=False, positions=[0],
-                                 widths=0.5, patch_artist=True, showcaps=True,
-                                 boxprops=dict(facecolor='white', edgecolor='black', linewidth=1.5),
-                                 medianprops=dict(color='black', linewidth=2),
-                                 whiskerprops=dict(color='black', linewidth=1.5),
-                                 capprops=dict(color='black', linewidth=1.5))
-        
-        # Y軸方向の箱ひげ図（縦向き、白黒）
-        bp_y = ax_box_y.boxplot([y_data], vert=True, positions=[0],
-                                 widths=0.5, patch_artist=True, showcaps=True,
-                                 boxprops=dict(facecolor='white', edgecolor='black', linewidth=1.5),
-                                 medianprops=dict(color='black', linewidth=2),
-                                 whiskerprops=dict(color='black', linewidth=1.5),
-                                 capprops=dict(color='black', linewidth=1.5))
-        
-        # 箱ひげ図の軸設定と枠線削除
-        # X軸方向の箱ひげ図
-        ax_box_x.set_yticks([])
-        ax_box_x.set_ylim(-0.8, 0.8)  # 箱ひげ図の表示範囲を制限
-        ax_box_x.tick_params(labelbottom=False, bottom=False, left=False)
-        ax_box_x.spines['top'].set_visible(False)
-        ax_box_x.spines['right'].set_visible(False)
-        ax_box_x.spines['bottom'].set_visible(False)
-        ax_box_x.spines['left'].set_visible(False)
         
-        # Y軸方向の箱ひげ図
-        ax_box_y.set_xticks([])
-        ax_box_y.set_xlim(-0.8, 0.8)  # 箱ひげ図の表示範囲を制限
-        ax_box_y.tick_params(labelleft=False, left=False, bottom=False)
-        ax_box_y.spines['top'].set_visible(False)
-        ax_box_y.spines['right'].set_visible(False)
-        ax_box_y.spines['bottom'].set_visible(False)
-        ax_box_y.spines['left'].set_visible(False)
+        # 散布図の設定
+        ax_scatter.set_xlabel(x_var, fontsize=14)
+        ax_scatter.set_ylabel(y_var, fontsize=14)
+        ax_scatter.grid(True, alpha=0.3)
         
-        # 全体のタイトル
-        fig.suptitle(f'{x_var} vs {y_var} (散布図 + 箱ひげ図)', fontsize=16, y=0.98)
-    else:
-        # 散布図のみの場合のタイトル
-        fig.suptitle(f'{x_var} vs {y_var}', fontsize=16)
+        # 箱ひげ図を描画する場合のみ
+        if with_boxplot:
+            # 箱ひげ図の描画（z値に関係なく全データを1つの箱ひげ図に、白黒）
+            box_style = dict(positions=[0], widths=0.5, patch_artist=True, showcaps=True,
+                             boxprops=dict(facecolor='white', edgecolor='black', linewidth=1.5),
+                             medianprops=dict(color='black', linewidth=2),
+                             whiskerprops=dict(color='black', linewidth=1.5),
+                             capprops=dict(color='black', linewidth=1.5))
+            x_stats, y_stats = box_stats
+            
+            # X軸方向の箱ひげ図（横向き、白黒）
+            if x_stats is not None:
+                draw_boxplot(ax_box_x, x_stats, vertical=False, **box_style)
+            
+            # Y軸方向の箱ひげ図（縦向き、白黒）
+            if y_stats is not None:
+                draw_boxplot(ax_box_y, y_stats, vertical=True, **box_style)
+            
+            # 箱ひげ図の軸設定と枠線削除
+            # X軸方向の箱ひげ図
+            ax_box_x.set_yticks([])
+            ax_box_x.set_ylim(-0.8, 0.8)  # 箱ひげ図の表示範囲を制限
+            ax_box_x.tick_params(labelbottom=False, bottom=False, left=False)
+            ax_box_x.spines['top'].set_visible(False)
+            ax_box_x.spines['right'].set_visible(False)
+            ax_box_x.spines['bottom'].set_visible(False)
+            ax_box_x.spines['left'].set_visible(False)
+            
+            # Y軸方向の箱ひげ図
+            ax_box_y.set_xticks([])
+            ax_box_y.set_xlim(-0.8, 0.8)  # 箱ひげ図の表示範囲を制限
+            ax_box_y.tick_params(labelleft=False, left=False, bottom=False)
+            ax_box_y.spines['top'].set_visible(False)
+            ax_box_y.spines['right'].set_visible(False)
+            ax_box_y.spines['bottom'].set_visible(False)
+            ax_box_y.spines['left'].set_visible(False)
+            
+            # 全体のタイトル
+            fig.suptitle(f'{x_var} vs {y_var} (散布図 + 箱ひげ図)', fontsize=16, y=0.98)
+        else:
+            # 散布図のみの場合のタイトル
+            fig.suptitle(f'{x_var} vs {y_var}', fontsize=16)
     
     # 画像を保存
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    
-    # matplotlib のフィギュアをクローズしてメモリを解放
-    plt.close()
+    with stage(profile, 'encode'):
+        fig.savefig(output_path, dpi=300, bbox_inches='tight')
     
     return output_path
 
@@ -0,0 +1,403 @@
+"""
+ペアプロットのタイル描画
+
+パネルのグリッドを TILE_PANELS × TILE_PANELS 個ずつのブロック（タイル）に分け、各タイルを
+別々のワーカープロセスで Agg の画像に描画してから1枚の画像につなぎ合わせる。列数が多い
+ペアプロットでも、描画にかかる時間はプロセス数に応じて短くなる。
+
+つなぎ合わせた画像の見た目がそろうように、パネルの位置と大きさは tight_layout を使わずに
+画素単位で固定し、軸の範囲は列ごとに全体で1回だけ計算したものを全てのタイルで使う。
+目盛りのラベルと列名は左端の列・下端の行のパネルにだけ付け、そのための余白は
+それらのパネルを含むタイルにだけ付ける。
+
+パネルのキャッシュ（PanelCache）を指定すると、キャッシュにあるパネルは保存した画像を使い、
+ないパネルだけをタイルごとにまとめて描画する。
+"""
+import hashlib
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from ..core.groups import GroupIndex
+from ..core.histogram import ColumnHistogram
+from ..core.stats import RegressionResult
+from .grid import GROUP_FACECOLORS, PANEL_HEIGHT, draw_histogram_panel, draw_scatter_panel
+from .panel_cache import PANEL_CACHE_FORMAT_VERSION, PanelCache
+from .utils import annotate_correlation, axis_limits, draw_regression_line, new_figure, use_density
+
+# 1タイルの1辺のパネル数
+TILE_PANELS = 6
+
+# タイルを描画する解像度（dpi、Figure の既定値と同じ）
+TILE_DPI = 100
+
+# 左端の列・下端の行の外側に付ける、目盛りのラベルと列名の余白（インチ）
+LABEL_MARGIN = 0.8
+
+# パネルの四辺の内側の余白（インチ、隣のパネルとの間隔と目盛りの線の分）
+PANEL_PAD = 0.15
+
+
+class PanelStyle(NamedTuple):
+    """
+    全てのパネルに共通の描画条件
+
+    Attributes:
+        scatter_kws: 散布図に渡すキーワード引数
+        hist_kws: ヒストグラムに渡すキーワード引数
+        corner: Trueの場合は上三角のパネルを描画しない
+        density: Trueの場合は散布図の代わりに密度を描画
+        facecolors: グループごとの塗りつぶし色
+    """
+    scatter_kws: dict
+    hist_kws: dict
+    corner: bool = False
+    density: bool = False
+    facecolors: Tuple[str, ...] = tuple(GROUP_FACECOLORS)
+
+
+class TileLayout:
+    """
+    タイルに分けたペアプロットの画素単位の配置
+
+    画像の左端に LABEL_MARGIN の余白、続いて1辺 PANEL_HEIGHT のパネルが列数分並び、
+    下端にも LABEL_MARGIN の余白がある。
+
+    Attributes:
+        n_cols: 列数
+        panel: パネルの1辺の画素数
+        margin: 余白の画素数
+        width: 画像の幅
+        height: 画像の高さ
+    """
+
+    def __init__(self, n_cols: int):
+        self.n_cols = n_cols
+        self.panel = int(round(PANEL_HEIGHT * TILE_DPI))
+        self.margin = int(round(LABEL_MARGIN * TILE_DPI))
+        self.width = self.margin + n_cols * self.panel
+        self.height = n_cols * self.panel + self.margin
+
+    def tiles(self, corner: bool = False) -> List[Tuple[int, int, int, int]]:
+        """
+        タイルの (先頭の行, 末尾の次の行, 先頭の列, 末尾の次の列) のリスト
+
+        Args:
+            corner: Trueの場合は上三角のパネルしか含まないタイルを除く
+
+        Returns:
+            タイルのリスト
+        """
+        tiles = []
+        for r0 in range(0, self.n_cols, TILE_PANELS):
+            r1 = min(r0 + TILE_PANELS, self.n_cols)
+            for c0 in range(0, self.n_cols, TILE_PANELS):
+                c1 = min(c0 + TILE_PANELS, self.n_cols)
+                if corner and c0 > r1 - 1:
+                    continue
+                tiles.append((r0, r1, c0, c1))
+        return tiles
+
+    def tile_box(self, r0: int, r1: int, c0: int, c1: int) -> Tuple[int, int, int, int]:
+        """
+        タイルの画像内の (上端, 左端, 高さ, 幅)（画素）
+
+        Args:
+            r0, r1, c0, c1: タイルの行・列の範囲
+
+        Returns:
+            (上端, 左端, 高さ, 幅) のタプル
+        """
+        top = r0 * self.panel
+        left = 0 if c0 == 0 else self.margin + c0 * self.panel
+        height = (r1 - r0) * self.panel + (self.margin if r1 == self.n_cols else 0)
+        width = (self.margin if c0 == 0 else 0) + (c1 - c0) * self.panel
+        return top, left, height, width
+
+
+def render_tiled_pair_grid(
+    values: np.ndarray,
+    columns: List[str],
+    n_jobs: int = 1,
+    groups: Optional[GroupIndex] = None,
+    scatter_kws: Optional[dict] = None,
+    hist_kws: Optional[dict] = None,
+    corner: bool = False,
+    facecolors: Sequence[str] = GROUP_FACECOLORS,
+    density: Optional[bool] = None,
+    diag_hists: Optional[list] = None,
+    corr_r: Optional[np.ndarray] = None,
+    reg: Optional[RegressionResult] = None,
+    cache: Optional[PanelCache] = None
+) -> np.ndarray:
+    """
+    ペアプロットをタイルに分けて描画し、1枚の画像につなぎ合わせる
+
+    引数は draw_pair_grid と同じ。下三角のパネルへの相関係数・回帰直線の注釈もタイルごとに描画する。
+
+    Args:
+        values: (行数, 列数) の数値配列（欠損値はNaN）
+        columns: 列名のリスト
+        n_jobs: タイルを並列に描画するプロセス数（1の場合は現在のプロセスで順に描画）
+        groups: z列のグループの索引。Noneの場合は色分けなし
+        scatter_kws: 散布図に渡す追加のキーワード引数
+        hist_kws: ヒストグラムに渡す追加のキーワード引数
+        corner: Trueの場合は上三角のパネルを描画しない
+        facecolors: グループごとの塗りつぶし色
+        density: Trueの場合は散布図の代わりに密度を描画（Noneの場合は行数で自動判定）
+        diag_hists: 列ごとの集計済みヒストグラム（Noneの場合は values から計算する）
+        corr_r: 下三角に表示する相関係数の行列（Noneの場合は表示しない）
+        reg: 下三角に描画する回帰直線（Noneの場合は描画しない）
+        cache: パネルのキャッシュ（Noneの場合は全てのパネルを描画する）
+
+    Returns:
+        (高さ, 幅, 4) の RGBA 画像
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_cols = len(columns)
+    style = PanelStyle(scatter_kws or {}, hist_kws or {}, corner,
+                       use_density(len(values), density), tuple(facecolors))
+    limits = [axis_limits(values[:, k]) for k in range(n_cols)]
+    if diag_hists is None:
+        codes = groups.codes if groups is not None else None
+        n_groups = groups.n_groups if groups is not None else 1
+        diag_hists = [ColumnHistogram.from_values(values[:, k], codes, n_groups) for k in range(n_cols)]
+
+    layout = TileLayout(n_cols)
+    image = np.full((layout.height, layout.width, 4), 255, dtype=np.uint8)
+
+    # 描画するタイルと、その中で描画するパネル（Noneの場合はタイルの全てのパネル）
+    work: List[Tuple[Tuple[int, int, int, int], Optional[Set[Tuple[int, int]]]]] = []
+    keys: Dict[Tuple[int, int], str] = {}
+    if cache is None:
+        work = [(tile, None) for tile in layout.tiles(corner)]
+    else:
+        keys = panel_keys(layout, columns, values, limits, groups, diag_hists, corr_r, reg, style)
+        for tile in layout.tiles(corner):
+            r0, r1, c0, c1 = tile
+            missing = set()
+            for i in range(r0, r1):
+                for j in range(c0, c1):
+                    if (i, j) not in keys:
+                        continue
+                    pixels = cache.get(keys[i, j])
+                    if pixels is None:
+                        missing.add((i, j))
+                    else:
+                        paste_tile(image, layout, (i, i + 1, j, j + 1), pixels)
+            if missing:
+                work.append((tile, missing))
+        n_rendered = sum(len(panels) for _, panels in work)
+        print(f"パネルのキャッシュ: {len(keys) - n_rendered}個を再利用、{n_rendered}個を描画")
+
+    def tile_args(tile: Tuple[int, int, int, int], panels: Optional[Set[Tuple[int, int]]]) -> tuple:
+        # タイルで描画するパネルが使う列だけを渡す（ワーカープロセスに送るデータを減らす）
+        r0, r1, c0, c1 = tile
+        if panels is None:
+            used = sorted(set(range(r0, r1)) | set(range(c0, c1)))
+        else:
+            used = sorted({i for i, _ in panels} | {j for _, j in panels})
+        return (tile, n_cols, columns, values[:, used], used, limits,
+                groups, diag_hists, corr_r, reg, style, panels)
+
+    def finish(tile: Tuple[int, int, int, int], panels: Optional[Set[Tuple[int, int]]],
+               pixels: np.ndarray) -> None:
+        if panels is None:
+            paste_tile(image, layout, tile, pixels)
+            return
+        # 描画したパネルだけを切り出して保存する（他のパネルの部分は空白）
+        top, left, _, _ = layout.tile_box(*tile)
+        for i, j in panels:
+            panel = (i, i + 1, j, j + 1)
+            p_top, p_left, p_height, p_width = layout.tile_box(*panel)
+            panel_pixels = pixels[p_top - top:p_top - top + p_height, p_left - left:p_left - left + p_width]
+            paste_tile(image, layout, panel, panel_pixels)
+            cache.put(keys[i, j], panel_pixels)
+
+    if n_jobs <= 1 or len(work) <= 1:
+        for tile, panels in work:
+            finish(tile, panels, render_tile(*tile_args(tile, panels)))
+    else:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            futures = {executor.submit(render_tile, *tile_args(tile, panels)): (tile, panels)
+                       for tile, panels in work}
+            for future in as_completed(futures):
+                finish(*futures[future], future.result())
+
+    if cache is not None and work:
+        cache.evict()
+    return image
+
+
+def panel_keys(
+    layout: TileLayout,
+    columns: List[str],
+    values: np.ndarray,
+    limits: list,
+    groups: Optional[GroupIndex],
+    diag_hists: list,
+    corr_r: Optional[np.ndarray],
+    reg: Optional[RegressionResult],
+    style: PanelStyle
+) -> Dict[Tuple[int, int], str]:
+    """
+    パネルごとのキャッシュのキー
+
+    キーはパネルの見た目を決める内容だけから作り、グリッド内の位置は左端の列・下端の行かどうか
+    （ラベルを付けるかどうか）しか含めない。列を追加・並べ替えても、同じ2列のパネルは同じキーになる。
+
+    Args:
+        layout: タイルの配置
+        columns, values, limits, groups, diag_hists, corr_r, reg, style: render_tile と同じ
+
+    Returns:
+        (行, 列) -> キー（corner で描画しないパネルは含まない）
+    """
+    import matplotlib
+
+    n_cols = len(columns)
+    base = hashlib.blake2b(digest_size=16)
+    base.update(repr((PANEL_CACHE_FORMAT_VERSION, matplotlib.__version__, layout.panel, layout.margin,
+                      PANEL_PAD, TILE_DPI, sorted(style.scatter_kws.items()),
+                      sorted(style.hist_kws.items()), style.density, style.facecolors)).encode('utf-8'))
+    if groups is not None:
+        base.update(np.ascontiguousarray(groups.codes).tobytes())
+
+    column_hashes = []
+    for k in range(n_cols):
+        h = hashlib.blake2b(np.ascontiguousarray(values[:, k]).tobytes(), digest_size=16)
+        column_hashes.append(h.hexdigest())
+
+    keys = {}
+    for i in range(n_cols):
+        for j in range(n_cols):
+            if style.corner and j > i:
+                continue
+            if i == j:
+                hist = diag_hists[i]
+                content = ('hist', None if hist is None else (hist.edges.tolist(), np.asarray(hist.counts).tolist()))
+            else:
+                annotation = None
+                if i > j and corr_r is not None:
+                    annotation = ('r', float(corr_r[i, j]))
+                elif i > j and reg is not None:
+                    annotation = ('reg', float(reg.slope[i, j]), float(reg.intercept[i, j]),
+                                  float(reg.x_min[i, j]), float(reg.x_max[i, j]))
+                content = ('scatter', column_hashes[j], column_hashes[i], annotation)
+            labels = (columns[j] if i == n_cols - 1 else None, columns[i] if j == 0 else None,
+                      style.corner and i == 0 and j == 0)
+            h = base.copy()
+            h.update(repr((content, limits[j], limits[i], labels)).encode('utf-8'))
+            keys[i, j] = h.hexdigest()
+    return keys
+
+
+def paste_tile(image: np.ndarray, layout: TileLayout, tile: Tuple[int, int, int, int],
+               pixels: np.ndarray) -> None:
+    """描画したタイルを画像の所定の位置に書き込む"""
+    top, left, height, width = layout.tile_box(*tile)
+    image[top:top + height, left:left + width] = pixels
+
+
+def render_tile(
+    tile: Tuple[int, int, int, int],
+    n_cols: int,
+    columns: List[str],
+    values: np.ndarray,
+    used: List[int],
+    limits: list,
+    groups: Optional[GroupIndex],
+    diag_hists: list,
+    corr_r: Optional[np.ndarray],
+    reg: Optional[RegressionResult],
+    style: PanelStyle,
+    panels: Optional[Set[Tuple[int, int]]] = None
+) -> np.ndarray:
+    """
+    1つのタイルのパネルを描画（ワーカープロセスで実行される）
+
+    Args:
+        tile: タイルの (先頭の行, 末尾の次の行, 先頭の列, 末尾の次の列)
+        n_cols: ペアプロット全体の列数
+        columns: ペアプロット全体の列名
+        values: タイルが使う列の値（列の順は used と同じ）
+        used: values の各列のペアプロット全体での列番号
+        limits: 列ごとの軸の範囲（全体の列番号の順）
+        groups: z列のグループの索引（Noneの場合は色分けなし）
+        diag_hists: 列ごとのヒストグラム（全体の列番号の順）
+        corr_r: 相関係数の行列（Noneの場合は表示しない）
+        reg: 回帰直線（Noneの場合は描画しない）
+        style: 描画条件
+        panels: 描画するパネルの (行, 列) の集合（Noneの場合はタイルの全てのパネル）
+
+    Returns:
+        (高さ, 幅, 4) の RGBA 画像
+    """
+    r0, r1, c0, c1 = tile
+    layout = TileLayout(n_cols)
+    _, _, height, width = layout.tile_box(*tile)
+    left_margin = layout.margin if c0 == 0 else 0
+    bottom_margin = layout.margin if r1 == n_cols else 0
+    pad = PANEL_PAD * TILE_DPI
+    local = {k: idx for idx, k in enumerate(used)}
+
+    group_rows = [slice(None)] if groups is None else [groups.rows(g) for g in range(groups.n_groups)]
+    grouped = groups is not None
+
+    fig = new_figure(figsize=(width / TILE_DPI, height / TILE_DPI), dpi=TILE_DPI)
+    for i in range(r0, r1):
+        for j in range(c0, c1):
+            if (style.corner and j > i) or (panels is not None and (i, j) not in panels):
+                continue
+            cell_left = left_margin + (j - c0) * layout.panel
+            cell_bottom = bottom_margin + (r1 - 1 - i) * layout.panel
+            ax = fig.add_axes([(cell_left + pad) / width, (cell_bottom + pad) / height,
+                               (layout.panel - 2 * pad) / width, (layout.panel - 2 * pad) / height])
+            ax.spines['top'].set_visible(False)
+            ax.spines['right'].set_visible(False)
+
+            if i == j:
+                draw_histogram_panel(ax, diag_hists[i], grouped, style.hist_kws, style.facecolors)
+            else:
+                draw_scatter_panel(ax, values[:, local[j]], values[:, local[i]], limits[j], limits[i],
+                                   group_rows, grouped, style.density, style.scatter_kws, style.facecolors)
+                if i > j and corr_r is not None:
+                    annotate_correlation(ax, corr_r[i, j])
+                elif i > j and reg is not None:
+                    draw_regression_line(ax, reg.slope[i, j], reg.intercept[i, j], reg.x_min[i, j], reg.x_max[i, j])
+
+            # 軸の範囲は全てのタイルで同じものを使い、目盛りのラベルと列名は外側のパネルにだけ付ける
+            if limits[j] is not None:
+                ax.set_xlim(limits[j])
+            if limits[i] is not None:
+                ax.set_ylim(limits[i])
+            if i == n_cols - 1:
+                ax.set_xlabel(columns[j])
+            else:
+                ax.tick_params(axis='x', labelbottom=False)
+                ax.xaxis.offsetText.set_visible(False)
+            if j == 0:
+                ax.set_ylabel(columns[i])
+            else:
+                ax.tick_params(axis='y', labelleft=False)
+                ax.yaxis.offsetText.set_visible(False)
+            if style.corner and i == 0 and j == 0:
+                ax.tick_params(axis='y', left=False, labelleft=False)
+
+    fig.canvas.draw()
+    return np.array(fig.canvas.buffer_rgba())
+
+
+def save_image(output_path: str, image: np.ndarray) -> None:
+    """
+    render_tiled_pair_grid の画像を保存
+
+    Args:
+        output_path: 出力ファイルパス（拡張子で形式を決める）
+        image: RGBA 画像
+    """
+    import matplotlib.image
+
+    matplotlib.image.imsave(output_path, image, dpi=TILE_DPI)
@@ -1,76 +1,153 @@
 """
 ペアプロット用の共通ユーティリティ関数
 """
+from typing import Optional, Tuple
+
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy import stats
 
+from ..config import DENSITY_THRESHOLD_ROWS
+
+# 軸の範囲に付ける余白（データ範囲に対する割合）
+AXIS_MARGIN = 0.05
+
+# 密度表示のビン数（1軸あたり）
+DENSITY_BINS = 200
 
-def corr_func(x, y, **kws):
+
+def new_figure(**kwargs):
     """
-    カスタムの相関係数アノテーション関数
-    散布図の下三角部分に相関係数を表示
+    pyplot を使わずに Agg で描画する Figure を作成
+
+    pyplot の管理下（現在の Figure・Figure の一覧）に入れないので、複数のスレッドで同時に
+    描画でき、閉じ忘れもない（描画中に例外が起きても、参照がなくなれば解放される）。
     
     Args:
-        x: x軸のデータ
-        y: y軸のデータ
-        **kws: その他のキーワード引数
+        **kwargs: Figure に渡すキーワード引数（figsize など）
+        
+    Returns:
+        Figure
     """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    
+    fig = Figure(**kwargs)
+    FigureCanvasAgg(fig)
+    return fig
+
 
-    mask = ~np.logical_or(np.isnan(x), np.isnan(y))
-    x, y = x[mask], y[mask]
+def axis_limits(values: np.ndarray) -> Optional[Tuple[float, float]]:
+    """
+    列の値から余白付きの軸範囲を計算
     
-    # データの長さをチェック
-    if len(x) < 2 or len(y) < 2:
-        ax = plt.gca()
-        ax.annotate("r = N/A",
-                    xy=(.2, .5),
-                    xycoords=ax.transAxes,
-                    size=16)
-        return
+    Args:
+        values: 1列分の数値配列
+        
+    Returns:
+        (下限, 上限) のタプル（有効な値がない場合はNone）
+    """
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return None
+    lo, hi = float(finite.min()), float(finite.max())
+    pad = (hi - lo) * AXIS_MARGIN if hi > lo else max(abs(lo) * AXIS_MARGIN, 0.5)
+    return lo - pad, hi + pad
+
+
+def draw_boxplot(ax, stats: dict, vertical: bool, **kwargs) -> None:
+    """
+    計算済みの統計量から箱ひげ図を1つ描画
     
-    try:
-        r, _ = stats.pearsonr(x, y)
-        ax = plt.gca()
-        ax.annotate("r = {:.3f}".format(r),
-                    xy=(.2, .5),
-                    xycoords=ax.transAxes,
-                    size=16)
-    except ValueError:
-        # 相関係数計算でエラーが発生した場合
-        ax = plt.gca()
-        ax.annotate("r = N/A",
-                    xy=(.2, .5),
-                    xycoords=ax.transAxes,
-                    size=16)
-
-
-def regress_func(x, y, **kws):
+    Args:
+        ax: 描画先のAxes
+        stats: 箱ひげ図の統計量（core.quantiles.boxplot_stats の戻り値）
+        vertical: Trueの場合は縦向き
+        **kwargs: Axes.bxp に渡す書式
     """
-    回帰直線を描画する関数
-    散図に回帰直線を追加
+    import matplotlib
+    
+    # matplotlib 3.10 で向きの指定が vert から orientation に変わった
+    version = tuple(int(part) for part in matplotlib.__version__.split('.')[:2])
+    if version >= (3, 10):
+        kwargs['orientation'] = 'vertical' if vertical else 'horizontal'
+    else:
+        kwargs['vert'] = vertical
+    ax.bxp([stats], **kwargs)
+
+
+def use_density(n_rows: int, density: Optional[bool] = None) -> bool:
+    """
+    散布図を密度表示にするかどうかを判定
+    
+    Args:
+        n_rows: データの行数
+        density: True/False で明示的に指定、Noneの場合は行数で自動判定
+        
+    Returns:
+        密度表示にする場合はTrue
+    """
+    if density is not None:
+        return density
+    return n_rows > DENSITY_THRESHOLD_ROWS
+
+
+def draw_density(ax, x: np.ndarray, y: np.ndarray,
+                 x_range: Tuple[float, float], y_range: Tuple[float, float],
+                 bins: int = DENSITY_BINS) -> None:
+    """
+    散布図の代わりに2次元ヒストグラムをグレースケール画像として描画
+    描画コストは行数ではなくビン数（画素数）で決まる
     
     Args:
+        ax: 描画先のAxes
         x: x軸のデータ
         y: y軸のデータ
-        **kws: その他のキーワード引数
+        x_range: x軸の範囲
+        y_range: y軸の範囲
+        bins: 1軸あたりのビン数
     """
-    mask = ~np.logical_or(np.isnan(x), np.isnan(y))
-    x_clean, y_clean = x[mask], y[mask]
+    valid = np.isfinite(x) & np.isfinite(y)
+    counts, _, _ = np.histogram2d(x[valid], y[valid], bins=bins, range=[x_range, y_range])
     
-    # データの長さをチェック
-    if len(x_clean) < 2 or len(y_clean) < 2:
+    # 件数の差が大きいので対数で濃淡をつけ、0件のビンは白（透明）のままにする
+    image = np.ma.masked_equal(np.log1p(counts.T), 0)
+    ax.imshow(image, origin='lower', extent=(*x_range, *y_range),
+              cmap='Greys', vmin=0, aspect='auto', interpolation='nearest')
+
+
+def annotate_correlation(ax, r: float) -> None:
+    """
+    サブプロットに相関係数を表示
+    散布図の下三角部分に相関係数を表示
+    
+    Args:
+        ax: 表示先のAxes
+        r: 相関係数（NaNの場合は "N/A" と表示）
+    """
+    text = "r = N/A" if np.isnan(r) else "r = {:.3f}".format(r)
+    ax.annotate(text,
+                xy=(.2, .5),
+                xycoords=ax.transAxes,
+                size=16)
+
+
+def draw_regression_line(ax, slope: float, intercept: float, x_min: float, x_max: float, **kwargs) -> None:
+    """
+    回帰直線を描画する関数
+    計算済みの傾き・切片から散布図に回帰直線を追加
+    
+    Args:
+        ax: 描画先のAxes
+        slope: 傾き
+        intercept: 切片
+        x_min: 直線を引くxの最小値
+        x_max: 直線を引くxの最大値
+        **kwargs: ax.plot に渡すその他のキーワード引数
+    """
+    # 回帰が計算できなかったペアには何も描画しない
+    if np.isnan(slope) or np.isnan(intercept):
         return
     
-    try:
-        # 線形回帰を計算
-        slope, intercept, r_value, p_value, std_err = stats.linregress(x_clean, y_clean)
-        
-        # 回帰直線を描画（黒色）
-        ax = plt.gca()
-        x_line = np.array([x_clean.min(), x_clean.max()])
-        y_line = slope * x_line + intercept
-        ax.plot(x_line, y_line, 'k-', linewidth=2, alpha=0.8)
-    except (ValueError, RuntimeError):
-        # 回帰計算でエラーが発生した場合は何もしない
-        pass
+    # 回帰直線を描画（黒色）
+    x_line = np.array([x_min, x_max])
+    y_line = slope * x_line + intercept
+    ax.plot(x_line, y_line, 'k-', linewidth=2, alpha=0.8, **kwargs)
@@ -0,0 +1,171 @@
+"""
+描画処理の計測 - 段階ごとの所要時間とメモリ使用量を記録する
+
+読み込み（load）・統計計算（stats）・描画（draw）・画像の書き出し（encode）などの
+段階ごとに、経過時間・Pythonヒープのピーク（tracemalloc）・プロセスの最大RSSを記録する。
+tracemalloc は描画を数割遅くするので、時間だけを測る場合は trace_memory=False にする。
+
+使い方:
+    profile = RenderProfile('basic', file_path='data/a.csv')
+    create_basic_pairplot(df, cols, path, profile=profile)
+    record = profile.finish()   # 登録済みのフックにも渡される
+"""
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 計測結果を受け取るコールバック（record の辞書を引数に呼ばれる）
+_hooks: List[Callable[[dict], None]] = []
+
+
+def add_hook(callback: Callable[[dict], None]) -> None:
+    """
+    計測結果を受け取るコールバックを登録
+
+    RenderProfile.finish() が呼ばれたプロセス内で、計測結果の辞書を引数に呼ばれる。
+
+    Args:
+        callback: 計測結果の辞書を受け取る関数
+    """
+    _hooks.append(callback)
+
+
+def remove_hook(callback: Callable[[dict], None]) -> None:
+    """
+    add_hook で登録したコールバックを解除
+
+    Args:
+        callback: 登録済みの関数
+    """
+    if callback in _hooks:
+        _hooks.remove(callback)
+
+
+def _reset_peak() -> None:
+    """tracemalloc のピークを現在の使用量に戻す"""
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    else:
+        # reset_peak は Python 3.9 から。3.8 では計測し直してピークを戻す（記録済みの確保は数えなくなる）
+        limit = tracemalloc.get_traceback_limit()
+        tracemalloc.stop()
+        tracemalloc.start(limit)
+
+
+def _max_rss_bytes() -> Optional[int]:
+    """プロセスの最大RSS（バイト）を取得（取得できない環境ではNone）"""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux はKB単位、macOS はバイト単位
+    return max_rss if os.uname().sysname == 'Darwin' else max_rss * 1024
+
+
+class RenderProfile:
+    """
+    1回の描画の段階ごとの計測結果
+
+    Attributes:
+        name: 計測対象の名前（プロットタイプなど）
+        metadata: 計測結果に含める任意の情報（ファイル名・行数など）
+        stages: 段階ごとの計測結果のリスト
+
+    trace_memory=True の場合、tracemalloc が動いていなければ開始し、finish() で停止する。
+    """
+
+    def __init__(self, name: str, trace_memory: bool = True, **metadata):
+        self.name = name
+        self.metadata = dict(metadata)
+        self.stages: List[Dict[str, object]] = []
+        self._start = time.perf_counter()
+        self._started_tracing = False
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        段階の計測を行うコンテキストマネージャ
+
+        Args:
+            name: 段階の名前（'load', 'stats', 'draw', 'encode' など）
+        """
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            _reset_peak()
+            traced_before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            record = {
+                'stage': name,
+                'seconds': time.perf_counter() - start,
+                # 段階の開始時点から増えたPythonヒープの最大量
+                'peak_traced_bytes': tracemalloc.get_traced_memory()[1] - traced_before if tracing else None,
+                'max_rss_bytes': _max_rss_bytes(),
+            }
+            self.stages.append(record)
+
+    def to_dict(self) -> dict:
+        """計測結果をJSONに変換できる辞書にする"""
+        return {
+            'name': self.name,
+            'timestamp': time.time(),
+            'total_seconds': time.perf_counter() - self._start,
+            'metadata': self.metadata,
+            'stages': list(self.stages),
+        }
+
+    def finish(self) -> dict:
+        """
+        計測を終了し、結果を登録済みのフックに渡す
+
+        Returns:
+            計測結果の辞書
+        """
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+        record = self.to_dict()
+        for callback in list(_hooks):
+            callback(record)
+        return record
+
+
+def stage(profile: Optional[RenderProfile], name: str):
+    """
+    profile が None の場合は何もしない stage（描画関数の中で使う）
+
+    Args:
+        profile: 計測先（Noneの場合は計測しない）
+        name: 段階の名前
+
+    Returns:
+        コンテキストマネージャ
+    """
+    if profile is None:
+        return nullcontext()
+    return profile.stage(name)
+
+
+def append_json_record(path: str, record: dict) -> None:
+    """
+    計測結果をJSON Lines形式でファイルに追記
+
+    Args:
+        path: 出力ファイルのパス
+        record: 計測結果の辞書
+    """
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
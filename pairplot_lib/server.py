@@ -0,0 +1,178 @@
+"""
+常駐描画サーバー - 重いモジュールと読み込み済みデータを保持したまま描画ジョブを受け付ける
+
+localhost のHTTPでJSONの描画ジョブを受け取り、ワーカープロセスのプールで描画する。
+各ワーカーは起動時に描画関数を読み込み、解析済みのデータ（Dataset）をメモリ上に保持するので、
+同じファイルの2回目以降の描画では読み込みもimportも統計量の再計算も発生しない。
+"""
+import os
+import json
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+from .batch import JobResult, RenderJob, _run_job
+from .config import SERVER_HOST, SERVER_PORT
+
+# 各ワーカーがメモリ上に保持するデータの最大数
+MEMORY_CACHE_ENTRIES = 8
+
+# ワーカープロセス内のメモリキャッシュ（フィンガープリント -> Dataset）
+_memory_cache: "OrderedDict[str, object]" = OrderedDict()
+
+
+def _init_worker() -> None:
+    """ワーカープロセスの起動時に重いモジュールを読み込んでおく"""
+    from . import plotters  # noqa: F401
+    from .plotters import create_basic_pairplot  # noqa: F401
+
+
+def _load_from_memory(file_path: str):
+    """
+    ワーカー内のメモリキャッシュから Dataset を取得（なければディスクキャッシュ経由で読み込む）
+
+    Args:
+        file_path: CSVファイルのパス
+
+    Returns:
+        読み込まれたデータの Dataset（計算済みの統計量も保持している）
+    """
+    from .core.cache import fingerprint_file, load_csv_cached
+    from .core.dataset import Dataset
+
+    key = fingerprint_file(file_path)
+    if key in _memory_cache:
+        _memory_cache.move_to_end(key)
+        return _memory_cache[key]
+
+    dataset = Dataset.from_frame(load_csv_cached(file_path))
+    _memory_cache[key] = dataset
+    while len(_memory_cache) > MEMORY_CACHE_ENTRIES:
+        _memory_cache.popitem(last=False)
+    return dataset
+
+
+def _serve_job(job: RenderJob, profile: bool = False) -> JobResult:
+    """ワーカープロセスでジョブを実行"""
+    return _run_job(job, loader=_load_from_memory, profile=profile)
+
+
+def result_to_dict(result: JobResult) -> dict:
+    """JobResult をJSONに変換できる辞書にする"""
+    data = result._asdict()
+    data['job'] = result.job._asdict()
+    return data
+
+
+def result_from_dict(data: dict) -> JobResult:
+    """result_to_dict の逆変換"""
+    data = dict(data)
+    data['job'] = RenderJob(**data['job'])
+    return JobResult(**data)
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """
+    描画ジョブを受け付けるHTTPハンドラ
+
+    - GET /health: サーバーの状態を返す
+    - POST /render: {"jobs": [RenderJob の辞書, ...]} を受け取り {"results": [...]} を返す
+      （"profile": true を指定すると各結果に段階ごとの計測結果が含まれる）
+    """
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if self.path == '/health':
+            self._send_json(200, {'status': 'ok', 'workers': self.server.n_workers})
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self) -> None:
+        if self.path != '/render':
+            self._send_json(404, {'error': 'not found'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length).decode('utf-8'))
+            jobs = [RenderJob(**job) for job in request['jobs']]
+            profile = bool(request.get('profile', False))
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {'error': f"不正なリクエストです: {e}"})
+            return
+
+        futures = [self.server.executor.submit(_serve_job, job, profile) for job in jobs]
+        results = [result_to_dict(future.result()) for future in futures]
+        self._send_json(200, {'results': results})
+
+    def log_message(self, format: str, *args) -> None:
+        # アクセスログは1行で簡潔に表示
+        print(f"[{self.log_date_time_string()}] {format % args}")
+
+
+def serve(host: str = SERVER_HOST, port: int = SERVER_PORT, n_workers: int = 1) -> None:
+    """
+    描画サーバーを起動（Ctrl+C で終了）
+
+    Args:
+        host: 待ち受けるホスト（既定は localhost のみ）
+        port: 待ち受けるポート
+        n_workers: 描画に使うワーカープロセス数
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker) as executor:
+        server = ThreadingHTTPServer((host, port), RenderRequestHandler)
+        server.executor = executor
+        server.n_workers = n_workers
+        print(f"✓ 描画サーバーを起動しました: http://{host}:{port}（ワーカー {n_workers}）")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n描画サーバーを停止しました。")
+        finally:
+            server.server_close()
+
+
+def submit_jobs(jobs: List[RenderJob], server_url: str, timeout: float = 600.0,
+                profile: bool = False) -> List[JobResult]:
+    """
+    描画サーバーにジョブを送信して結果を受け取る（クライアント側）
+
+    ファイルパスと出力ディレクトリはサーバー側でも解決できるよう絶対パスにして送る。
+
+    Args:
+        jobs: 描画ジョブのリスト
+        server_url: サーバーのURL（例: http://127.0.0.1:8765）
+        timeout: 応答を待つ最大秒数
+        profile: Trueの場合はサーバー側で段階ごとの時間とメモリを計測する
+
+    Returns:
+        ジョブと同じ順序の JobResult のリスト
+    """
+    import urllib.request
+    
+    payload = {
+        'jobs': [
+            job._replace(file_path=os.path.abspath(job.file_path),
+                         output_dir=os.path.abspath(job.output_dir))._asdict()
+            for job in jobs
+        ],
+        'profile': profile
+    }
+    request = urllib.request.Request(
+        server_url.rstrip('/') + '/render',
+        data=json.dumps(payload, ensure_ascii=False).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        data = json.loads(response.read().decode('utf-8'))
+    return [result_from_dict(r) for r in data['results']]
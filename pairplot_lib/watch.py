@@ -0,0 +1,210 @@
+"""
+監視モード - データフォルダのCSVの追加・変更を検知して自動で描画し直す
+
+データフォルダを一定間隔でポーリングし、追加・変更されたCSVについて指定の描画ジョブを実行する。
+書き込み途中のファイルを描画しないよう、最後の変更から一定時間たってから描画する（デバウンス）。
+短時間に同じファイルが何度変更されても、描画は1回にまとめる。
+描画はプロセス数に上限のあるワーカープールで行い、ワーカーは監視を終えるまで使い回す。
+
+follow は1つのCSVへの追記を監視し、追記された行だけを読み込んで描画し直す。
+"""
+import glob
+import os
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from .batch import JobResult, RenderJob, _run_job, report_result
+
+# データフォルダを確認する間隔（秒）
+POLL_INTERVAL = 1.0
+
+# 最後の変更からこの秒数だけ変更がなければ描画する
+DEBOUNCE_SECONDS = 2.0
+
+
+def scan_csv_files(data_dir: str) -> Dict[str, Tuple[int, int]]:
+    """
+    データフォルダのCSVファイルのサイズと更新時刻を取得
+
+    Args:
+        data_dir: データフォルダのパス
+
+    Returns:
+        ファイルパス -> (サイズ, 更新時刻(ns)) の辞書
+    """
+    state = {}
+    for path in glob.glob(os.path.join(data_dir, '*.csv')):
+        try:
+            st = os.stat(path)
+        except OSError:
+            # 一覧の取得後に削除されたファイル
+            continue
+        state[path] = (st.st_size, st.st_mtime_ns)
+    return state
+
+
+class ChangeTracker:
+    """
+    ファイルの変更を記録し、デバウンスの時間が過ぎたファイルを返す
+
+    同じファイルの変更が続く間は描画を待ち、変更が落ち着いたら1回だけ描画対象にする。
+    """
+
+    def __init__(self, debounce: float = DEBOUNCE_SECONDS):
+        self.debounce = debounce
+        self.known: Dict[str, Tuple[int, int]] = {}
+        # ファイルパス -> 最後に変更を検知した時刻
+        self.pending: Dict[str, float] = {}
+
+    def update(self, state: Dict[str, Tuple[int, int]], now: float) -> None:
+        """
+        最新のフォルダの状態を取り込み、追加・変更されたファイルを待ち行列に入れる
+
+        Args:
+            state: scan_csv_files の戻り値
+            now: 現在時刻（time.monotonic）
+        """
+        for path, file_state in state.items():
+            if self.known.get(path) != file_state:
+                self.pending[path] = now
+        for path in set(self.pending) - set(state):
+            # 描画前に削除されたファイル
+            del self.pending[path]
+        self.known = state
+
+    def ready(self, now: float) -> List[str]:
+        """
+        最後の変更からデバウンスの時間が過ぎたファイルを取り出す
+
+        Args:
+            now: 現在時刻（time.monotonic）
+
+        Returns:
+            描画するファイルパスのリスト（ソート済み）
+        """
+        paths = sorted(p for p, changed in self.pending.items() if now - changed >= self.debounce)
+        for path in paths:
+            del self.pending[path]
+        return paths
+
+
+def watch(
+    data_dir: str,
+    templates: List[RenderJob],
+    n_jobs: int = 1,
+    interval: float = POLL_INTERVAL,
+    debounce: float = DEBOUNCE_SECONDS,
+    max_cycles: Optional[int] = None
+) -> None:
+    """
+    データフォルダを監視し、追加・変更されたCSVを描画する（Ctrl+C で終了）
+
+    起動時には全てのCSVを確認し、出力フォルダのマニフェストと比べて変更のあるものだけを描画する。
+    描画中のファイルが再び変更された場合は、描画が終わってからもう一度描画する。
+
+    Args:
+        data_dir: 監視するデータフォルダ
+        templates: ファイルごとに実行する描画ジョブ（file_path は各ファイルで置き換える）
+        n_jobs: 描画に使うワーカープロセス数
+        interval: フォルダを確認する間隔（秒）
+        debounce: 最後の変更から描画までに待つ秒数
+        max_cycles: 指定した回数だけフォルダを確認したら終了する（Noneの場合はCtrl+Cまで）
+    """
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    from .manifest import BuildManifest
+    from .server import _init_worker
+
+    manifests = {output_dir: BuildManifest(output_dir)
+                 for output_dir in dict.fromkeys(t.output_dir for t in templates)}
+    tracker = ChangeTracker(debounce)
+    running: Dict[object, RenderJob] = {}
+    busy: Set[str] = set()
+    # 描画中に再び変更されたファイル（描画が終わったら待ち行列に戻す）
+    dirty: Set[str] = set()
+
+    def finish(result: JobResult) -> None:
+        report_result(result)
+        manifest = manifests[result.job.output_dir]
+        manifest.record(result)
+        manifest.save()
+
+    print(f"✓ {data_dir} を監視しています（{interval:g}秒ごと、Ctrl+C で終了）")
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker) as executor:
+        cycle = 0
+        try:
+            while max_cycles is None or cycle < max_cycles:
+                cycle += 1
+                now = time.monotonic()
+                tracker.update(scan_csv_files(data_dir), now)
+
+                for path in tracker.ready(now):
+                    if path in busy:
+                        dirty.add(path)
+                        continue
+                    for template in templates:
+                        job = template._replace(file_path=path)
+                        pending, skipped = manifests[job.output_dir].partition([job])
+                        for result in skipped:
+                            report_result(result)
+                        if pending:
+                            running[executor.submit(_run_job, job)] = job
+                            busy.add(path)
+
+                if running:
+                    done, _ = wait(list(running), timeout=interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job = running.pop(future)
+                        finish(future.result())
+                        if not any(j.file_path == job.file_path for j in running.values()):
+                            busy.discard(job.file_path)
+                            if job.file_path in dirty:
+                                dirty.discard(job.file_path)
+                                tracker.pending[job.file_path] = time.monotonic()
+                else:
+                    time.sleep(interval)
+
+            # 指定回数で終了する場合は実行中の描画を待つ
+            for future in list(running):
+                finish(future.result())
+        except KeyboardInterrupt:
+            print("\n監視を終了しました。")
+
+
+def follow(
+    file_path: str,
+    templates: List[RenderJob],
+    interval: float = POLL_INTERVAL,
+    max_cycles: Optional[int] = None
+) -> None:
+    """
+    追記され続けるCSVを監視し、行が追記されるたびに描画し直す（Ctrl+C で終了）
+
+    2回目以降は追記された行だけを読み込み、ペアプロットの注釈と対角のヒストグラムは
+    追記分で更新した統計量から描画する（散布図のパネルは全ての行を描画する）。
+
+    Args:
+        file_path: 監視するCSVファイル
+        templates: 追記のたびに実行する描画ジョブ（file_path は監視するファイルで置き換える）
+        interval: ファイルを確認する間隔（秒）
+        max_cycles: 指定した回数だけファイルを確認したら終了する（Noneの場合はCtrl+Cまで）
+    """
+    from .core.tail import TailDataset
+
+    jobs = [template._replace(file_path=file_path) for template in templates]
+    tail = TailDataset(file_path)
+    new_rows = tail.n_rows
+    print(f"✓ {file_path} への追記を監視しています（{interval:g}秒ごと、Ctrl+C で終了）")
+
+    cycle = 0
+    try:
+        while max_cycles is None or cycle < max_cycles:
+            cycle += 1
+            if new_rows:
+                print(f"{new_rows}行を読み込みました（全{tail.n_rows}行）")
+                for job in jobs:
+                    report_result(_run_job(job, tail=tail))
+            time.sleep(interval)
+            new_rows = tail.refresh()
+    except KeyboardInterrupt:
+        print("\n監視を終了しました。")
@@ -0,0 +1,60 @@
+"""
+bench のテスト（合成データは作らず、計測結果の辞書だけで確かめる）
+"""
+import math
+
+from pairplot_lib.bench import BENCH_GRIDS, BenchCase, Regression, find_regressions
+
+
+def _report(**seconds):
+    return {'results': {key.replace('__', '/'): {'seconds': value, 'stages': {}}
+                        for key, value in seconds.items()}}
+
+
+def test_find_regressions_threshold_and_floor():
+    baseline = _report(a__load=1.0, b__load=1.0, c__load=0.01, d__load=2.0, e__load=1.0)
+    report = _report(
+        a__load=1.19,   # 閾値（20%）以内
+        b__load=1.5,    # 50%遅い
+        c__load=0.05,   # 5倍だが差が min_seconds 以下
+        d__load=5.0,    # 2.5倍遅い
+        e__load=0.5,    # 速くなった
+    )
+
+    regressions = find_regressions(report, baseline, threshold=0.2, min_seconds=0.05)
+
+    assert [r.key for r in regressions] == ['d/load', 'b/load']
+    assert regressions[0] == Regression('d/load', 2.0, 5.0)
+    assert math.isclose(regressions[0].ratio, 2.5)
+
+
+def test_find_regressions_boundaries_and_missing_keys():
+    baseline = _report(a__load=1.0, gone__load=1.0, zero__draw=0.0)
+    report = _report(a__load=1.2, new__load=100.0, zero__draw=0.2)
+
+    # ちょうど閾値の倍率は性能低下としない。基準値にない・今回にない経路は比べない
+    regressions = find_regressions(report, baseline, threshold=0.2, min_seconds=0.05)
+    assert [r.key for r in regressions] == ['zero/draw']
+    assert regressions[0].ratio == float('inf')
+
+    # min_seconds を下げても、差がちょうど min_seconds の経路は含めない
+    assert find_regressions(_report(x__load=1.5), _report(x__load=1.0), threshold=0.2, min_seconds=0.5) == []
+    assert len(find_regressions(_report(x__load=1.5), _report(x__load=1.0), threshold=0.2, min_seconds=0.4)) == 1
+
+
+def test_bench_grids_vary_one_axis_at_a_time():
+    bases = {'quick': BenchCase(1_000, 4, 0.0, ',', 2), 'full': BenchCase(100_000, 5, 0.0, ',', 2)}
+    for grid, cases in BENCH_GRIDS.items():
+        base = bases[grid]
+        assert cases.count(base) == 1
+        assert len(set(cases)) == len(cases)
+        assert len({case.case_id for case in cases}) == len(cases)
+        for case in cases:
+            changed = [field for field in BenchCase._fields if getattr(case, field) != getattr(base, field)]
+            assert len(changed) <= 1
+
+    quick = BENCH_GRIDS['quick']
+    assert {case.rows for case in quick} == {1_000, 10_000, 100_000}
+    assert {case.delimiter for case in quick} == {',', '\t', ';', '|', ' '}
+    # 基準ケースは各軸の一覧に含まれるが1回だけ数える（3 + 3 + 2 + 5 + 3 - 4）
+    assert len(quick) == 12
@@ -0,0 +1,71 @@
+"""
+cache のテスト
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from pairplot_lib.core.cache import CsvCache, load_csv_cached
+
+
+def _put_many(cache_dir, worker, n):
+    cache = CsvCache(cache_dir, max_bytes=1024 ** 3)
+    df = pd.DataFrame({'a': np.arange(10.0)})
+    for k in range(n):
+        cache.put(f"w{worker}_{k}", df, f"/data/w{worker}_{k}.csv", f"fp{k}")
+
+
+def test_concurrent_puts_keep_every_entry(tmp_path):
+    """複数のプロセスが同時に保存しても index.json のエントリが失われない"""
+    cache_dir = str(tmp_path / 'cache')
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        list(pool.map(_put_many, [cache_dir] * 4, range(4), [15] * 4))
+
+    index = CsvCache(cache_dir)._load_index()
+    assert len(index) == 60
+    assert sorted(f for f in os.listdir(cache_dir) if f.endswith('.pickle')) == \
+        sorted(e['file'] for e in index.values())
+
+
+def test_get_does_not_rewrite_index(tmp_path):
+    """読み込みでは index.json を書き直さず、データファイルの更新時刻を最終アクセスにする"""
+    cache = CsvCache(str(tmp_path))
+    cache.put('k', pd.DataFrame({'a': [1.0, 2.0]}), '/data/a.csv', 'fp')
+    data_path = tmp_path / 'k.pickle'
+    os.utime(data_path, (0, 0))
+    index_mtime = os.stat(cache.index_path).st_mtime_ns
+
+    assert cache.get('k')['a'].tolist() == [1.0, 2.0]
+    assert os.stat(cache.index_path).st_mtime_ns == index_mtime
+    assert os.stat(data_path).st_mtime > 0
+
+
+def test_evict_counts_orphaned_files(tmp_path):
+    """index.json にない残骸のデータファイルもサイズに数えて古い順に削除する"""
+    orphan = tmp_path / 'orphan.pickle'
+    orphan.write_bytes(b'x' * 5000)
+    os.utime(orphan, (0, 0))
+
+    cache = CsvCache(str(tmp_path), max_bytes=5000)
+    cache.put('k', pd.DataFrame({'a': np.arange(100.0)}), '/data/a.csv', 'fp')
+
+    assert not orphan.exists()
+    assert cache.get('k') is not None
+
+
+class _UnserializableCache(CsvCache):
+    def put(self, key, df, source_path, fingerprint=''):
+        raise TypeError("Object of type 'Decimal' cannot be converted")
+
+
+def test_load_returns_frame_when_put_fails(tmp_path, capsys):
+    """保存できない列があってもキャッシュせずに読み込んだDataFrameを返す"""
+    path = tmp_path / 'data.csv'
+    pd.DataFrame({'a': [1, 2, 3], 'b': [0.5, 1.5, 2.5]}).to_csv(path, index=False)
+
+    df = load_csv_cached(str(path), cache=_UnserializableCache(str(tmp_path / 'cache')))
+
+    assert df['b'].tolist() == [0.5, 1.5, 2.5]
+    assert "警告: キャッシュを保存できませんでした" in capsys.readouterr().out
@@ -0,0 +1,37 @@
+"""
+data_loader のテスト
+"""
+import numpy as np
+import pandas as pd
+
+from pairplot_lib.core.data_loader import load_csv_streaming
+from pairplot_lib.core.dataset import Dataset
+
+
+def test_streaming_keeps_text_z_over_chunks(tmp_path):
+    """文字列の'z'列は数値に変換されず、複数のチャンクにまたがってもグループが残る"""
+    n = 250
+    z = np.where(np.arange(n) % 3 == 0, 'ctrl', 'treat').astype(object)
+    z[7] = None
+    path = tmp_path / 'data.csv'
+    pd.DataFrame({'a': np.arange(n), 'b': np.linspace(0, 1, n), 'z': z}).to_csv(path, index=False)
+
+    df = load_csv_streaming(str(path), ['a', 'b'], chunksize=40)
+
+    assert list(df.columns) == ['a', 'b', 'z']
+    assert df['z'].isna().sum() == 1
+    assert df.loc[0, 'z'] == 'ctrl' and df.loc[1, 'z'] == 'treat'
+    assert Dataset.from_frame(df).groups.labels == ['ctrl', 'treat']
+    # 指定した数値列は縮小される
+    assert df['a'].dtype == np.int16
+
+
+def test_streaming_numeric_z_stays_numeric(tmp_path):
+    """全ての値が数値の'z'列は数値の列になる"""
+    path = tmp_path / 'data.csv'
+    pd.DataFrame({'a': np.arange(100.0), 'z': np.arange(100) % 2}).to_csv(path, index=False)
+
+    df = load_csv_streaming(str(path), ['a'], chunksize=30)
+
+    assert pd.api.types.is_numeric_dtype(df['z'])
+    assert sorted(df['z'].unique()) == [0, 1]
@@ -0,0 +1,85 @@
+"""
+histogram のテスト（同じ境界で np.histogram と比べる）
+"""
+import numpy as np
+
+from pairplot_lib.core import histogram
+from pairplot_lib.core.histogram import ColumnHistogram
+
+
+def _expected(values, edges):
+    values = values[np.isfinite(values)]
+    # ColumnHistogram のビンは右端を含まないので、最後の境界ちょうどの値はない前提で比べる
+    assert not np.any(values == edges[-1])
+    return np.histogram(values, edges)[0]
+
+
+def test_from_values_matches_auto_bins():
+    values = np.random.default_rng(0).normal(size=5000)
+    values[::17] = np.nan
+    hist = ColumnHistogram.from_values(values)
+    finite = values[np.isfinite(values)]
+    expected_counts, expected_edges = np.histogram(finite, bins='auto')
+    assert hist.n_bins == len(expected_counts)
+    np.testing.assert_allclose(hist.edges, expected_edges, rtol=1e-12)
+    np.testing.assert_array_equal(hist.counts[0], _expected(finite, hist.edges))
+    assert hist.counts.sum() == finite.size
+
+
+def test_extend_keeps_edges_and_counts():
+    """範囲外の値を両側に追加しても既にあるビンの境界は動かず、度数は全ての値を数えた結果と同じ"""
+    rng = np.random.default_rng(1)
+    hist = ColumnHistogram.from_range(0.0, 1.0, 10)
+    chunks = [rng.random(300), rng.normal(-3.0, 1.0, 300), rng.normal(8.0, 2.0, 300)]
+    # 境界ちょうどの値は右のビンに入る
+    chunks.append(hist.edges[:-1].copy())
+
+    seen = []
+    for chunk in chunks:
+        edges_before = hist.edges
+        hist.add(chunk)
+        seen.append(chunk)
+        assert np.isin(edges_before, hist.edges).all()
+        np.testing.assert_array_equal(hist.counts[0], _expected(np.concatenate(seen), hist.edges))
+
+
+def test_coarsen_merges_bins_on_the_same_lattice(monkeypatch):
+    """ビン数が上限を超える場合は2つずつまとめ、境界は元の格子の一部のまま度数も一致する"""
+    monkeypatch.setattr(histogram, 'MAX_BINS', 16)
+    rng = np.random.default_rng(2)
+    hist = ColumnHistogram.from_range(0.0, 1.0, 10)
+    first = rng.random(500)
+    hist.add(first)
+    original_edges = hist.edges
+
+    far = rng.uniform(-20.0, 30.0, 200)
+    hist.add(far)
+    all_values = np.concatenate([first, far])
+
+    assert hist.n_bins <= 16
+    assert hist.width > original_edges[1] - original_edges[0]
+    # 幅を2倍にした格子の境界は元の格子の境界と同じ値
+    steps = (hist.edges - original_edges[0]) / (original_edges[1] - original_edges[0])
+    np.testing.assert_array_equal(steps, np.round(steps))
+    np.testing.assert_array_equal(hist.counts[0], _expected(all_values, hist.edges))
+
+
+def test_grouped_counts_and_regroup():
+    rng = np.random.default_rng(3)
+    values = rng.normal(size=1000)
+    codes = rng.integers(-1, 3, size=1000)
+    hist = ColumnHistogram.from_values(values, codes, n_groups=3)
+    more = rng.normal(4.0, 1.0, size=400)
+    more_codes = rng.integers(0, 3, size=400)
+    hist.add(more, more_codes)
+
+    all_values = np.concatenate([values, more])
+    all_codes = np.concatenate([codes, more_codes])
+    for g in range(3):
+        np.testing.assert_array_equal(hist.counts[g], _expected(all_values[all_codes == g], hist.edges))
+
+    # グループ0と2をまとめ、グループ1を除く
+    merged = hist.regroup([0, -1, 0], 1)
+    np.testing.assert_array_equal(merged.edges, hist.edges)
+    keep = (all_codes == 0) | (all_codes == 2)
+    np.testing.assert_array_equal(merged.counts[0], _expected(all_values[keep], hist.edges))
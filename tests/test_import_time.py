@@ -0,0 +1,61 @@
+"""
+起動時間のテスト
+
+pairplot_lib.cli の import と --help の表示で重いライブラリを読み込まないこと、
+起動時間が上限内であることを確かめる。毎回新しいインタプリタで実行する。
+"""
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import pytest
+
+# import しないライブラリ
+HEAVY_MODULES = ['pandas', 'numpy', 'matplotlib', 'scipy', 'seaborn']
+
+# 起動時間の上限（秒）。遅いCIでは環境変数で緩められる
+IMPORT_BUDGET = float(os.environ.get('PAIRPLOT_IMPORT_BUDGET', 0.5))
+HELP_BUDGET = float(os.environ.get('PAIRPLOT_HELP_BUDGET', 2.0))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHECK_MODULES = f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]; print(','.join(heavy))"
+
+
+def _run(args):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    start = time.perf_counter()
+    result = subprocess.run(args, capture_output=True, text=True, env=env, timeout=60)
+    return result, time.perf_counter() - start
+
+
+def test_cli_import_is_light():
+    """import pairplot_lib.cli で重いライブラリを読み込まず、上限時間内に終わる"""
+    code = ("import sys, time; start = time.perf_counter(); import pairplot_lib.cli; "
+            "elapsed = time.perf_counter() - start; " + CHECK_MODULES + "; print(elapsed)")
+    result, _ = _run([sys.executable, '-c', code])
+    assert result.returncode == 0, result.stderr
+    heavy, elapsed = result.stdout.splitlines()
+    assert heavy == ''
+    assert float(elapsed) < IMPORT_BUDGET
+
+
+def test_help_is_light():
+    """--help の表示で重いライブラリを読み込まず、上限時間内に終わる"""
+    code = ("import sys\nfrom pairplot_lib.cli import main\n"
+            "try:\n    main(argv=['--help'])\nexcept SystemExit:\n    pass\n" + CHECK_MODULES)
+    result, elapsed = _run([sys.executable, '-c', code])
+    assert result.returncode == 0, result.stderr
+    assert 'usage' in result.stdout
+    assert result.stdout.splitlines()[-1] == ''
+    assert elapsed < HELP_BUDGET
+
+
+@pytest.mark.skipif(shutil.which('pairplot') is None, reason="pairplot コマンドがインストールされていません")
+def test_pairplot_command_help():
+    """インストールされた pairplot --help が上限時間内に終わる"""
+    result, elapsed = _run(['pairplot', '--help'])
+    assert result.returncode == 0, result.stderr
+    assert elapsed < HELP_BUDGET
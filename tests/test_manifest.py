@@ -0,0 +1,38 @@
+"""
+manifest のテスト
+"""
+import numpy as np
+import pandas as pd
+
+from pairplot_lib.batch import RenderJob, run_jobs
+from pairplot_lib.core import cache
+from pairplot_lib.manifest import BuildManifest, content_hash
+
+
+def _render(file_path, output_dir, annotation_type):
+    job = RenderJob(str(file_path), 'basic', str(output_dir), annotation_type=annotation_type)
+    return run_jobs([job], manifest=BuildManifest(str(output_dir)))[0]
+
+
+def test_rerenders_when_other_annotation_overwrote_image(tmp_path, monkeypatch):
+    """correlation → none → correlation の順に描画すると、3回目は省略せずに描画し直す"""
+    # カレントディレクトリに読み込みのキャッシュを作らない
+    monkeypatch.setattr(cache, 'CACHE_ENABLED', False)
+    rng = np.random.default_rng(0)
+    file_path = tmp_path / 'data.csv'
+    pd.DataFrame(rng.normal(size=(40, 3)), columns=['a', 'b', 'c']).to_csv(file_path, index=False)
+    output_dir = tmp_path / 'out'
+
+    first = _render(file_path, output_dir, 'correlation')
+    correlation_hash = content_hash(first.output_path)
+    assert _render(file_path, output_dir, 'correlation').skipped
+
+    second = _render(file_path, output_dir, 'none')
+    assert not second.skipped
+    assert content_hash(second.output_path) != correlation_hash
+
+    third = _render(file_path, output_dir, 'correlation')
+    assert not third.skipped
+    assert third.output_path == first.output_path
+    assert content_hash(third.output_path) == correlation_hash
+    assert _render(file_path, output_dir, 'correlation').skipped
@@ -0,0 +1,69 @@
+"""
+panel_cache のテスト
+"""
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from pairplot_lib.core.groups import GroupIndex
+from pairplot_lib.plotters.panel_cache import PanelCache
+from pairplot_lib.plotters.tiles import render_tiled_pair_grid
+
+COLUMNS = ['a', 'b', 'c', 'd', 'e', 'f', 'g']
+
+
+def _reuse_counts(capsys):
+    """最後に表示されたパネルのキャッシュの (再利用した数, 描画した数)"""
+    found = re.findall(r"(\d+)個を再利用、(\d+)個を描画", capsys.readouterr().out)
+    return tuple(int(n) for n in found[-1])
+
+
+def test_cached_render_matches_uncached_and_reuses_panels(tmp_path, capsys):
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(120, len(COLUMNS)))
+    groups = GroupIndex.from_series(pd.Series(rng.choice(['x', 'y'], size=len(values))))
+    cache = PanelCache(str(tmp_path))
+    n_panels = len(COLUMNS) ** 2
+
+    uncached = render_tiled_pair_grid(values, COLUMNS, groups=groups)
+
+    cold = render_tiled_pair_grid(values, COLUMNS, groups=groups, cache=cache)
+    assert _reuse_counts(capsys) == (0, n_panels)
+    np.testing.assert_array_equal(cold, uncached)
+
+    warm = render_tiled_pair_grid(values, COLUMNS, groups=groups, cache=cache)
+    assert _reuse_counts(capsys) == (n_panels, 0)
+    np.testing.assert_array_equal(warm, uncached)
+
+    parallel = render_tiled_pair_grid(values, COLUMNS, n_jobs=2, groups=groups, cache=cache)
+    np.testing.assert_array_equal(parallel, uncached)
+
+
+def test_adding_a_column_reuses_unchanged_panels(tmp_path, capsys):
+    rng = np.random.default_rng(1)
+    values = rng.normal(size=(120, len(COLUMNS)))
+    cache = PanelCache(str(tmp_path))
+
+    render_tiled_pair_grid(values[:, :-1], COLUMNS[:-1], cache=cache)
+    grown = render_tiled_pair_grid(values, COLUMNS, cache=cache)
+
+    # 6列の36パネルのうち、最下段だった6パネルは x 軸のラベルがなくなるので描画し直す
+    # （新しい列の13パネルと合わせて19パネルを描画）
+    assert _reuse_counts(capsys) == (30, 19)
+    np.testing.assert_array_equal(grown, render_tiled_pair_grid(values, COLUMNS))
+
+
+def test_evict_removes_least_recently_used(tmp_path):
+    """合計サイズが上限を超えたら、最終アクセスが古いパネルから削除する"""
+    panel = np.full((8, 8, 4), 255, dtype=np.uint8)
+    cache = PanelCache(str(tmp_path))
+    cache.put('old', panel)
+    cache.put('new', panel)
+    cache.max_bytes = (tmp_path / 'new.png').stat().st_size
+    os.utime(tmp_path / 'old.png', (0, 0))
+
+    assert cache.evict() == 1
+    assert cache.get('old') is None
+    np.testing.assert_array_equal(cache.get('new'), panel)
@@ -0,0 +1,19 @@
+"""
+profiling のテスト
+"""
+import tracemalloc
+
+from pairplot_lib.profiling import RenderProfile
+
+
+def test_stage_without_reset_peak(monkeypatch):
+    """tracemalloc.reset_peak がない Python 3.8 でも段階ごとのピークを記録できる"""
+    monkeypatch.delattr(tracemalloc, 'reset_peak', raising=False)
+    profile = RenderProfile('test')
+    with profile.stage('draw'):
+        data = [0] * 100000
+    record = profile.finish()
+
+    assert len(data) == 100000
+    assert record['stages'][0]['peak_traced_bytes'] >= 100000 * 8
+    assert not tracemalloc.is_tracing()
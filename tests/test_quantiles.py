@@ -0,0 +1,36 @@
+"""
+quantiles のテスト
+"""
+import numpy as np
+
+from pairplot_lib.core.quantiles import sample_fliers
+
+
+def test_sample_fliers_all_equal():
+    """max_fliers より多い外れ値が全て同じ値でも、1つだけ残す"""
+    fliers = np.full(50, 7.5)
+    assert sample_fliers(fliers, max_fliers=10).tolist() == [7.5]
+
+
+def test_sample_fliers_keeps_extremes():
+    """間引いても最小値・最大値は残り、max_fliers 個以下になる"""
+    fliers = np.concatenate([np.linspace(10, 11, 1000), [50.0]])
+    sampled = sample_fliers(fliers, max_fliers=20)
+    assert sampled.size <= 20
+    assert sampled.min() == 10 and sampled.max() == 50
+
+
+def test_sample_fliers_keeps_extremes_of_descending_fliers():
+    """区間の中で最初に現れる値が端の値でなくても、最小値・最大値を残す"""
+    fliers = np.linspace(1.0, 0.0, 5000)
+    sampled = sample_fliers(fliers, max_fliers=100)
+    assert sampled.size <= 100
+    assert sampled.min() == 0.0 and sampled.max() == 1.0
+
+
+def test_sample_fliers_small_limit():
+    """max_fliers が小さい場合も上限を超えず、最小値・最大値を優先する"""
+    fliers = np.linspace(0.0, 1.0, 50)
+    assert sample_fliers(fliers, max_fliers=1).tolist() == [0.0]
+    assert sample_fliers(fliers, max_fliers=2).tolist() == [0.0, 1.0]
+    assert sample_fliers(fliers, max_fliers=3).tolist() == [0.0, 1.0]
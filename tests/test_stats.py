@@ -0,0 +1,96 @@
+"""
+stats のテスト（pandas・scipy の列ペアごとの計算と比べる）
+"""
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from pairplot_lib.core import stats as core_stats
+from pairplot_lib.core.stats import (correlation_from_moments, merge_moments, merge_ranges, moments_from_sums,
+                                     pairwise_moments, pairwise_ranges, pairwise_sums, regression_from_moments)
+
+
+def _values(n_rows=3000, seed=0):
+    """欠損値を含み、列ごとに平均と尺度が大きく異なるデータ"""
+    rng = np.random.default_rng(seed)
+    base = rng.normal(size=(n_rows, 1))
+    values = base + rng.normal(size=(n_rows, 4)) * [0.5, 1.0, 2.0, 3.0]
+    values = values * [1.0, 10.0, 1e-3, 1.0] + [0.0, 1e6, -5.0, 100.0]
+    values[rng.random(values.shape) < 0.15] = np.nan
+    # 全て欠損の列の区間を作り、ペアごとに使う行が異なるようにする
+    values[:500, 3] = np.nan
+    return values
+
+
+def test_correlation_matches_dataframe_corr(monkeypatch):
+    # 複数のブロックに分けて集計する場合も確かめる
+    monkeypatch.setattr(core_stats, 'BLOCK_ROWS', 256)
+    values = _values()
+    result = correlation_from_moments(moments_from_sums(pairwise_sums(values)), with_pvalues=True)
+    expected = pd.DataFrame(values).corr().to_numpy()
+    np.testing.assert_allclose(result.r, expected, rtol=1e-10, atol=1e-12)
+
+    for i in range(values.shape[1]):
+        for j in range(values.shape[1]):
+            if i == j:
+                continue
+            both = np.isfinite(values[:, i]) & np.isfinite(values[:, j])
+            assert result.n[i, j] == both.sum()
+            _, p = stats.pearsonr(values[both, i], values[both, j])
+            np.testing.assert_allclose(result.p[i, j], p, rtol=1e-6, atol=1e-300)
+
+
+def test_regression_matches_linregress():
+    values = _values()
+    moments = pairwise_moments(values)
+    x_min, x_max = pairwise_ranges(values)
+    result = regression_from_moments(moments, x_min, x_max)
+
+    for i in range(values.shape[1]):
+        for j in range(values.shape[1]):
+            if i == j:
+                continue
+            both = np.isfinite(values[:, i]) & np.isfinite(values[:, j])
+            x, y = values[both, j], values[both, i]
+            expected = stats.linregress(x, y)
+            np.testing.assert_allclose(result.slope[i, j], expected.slope, rtol=1e-8)
+            np.testing.assert_allclose(result.intercept[i, j], expected.intercept, rtol=1e-8, atol=1e-8)
+            np.testing.assert_allclose(result.r2[i, j], expected.rvalue ** 2, rtol=1e-8)
+            np.testing.assert_allclose(result.stderr[i, j], expected.stderr, rtol=1e-8)
+            assert result.x_min[i, j] == x.min() and result.x_max[i, j] == x.max()
+
+
+def test_constant_and_short_columns_are_nan():
+    """分散が0の列・行数が2未満のペアは相関係数と傾きがNaNになる"""
+    values = np.array([[1.0, 2.0, np.nan], [1.0, 3.0, 4.0], [1.0, 5.0, np.nan]])
+    moments = pairwise_moments(values)
+    r = correlation_from_moments(moments).r
+    assert np.isnan(r[0, 1]) and np.isnan(r[1, 2])
+    assert np.isnan(regression_from_moments(moments, *pairwise_ranges(values)).slope[1, 0])
+
+
+def test_merge_moments_equals_single_pass():
+    """チャンクごとのモーメントを合わせた結果は、全ての行を1回で計算した結果と同じ"""
+    values = _values(n_rows=5000, seed=1)
+    bounds = [0, 7, 500, 1800, 1801, 5000]
+    chunks = [values[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+
+    merged = pairwise_moments(chunks[0])
+    ranges = pairwise_ranges(chunks[0])
+    for chunk in chunks[1:]:
+        merged = merge_moments(merged, pairwise_moments(chunk))
+        ranges = merge_ranges(ranges, pairwise_ranges(chunk))
+
+    full = pairwise_moments(values)
+    np.testing.assert_array_equal(merged.n, full.n)
+    np.testing.assert_allclose(merged.mean, full.mean, rtol=1e-12)
+    np.testing.assert_allclose(merged.m2, full.m2, rtol=1e-9)
+    np.testing.assert_allclose(merged.cxy, full.cxy, rtol=1e-9, atol=1e-6)
+    np.testing.assert_array_equal(ranges[0], pairwise_ranges(values)[0])
+    np.testing.assert_array_equal(ranges[1], pairwise_ranges(values)[1])
+
+    # 合わせる順序を変えても同じ
+    reverse = pairwise_moments(chunks[-1])
+    for chunk in chunks[-2::-1]:
+        reverse = merge_moments(pairwise_moments(chunk), reverse)
+    np.testing.assert_allclose(reverse.cxy, full.cxy, rtol=1e-9, atol=1e-6)
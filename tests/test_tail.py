@@ -0,0 +1,80 @@
+"""
+tail のテスト（差分で更新した統計量と、全体を読み込み直した結果を比べる）
+"""
+import numpy as np
+import pandas as pd
+
+from pairplot_lib.core.tail import TailDataset
+
+
+def _frame(n_rows, seed, scale=1.0, groups=('a', 'b')):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.normal(size=(n_rows, 3)) * scale, columns=['x', 'y', 'w'])
+    df.loc[rng.random(n_rows) < 0.1, 'y'] = np.nan
+    df['z'] = rng.choice(list(groups), size=n_rows)
+    return df
+
+
+def _assert_same_as_full_load(tail):
+    full = TailDataset(tail.file_path)
+    assert tail.n_rows == full.n_rows
+    assert tail.groups == full.groups
+    np.testing.assert_array_equal(tail.dataset.values, full.dataset.values)
+    np.testing.assert_array_equal(tail.dataset.groups.codes, full.dataset.groups.codes)
+    assert tail.dataset.groups.labels == full.dataset.groups.labels
+
+    cols = tail.numeric_cols
+    for grouped in (False, True):
+        stats, expected = tail.pairplot_stats(cols, grouped), full.pairplot_stats(cols, grouped)
+        np.testing.assert_array_equal(stats.moments.n, expected.moments.n)
+        np.testing.assert_allclose(stats.moments.mean, expected.moments.mean, rtol=1e-10)
+        np.testing.assert_allclose(stats.moments.m2, expected.moments.m2, rtol=1e-10)
+        np.testing.assert_allclose(stats.moments.cxy, expected.moments.cxy, rtol=1e-9, atol=1e-9)
+        np.testing.assert_array_equal(stats.x_min, expected.x_min)
+        np.testing.assert_array_equal(stats.x_max, expected.x_max)
+
+        # 差分で広げたビンの度数は、同じ境界で全ての行を数えた度数と同じ
+        values = full.dataset.values
+        for k, hist in enumerate(stats.histograms):
+            column = values[:, k]
+            if grouped:
+                codes = full.dataset.groups.codes
+                expected_counts = [np.histogram(column[codes == g], hist.edges)[0] for g in range(len(tail.groups))]
+            else:
+                expected_counts = [np.histogram(column[np.isfinite(column)], hist.edges)[0]]
+            np.testing.assert_array_equal(hist.counts, expected_counts)
+
+    for col in cols:
+        sketch, expected = tail.sketches[col], full.sketches[col]
+        assert (sketch.count, sketch.min, sketch.max) == (expected.count, expected.min, expected.max)
+        np.testing.assert_allclose(sketch.total, expected.total, rtol=1e-12)
+
+
+def test_refresh_matches_full_load_after_append(tmp_path):
+    path = tmp_path / 'data.csv'
+    _frame(300, 0).to_csv(path, index=False)
+    tail = TailDataset(str(path))
+    before = tail.dataset
+
+    # 範囲外の値（ビンの追加）と新しいグループを含む行を2回に分けて追記する
+    for seed, scale, groups in ((1, 5.0, ('b', 'c')), (2, 50.0, ('a', 'aa'))):
+        appended = _frame(200, seed, scale, groups)
+        appended.to_csv(path, mode='a', header=False, index=False)
+        assert tail.refresh() == 200
+        _assert_same_as_full_load(tail)
+
+    assert tail.groups == ['a', 'aa', 'b', 'c']
+    # 作成済みの Dataset は追記の影響を受けない
+    assert before.n_rows == 300 and before.groups.labels == ['a', 'b']
+
+
+def test_refresh_reloads_rewritten_file(tmp_path):
+    path = tmp_path / 'data.csv'
+    _frame(300, 0).to_csv(path, index=False)
+    tail = TailDataset(str(path))
+
+    # 先頭が書き換えられ、ファイルは長くなった場合も全体を読み込み直す
+    _frame(400, 3, groups=('p', 'q')).to_csv(path, index=False)
+    assert tail.refresh() == 400
+    _assert_same_as_full_load(tail)
+    assert tail.groups == ['p', 'q']
@@ -0,0 +1,41 @@
+"""
+tiles のテスト
+"""
+import numpy as np
+import pandas as pd
+
+from pairplot_lib.core.groups import GroupIndex
+from pairplot_lib.plotters.tiles import TILE_PANELS, render_tiled_pair_grid
+
+COLUMNS = ['a', 'b', 'c', 'd', 'e', 'f', 'g']
+
+
+def _data():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(120, len(COLUMNS)))
+    values[::11, 2] = np.nan
+    groups = GroupIndex.from_series(pd.Series(rng.choice(['x', 'y'], size=len(values))))
+    return values, groups
+
+
+def test_parallel_tiles_match_sequential():
+    """タイルを複数のプロセスで描画しても、1つのプロセスで描画した画像と同じ"""
+    assert len(COLUMNS) > TILE_PANELS  # 複数のタイルに分かれる
+    values, groups = _data()
+    sequential = render_tiled_pair_grid(values, COLUMNS, n_jobs=1, groups=groups)
+    parallel = render_tiled_pair_grid(values, COLUMNS, n_jobs=2, groups=groups)
+
+    assert sequential.ndim == 3 and sequential.shape[2] == 4
+    np.testing.assert_array_equal(sequential, parallel)
+
+
+def test_corner_leaves_upper_tiles_blank():
+    values, _ = _data()
+    full = render_tiled_pair_grid(values, COLUMNS)
+    corner = render_tiled_pair_grid(values, COLUMNS, corner=True)
+
+    assert full.shape == corner.shape
+    # 右上のタイル（上三角のパネルだけ）は描画されず白のまま
+    height, width = corner.shape[:2]
+    assert (corner[:height // 4, -width // 4:] == 255).all()
+    assert not (full[:height // 4, -width // 4:] == 255).all()